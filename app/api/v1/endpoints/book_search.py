@@ -1,26 +1,59 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+import json
+from contextlib import aclosing
+from typing import AsyncIterator, Dict, List, Optional, Set, Union
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
 from app.schemas.common import ApiStandardResponse, create_object_response, DataType
-from app.services.isbn.search_manager import search_title
+from app.services.isbn import search_manager
+from app.services.isbn.catalog import without_raw
 
 
 router = APIRouter()
 
 
 class SearchByTitleRequest(BaseModel):
-    title: str = Field(..., description="书名关键词，支持近似匹配（分词 Jaccard 相似度）")
+    title: str = Field(..., description="书名关键词，支持近似匹配（字符三元组 + 容错分词相似度，主标题匹配即可）")
     minSimilarity: float = Field(0.6, description="最小相似度阈值，范围 0-1，建议 0.5-0.7")
     maxResultsPerSource: int = Field(5, description="每个来源最大返回条数")
     preferOrder: Optional[List[str]] = Field(None, description="来源优先级（如 loc/open_library/google_books）")
-    forceSource: Optional[str] = Field(None, description="强制来源")
+    forceSource: Optional[str] = Field(None, description="强制来源；local 表示只查本地书目")
     # apiKey 从服务端配置读取，不允许从接口传入
     lang: Optional[str] = Field(None, description="语言限制（例如 en/zh）")
-    timeout: float = Field(10.0, description="超时")
+    timeout: float = Field(10.0, description="单个来源的超时秒数")
+    deadline: Optional[float] = Field(None, gt=0, description="整体截止秒数，到时返回已到达的结果；默认同 timeout")
+    stream: bool = Field(False, description="为 true 时以 NDJSON 流式返回，每个来源完成即输出一行")
+    includeRaw: bool = Field(False, description="为 true 时附带上游原始响应 raw（本地书目结果不含）")
+
+
+def _present(req: SearchByTitleRequest, items: List) -> List:
+    return items if req.includeRaw else [without_raw(item) for item in items]
+
+
+def _search_kwargs(req: SearchByTitleRequest) -> Dict:
+    return {
+        "max_results_per_source": req.maxResultsPerSource,
+        "min_similarity": req.minSimilarity,
+        "api_keys": None,
+        "lang": req.lang,
+        "timeout": req.timeout,
+        "deadline": req.deadline,
+        "prefer_order": req.preferOrder,
+        "force_source": req.forceSource,
+    }
+
+
+async def _ndjson_lines(req: SearchByTitleRequest) -> AsyncIterator[str]:
+    seen: Set[str] = set()
+    async with aclosing(search_manager.iter_search_title(req.title, **_search_kwargs(req))) as results:
+        async for src, status, items in results:
+            line = {"source": src, "status": status, "items": _present(req, search_manager.dedup_books(items, seen))}
+            yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+    yield json.dumps({"done": True}) + "\n"
 
 
 @router.post(
@@ -29,10 +62,19 @@ class SearchByTitleRequest(BaseModel):
     summary="按书名搜索",
     description=(
         "中文说明:\n"
-        "- 对 LOC / Open Library / Google Books 进行标题搜索\n"
-        "- 使用分词 Jaccard 相似度过滤，建议阈值 0.5-0.7\n"
-        "- forceSource 可强制单一来源；preferOrder 调整优先级\n"
+        "- 先查本地书目（书名倒排索引，中日韩文按二元组切分），命中数不足时再对 LOC / Open Library / Google Books 进行标题搜索\n"
+        "- 上游返回的带 ISBN 的结果写入本地书目，重复搜索直接由本地返回\n"
+        "- 相似度综合字符三元组与容错分词（拼写错误、中日韩文、副标题），建议阈值 0.5-0.7；结果按相似度排序\n"
+        "- 同一版次的跨来源记录（ISBN-10/13 等价，或无 ISBN 时主标题 + 作者相同）融合为一条：各字段按来源可信度取值，"
+        "sources 列出参与融合的来源，provenance 标注每个字段的来源\n"
+        "- forceSource 可强制单一来源；preferOrder 调整优先级（同分结果的排列顺序）\n"
+        "- 各来源并发查询，deadline 秒后返回已到达的结果；data.sources 给出每个来源的状态"
+        "（ok/empty/error/rate_limited/unavailable/timeout）、条数与耗时，本地书目记为 local\n"
+        "- stream=true 时以 application/x-ndjson 逐行返回：每个来源完成即输出 "
+        "{\"source\": ..., \"status\": {...}, \"items\": [...]}（已跨来源去重，不做字段融合），最后一行为 {\"done\": true}\n"
+        "- 上游原始响应 raw 默认不返回，includeRaw=true 时附带\n"
     ),
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "stream=true 时按来源逐行返回"}},
     openapi_extra={
         "requestBody": {
             "content": {
@@ -51,15 +93,8 @@ class SearchByTitleRequest(BaseModel):
         }
     }
 )
-def search_books_by_title(req: SearchByTitleRequest) -> ApiStandardResponse:
-    results = search_title(
-        req.title,
-        max_results_per_source=req.maxResultsPerSource,
-        min_similarity=req.minSimilarity,
-        api_keys=None,
-        lang=req.lang,
-        timeout=req.timeout,
-        prefer_order=req.preferOrder,
-        force_source=req.forceSource,
-    )
-    return create_object_response(message="OK", data_value={"items": results}, data_type=DataType.LIST, code=200)
+async def search_books_by_title(req: SearchByTitleRequest) -> Union[ApiStandardResponse, StreamingResponse]:
+    if req.stream:
+        return StreamingResponse(_ndjson_lines(req), media_type="application/x-ndjson")
+    results, statuses = await search_manager.search_title(req.title, **_search_kwargs(req))
+    return create_object_response(message="OK", data_value={"items": _present(req, results), "sources": statuses}, data_type=DataType.LIST, code=200)
@@ -1,12 +1,20 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+import json
+from typing import AsyncIterator, List, Literal, Optional
 
 from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 
+from app.core.config import get_settings
+
 from app.schemas.common import ApiStandardResponse, create_object_response, DataType
 from app.services.isbn import manager as isbn_manager
+from app.services.isbn.book_cache import get_book_cache
+from app.services.isbn.circuit_breaker import CLOSED, get_breakers
+from app.services.isbn.source_health import get_source_health
+from app.services.isbn.source_stats import get_source_stats
 from app.services.isbn.client_base import RateLimitError
 
 
@@ -19,6 +27,12 @@ class ResolveIsbnRequest(BaseModel):
     forceSource: Optional[str] = Field(None, description="强制指定来源常量，例如 google_books/open_library/loc 等")
     preferOrder: Optional[List[str]] = Field(None, description="可选的来源优先顺序，靠前优先")
     timeout: float = Field(10.0, description="超时秒数")
+    mode: Optional[Literal["sequential", "parallel", "hedged"]] = Field(None, description="查询模式：sequential 逐一 / parallel 并发前 N 个 / hedged 对冲；默认取服务端配置")
+    fanout: Optional[int] = Field(None, ge=1, le=10, description="parallel/hedged 模式下同时在途的来源上限")
+    hedgeDelay: Optional[float] = Field(None, ge=0, description="hedged 模式下启动下一个来源前的等待秒数")
+    enrich: bool = Field(False, description="结果缺少封面/简介/页数等字段时，并发查询其他来源补全")
+    enrichBudget: Optional[float] = Field(None, ge=0, le=30, description="补全的总耗时预算（秒）；默认取服务端配置")
+    includeRaw: bool = Field(False, description="为 true 时在 data.raw 中附带上游原始响应")
     # apiKey 仅从服务端配置读取，不允许从接口传入
 
 
@@ -29,10 +43,15 @@ class ResolveIsbnRequest(BaseModel):
     summary="根据 ISBN 获取书籍信息",
     description=(
         "中文说明:\n"
-        "- 按照优先级顺序(本地Mongo → 国别国家级API → 免费强 → 免费小 → 收费)查询书籍\n"
+        "- 按照优先级顺序(本地书目(ISBN-10/13 均可命中) → 国别国家级API → 免费强 → 免费小 → 收费)查询书籍\n"
         "- 支持 forceSource 强制指定来源；若该来源被上游限流，返回 429\n"
-        "- 支持 countryCode 指定国别以优先国家级接口 (CN/HK/JP/KR/GB/US)\n"
-        "- 上游限流(429/403)将触发 24 小时抑制并自动换源\n"
+        "- 支持 countryCode 指定国别以优先国家级接口 (CN/HK/JP/KR/GB/US)；未指定时按 ISBN 注册组推断（978-7 → CN 等）\n"
+        "- 校验位错误或不在 ISBN 国际中心已分配号段内的 ISBN 直接返回 404，不请求上游\n"
+        "- 未指定 preferOrder 时按各来源近期延迟与命中率动态排序，静态优先级作为先验\n"
+        "- 上游限流(429/403)将打开熔断并按 Retry-After（缺省 1 小时）抑制该来源，自动换源\n"
+        "- mode=parallel 同时请求前 fanout 个来源，mode=hedged 在 hedgeDelay 秒未答时追加下一个来源；首个有效结果返回并取消其余请求\n"
+        "- enrich=true 时按字段可信度向其他来源补全缺失字段（enrichBudget 秒内），结果附带 sources 与 provenance（各字段来源）\n"
+        "- 上游原始响应另行压缩存储，默认不返回；includeRaw=true 时附带在 data.raw\n"
     ),
     openapi_extra={
         "requestBody": {
@@ -44,6 +63,10 @@ class ResolveIsbnRequest(BaseModel):
                         "forceSource": None,
                         "preferOrder": ["loc", "open_library", "google_books"],
                         "timeout": 10.0,
+                        "mode": "hedged",
+                        "fanout": 3,
+                        "hedgeDelay": 0.8,
+                        "enrich": False,
                         "apiKeys": {
                             "google_books": "YOUR_GOOGLE_BOOKS_KEY",
                             "isbndb": "YOUR_ISBNDB_KEY",
@@ -79,8 +102,7 @@ class ResolveIsbnRequest(BaseModel):
                                 "preview_urls": [
                                     "https://books.google.com/books?id=EXAMPLE",
                                     "https://openlibrary.org/isbn/9781982137274"
-                                ],
-                                "raw": {}
+                                ]
                             },
                             "code": 200,
                             "timestamp": "2025-01-01T00:00:00Z"
@@ -94,15 +116,21 @@ class ResolveIsbnRequest(BaseModel):
         }
     }
 )
-def isbn_resolve(req: ResolveIsbnRequest) -> ApiStandardResponse:
+async def isbn_resolve(req: ResolveIsbnRequest) -> ApiStandardResponse:
     try:
-        doc = isbn_manager.resolve_isbn(
+        doc = await isbn_manager.resolve_isbn(
             req.isbn,
             country_code=req.countryCode,
             prefer_order=req.preferOrder,
             api_keys=None,
             timeout=req.timeout,
             force_source=req.forceSource,
+            mode=req.mode,
+            fanout=req.fanout,
+            hedge_delay=req.hedgeDelay,
+            enrich=req.enrich,
+            enrich_budget=req.enrichBudget,
+            include_raw=req.includeRaw,
         )
     except RateLimitError as e:
         raise HTTPException(status_code=429, detail=str(e))
@@ -113,3 +141,81 @@ def isbn_resolve(req: ResolveIsbnRequest) -> ApiStandardResponse:
         raise HTTPException(status_code=404, detail="未找到对应书籍")
 
     return create_object_response(message="OK", data_value=doc, data_type=DataType.OBJECT, code=200)
+
+
+class ResolveIsbnBatchRequest(BaseModel):
+    isbns: List[str] = Field(..., min_length=1, description="ISBN 列表（ISBN-10 或 ISBN-13），重复项只解析一次")
+    countryCode: Optional[str] = Field(None, description="国别代码，如 CN/US/GB/JP/KR/HK")
+    timeout: float = Field(10.0, description="单次上游请求超时秒数")
+    concurrency: Optional[int] = Field(None, ge=1, le=32, description="上游并发上限；默认取服务端配置")
+    mode: Optional[Literal["sequential", "parallel", "hedged"]] = Field(None, description="单个 ISBN 的来源查询模式，同 /isbn/resolve")
+    includeRaw: bool = Field(False, description="为 true 时在 data.raw 中附带上游原始响应")
+
+
+async def _ndjson_lines(req: ResolveIsbnBatchRequest, isbns: List[str]) -> AsyncIterator[str]:
+    try:
+        async for isbn, doc, error in isbn_manager.resolve_isbn_batch(
+            isbns,
+            country_code=req.countryCode,
+            timeout=req.timeout,
+            concurrency=req.concurrency,
+            mode=req.mode,
+            include_raw=req.includeRaw,
+        ):
+            line = {"isbn": isbn, "found": bool(doc), "data": doc, "error": error}
+            yield json.dumps(line, ensure_ascii=False, default=str) + "\n"
+    except Exception as e:
+        # 响应头已发出，无法再改状态码：以一行错误记录结束流
+        yield json.dumps({"isbn": None, "found": False, "data": None, "error": f"batch aborted: {e}"}, ensure_ascii=False) + "\n"
+
+
+@router.post(
+    "/isbn/resolve-batch",
+    summary="批量根据 ISBN 获取书籍信息（NDJSON 流式返回）",
+    description=(
+        "中文说明:\n"
+        "- 一次提交多个 ISBN，先以单次 $in 查询本地书目，命中项立即返回\n"
+        "- 未命中项优先合并为 Open Library 多键请求（bibkeys 逗号分隔），其余再逐个走来源链\n"
+        "- 上游并发受 concurrency 限制；结果按完成顺序逐行返回（application/x-ndjson）\n"
+        "- 每行格式：{\"isbn\": ..., \"found\": true/false, \"data\": {...}|null, \"error\": null|\"...\"}\n"
+    ),
+    responses={200: {"content": {"application/x-ndjson": {}}, "description": "每行一个 ISBN 的解析结果"}},
+)
+async def isbn_resolve_batch(req: ResolveIsbnBatchRequest) -> StreamingResponse:
+    isbns = [i.strip() for i in req.isbns if i and i.strip()]
+    if not isbns:
+        raise HTTPException(status_code=400, detail="isbns 不能为空")
+    max_size = get_settings().isbn_batch_max_size
+    if len(isbns) > max_size:
+        raise HTTPException(status_code=400, detail=f"单次最多 {max_size} 个 ISBN")
+    return StreamingResponse(_ndjson_lines(req, isbns), media_type="application/x-ndjson")
+
+
+@router.get(
+    "/isbn/cache/stats",
+    response_model=ApiStandardResponse,
+    summary="ISBN 进程内缓存统计",
+    description="返回当前 worker 的 L1 书籍缓存条目数、占用字节数与命中/未命中/淘汰计数。",
+)
+def isbn_cache_stats() -> ApiStandardResponse:
+    return create_object_response(message="OK", data_value=get_book_cache().stats(), data_type=DataType.OBJECT, code=200)
+
+
+@router.get(
+    "/isbn/sources/stats",
+    response_model=ApiStandardResponse,
+    summary="ISBN 上游来源统计",
+    description="返回当前 worker 各来源的调用次数、命中率/错误率、p50/p95 延迟、按注册组的命中率、熔断状态与限流封禁状态。",
+)
+def isbn_source_stats() -> ApiStandardResponse:
+    stats = get_source_stats().snapshot()
+    breakers = get_breakers().stats()
+    banned = get_source_health().snapshot()
+    data = {}
+    for src in sorted(set(stats) | set(breakers) | set(banned)):
+        data[src] = {
+            **stats.get(src, {}),
+            "breaker": breakers.get(src, {}).get("state", CLOSED),
+            "rateLimited": banned.get(src, False),
+        }
+    return create_object_response(message="OK", data_value=data, data_type=DataType.OBJECT, code=200)
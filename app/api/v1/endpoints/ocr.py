@@ -1,14 +1,19 @@
 from __future__ import annotations
 
-from typing import List, Optional
+import asyncio
+from collections import Counter
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import aclosing
+from typing import List, Optional, Tuple
 
-from fastapi import APIRouter, File, UploadFile, HTTPException
+from fastapi import APIRouter, File, Query, UploadFile, HTTPException
 from pydantic import BaseModel, Field
 
+from app.core.config import get_settings
 from app.schemas.common import ApiStandardResponse, create_object_response, DataType
-from app.services.ocr import get_ocr_service
+from app.services.ocr import Box, OCRBusy, OCRPool, OCRTimeout, get_ocr_pool
 from app.utils.isbn import extract_isbn_candidates
-from app.services.barcode import decode_isbn_from_image_bytes
+from app.services.barcode import scan_barcodes
 
 
 router = APIRouter()
@@ -19,56 +24,91 @@ class OCRISBNResponse(BaseModel):
     isbns: List[str] = Field(default_factory=list, description="识别出的 ISBN（去重、格式化后）")
 
 
+# 置信命中：ISBN-13（前缀、校验位、号段均有效）一次即可；ISBN-10 偶然通过校验的概率更高，需两个预处理方案识别结果一致
+_ISBN10_CONFIRMATIONS = 2
+_MAX_SAMPLES = 5
+
+
+async def _scan_ocr(
+    pool: OCRPool, content: bytes, exhaustive: bool, barcodes: Optional[List[Box]] = None
+) -> Tuple[List[str], List[str], bool]:
+    """在 OCR 进程池中识别并提取 ISBN，按完成顺序合并各预处理方案的结果；非 exhaustive 模式下首个置信命中即停止。
+
+    每个方案只识别一趟，整页文本与逐行文本均由同一趟的词框数据得到；barcodes 为已解码过的条码位置，定位阶段直接复用。
+    返回 (文本样例, ISBN 列表, 是否超时)；超时前已识别的结果照常返回。
+    """
+    samples: List[str] = []
+    sample_keys = set()
+    found: List[str] = []
+    counts: Counter = Counter()
+    confident = False
+    range_check = get_settings().isbn_range_check
+    try:
+        async with aclosing(pool.iter_pages(content, timeout=get_settings().ocr_timeout, barcodes=barcodes)) as pages:
+            async for page in pages:
+                text = page.text.strip()
+                if not text:
+                    continue
+                key = text.replace("\n", " ")
+                if key not in sample_keys and len(samples) < _MAX_SAMPLES:
+                    sample_keys.add(key)
+                    samples.append(text)
+                # 逐行优先（保留 "ISBN" 与数字的行内上下文），再查整页；同一方案内同一 ISBN 只计一次
+                hits = {}
+                for t in page.lines + [text]:
+                    for isbn_type, n in extract_isbn_candidates(t, assigned_only=range_check):
+                        hits.setdefault(n, isbn_type)
+                for n, isbn_type in hits.items():
+                    if n not in counts:
+                        found.append(n)
+                    counts[n] += 1
+                    confident = confident or isbn_type == "ISBN-13" or counts[n] >= _ISBN10_CONFIRMATIONS
+                if confident and not exhaustive:
+                    break
+    except OCRTimeout:
+        return samples, found, True
+    return samples, found, False
+
+
 @router.post(
     "/ocr/isbn",
     response_model=ApiStandardResponse,
     summary="图片 OCR 识别 ISBN",
     description=(
         "上传书籍封面、条形码或相关图片，自动进行多方案图像预处理+OCR，\n"
-        "从文本中提取并校验 ISBN-10 / ISBN-13。适配不同角度、尺寸和光照。"
+        "从文本中提取并校验 ISBN-10 / ISBN-13。适配不同角度、尺寸和光照。\n"
+        "先识别条形码，命中即返回；否则先低分辨率粗识别一趟，定位条形码与 ISBN 所在行，\n"
+        "在这些区域的裁剪图上各预处理方案各识别一趟（代价低的先开始），仍未命中再整图识别；得到置信的 ISBN 即停止。\n"
+        "exhaustive=true 时执行全部预处理方案，返回所有候选。\n"
+        "OCR 在独立进程池中执行；并发请求超过上限或工作进程异常退出时返回 503，超过 OCR_TIMEOUT 仍无结果返回 504。"
     ),
 )
-async def ocr_isbn(file: UploadFile = File(..., description="图片文件，如 jpg/png/jpeg")) -> ApiStandardResponse:
+async def ocr_isbn(
+    file: UploadFile = File(..., description="图片文件，如 jpg/png/jpeg"),
+    exhaustive: bool = Query(False, description="为 true 时不提前结束，执行全部预处理方案"),
+) -> ApiStandardResponse:
     if file.content_type not in {"image/png", "image/jpeg", "image/jpg"}:
         raise HTTPException(status_code=400, detail="仅支持 PNG/JPEG 图片")
 
     content = await file.read()
-    # 1) Try barcode first (fast/robust for many covers)
-    barcode_hits = decode_isbn_from_image_bytes(content)
-
-    # 2) OCR fallback（行粒度 + 字串）
-    ocr = get_ocr_service()
-    variants = ocr.image_bytes_to_texts(content)
-    lines = ocr.image_bytes_to_lines(content)
-
-    # Deduplicate and keep short samples
-    seen = set()
+    # 1) 条形码优先：EAN-13 已带校验位，命中即可返回（解码在线程中执行，不阻塞事件循环）；条码位置留给 OCR 定位
+    found, rects = await asyncio.to_thread(scan_barcodes, content)
     samples: List[str] = []
-    for _, txt in variants:
-        t = (txt or "").strip()
-        if not t:
-            continue
-        key = t.replace("\n", " ")
-        if key not in seen:
-            seen.add(key)
-            samples.append(t)
-        if len(samples) >= 5:
-            break
-
-    # Extract ISBNs across all variants + lines + barcode hits
-    found = list(barcode_hits)
-    unique = set()
-    for _, txt in variants:
-        for t, n in extract_isbn_candidates(txt):
-            if n not in unique:
-                unique.add(n)
-                found.append(n)
-    for ln in lines:
-        for t, n in extract_isbn_candidates(ln):
-            if n not in unique:
-                unique.add(n)
-                found.append(n)
 
+    # 2) OCR 兜底：各预处理方案在进程池中并行识别，置信命中即停止
+    timed_out = False
+    if not found or exhaustive:
+        try:
+            samples, ocr_hits, timed_out = await _scan_ocr(get_ocr_pool(), content, exhaustive, rects)
+        except OCRBusy as e:
+            raise HTTPException(status_code=503, detail=f"OCR 服务繁忙，请稍后重试（{e}）", headers={"Retry-After": "1"})
+        except BrokenProcessPool:
+            # 工作进程异常退出，进程池已丢弃，下个请求重建
+            raise HTTPException(status_code=503, detail="OCR 工作进程异常退出，请稍后重试。", headers={"Retry-After": "1"})
+        found += [n for n in ocr_hits if n not in found]
+
+    if not found and timed_out:
+        raise HTTPException(status_code=504, detail="OCR 识别超时，未能识别出 ISBN。")
     if not found:
         raise HTTPException(status_code=422, detail="未能从图片中识别出有效的 ISBN。请尝试更清晰的条形码或封面照片。")
     payload = OCRISBNResponse(text_samples=samples, isbns=found).model_dump()
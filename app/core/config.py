@@ -34,6 +34,69 @@ class AppSettings:
     isbndb_api_key: str | None
     worldcat_wskey: str | None
     kolisnet_service_key: str | None
+    # ISBN resolution
+    isbn_resolve_mode: str
+    isbn_fanout_width: int
+    isbn_hedge_delay: float
+    isbn_enrich_budget: float
+    isbn_enrich_max_sources: int
+    isbn_batch_concurrency: int
+    isbn_batch_max_size: int
+    # In-process L1 cache of resolved books (per worker)
+    isbn_l1_max_bytes: int
+    isbn_l1_max_item_bytes: int
+    isbn_l1_ttl: float
+    # Freshness of catalog entries (stale-while-revalidate + periodic refresh)
+    isbn_refresh_enabled: bool
+    isbn_refresh_ttl: int
+    isbn_refresh_source_ttls: str
+    isbn_refresh_interval: float
+    isbn_refresh_batch: int
+    isbn_refresh_concurrency: int
+    # Reject ISBNs outside the assigned ranges of the bundled RangeMessage table before querying upstream
+    isbn_range_check: bool
+    # Negative cache (Redis) for ISBNs no source could resolve
+    isbn_negative_ttl: int
+    isbn_negative_source_ttl: int
+    # Cross-worker single-flight lock for upstream resolution
+    isbn_singleflight_redis: bool
+    isbn_singleflight_lock_ttl: int
+    isbn_singleflight_poll_interval: float
+    # Source-health snapshot (rate-limit bans)
+    isbn_source_health_refresh_interval: float
+    isbn_source_health_max_age: float
+    # Per-source circuit breaker (per worker) and token bucket (shared via Redis)
+    isbn_breaker_window: int
+    isbn_breaker_min_calls: int
+    isbn_breaker_error_rate: float
+    isbn_breaker_slow_call_seconds: float
+    isbn_breaker_slow_call_rate: float
+    isbn_breaker_open_seconds: float
+    isbn_breaker_half_open_calls: int
+    isbn_source_rate_limits: str
+    isbn_rate_limit_max_wait: float
+    isbn_rate_limit_ban_seconds: int
+    # Latency/hit-rate aware source ordering
+    isbn_adaptive_order: bool
+    isbn_source_stats_window: int
+    isbn_source_stats_prior_weight: float
+    isbn_source_prior_latency: float
+    # Local catalog title search
+    title_search_local: bool
+    title_search_local_min_results: int
+    title_search_cache_results: bool
+    # Upstream HTTP connection pool (per host)
+    isbn_http_max_connections: int
+    isbn_http_max_keepalive: int
+    isbn_http_keepalive_expiry: float
+    isbn_http2: bool
+    # OCR process pool
+    ocr_workers: int
+    ocr_max_requests: int
+    ocr_timeout: float
+    ocr_max_side: int
+    ocr_upscale_max_side: int
+    ocr_locate_side: int
     # Qwen / DashScope (OpenAI-compatible)
     dashscope_api_key: str | None
     dashscope_base_url: str
@@ -89,6 +152,85 @@ def get_settings() -> AppSettings:
     worldcat_wskey = os.getenv("WORLDCAT_WSKEY")
     kolisnet_service_key = os.getenv("KOLISNET_SERVICE_KEY")
 
+    # ISBN resolution: sequential | parallel | hedged
+    isbn_resolve_mode = os.getenv("ISBN_RESOLVE_MODE", "sequential").strip().lower()
+    isbn_fanout_width = int(os.getenv("ISBN_FANOUT_WIDTH", "3"))
+    isbn_hedge_delay = float(os.getenv("ISBN_HEDGE_DELAY", "0.8"))
+    # Enrich mode: extra sources queried concurrently for fields the first hit lacks (seconds / count)
+    isbn_enrich_budget = float(os.getenv("ISBN_ENRICH_BUDGET", "2.0"))
+    isbn_enrich_max_sources = int(os.getenv("ISBN_ENRICH_MAX_SOURCES", "3"))
+    isbn_batch_concurrency = int(os.getenv("ISBN_BATCH_CONCURRENCY", "8"))
+    isbn_batch_max_size = int(os.getenv("ISBN_BATCH_MAX_SIZE", "500"))
+    # In-process L1 cache of resolved books (per worker); 0 disables it
+    isbn_l1_max_bytes = int(os.getenv("ISBN_L1_MAX_BYTES", str(32 * 1024 * 1024)))
+    isbn_l1_max_item_bytes = int(os.getenv("ISBN_L1_MAX_ITEM_BYTES", str(512 * 1024)))
+    isbn_l1_ttl = float(os.getenv("ISBN_L1_TTL", "600"))
+    # Catalog freshness: entries older than the source's TTL (seconds) are served and re-fetched in the
+    # background; "source=seconds,..." overrides the built-in per-source TTLs. The periodic job refreshes
+    # up to BATCH of the most-requested stale entries every INTERVAL seconds (0 disables it).
+    isbn_refresh_enabled = _parse_bool_env(os.getenv("ISBN_REFRESH_ENABLED"), True)
+    isbn_refresh_ttl = int(os.getenv("ISBN_REFRESH_TTL", str(30 * 86400)))
+    isbn_refresh_source_ttls = os.getenv("ISBN_REFRESH_SOURCE_TTLS", "")
+    isbn_refresh_interval = float(os.getenv("ISBN_REFRESH_INTERVAL", "600"))
+    isbn_refresh_batch = int(os.getenv("ISBN_REFRESH_BATCH", "50"))
+    isbn_refresh_concurrency = int(os.getenv("ISBN_REFRESH_CONCURRENCY", "4"))
+    # ISBNs with a bad check digit or an unassigned group/registrant range (app/utils/isbn_ranges.bin) are
+    # answered as not found without upstream calls; disable if the bundled range table is out of date
+    isbn_range_check = _parse_bool_env(os.getenv("ISBN_RANGE_CHECK"), True)
+    # Negative cache: whole-ISBN miss marker / per-source "not found" marker (seconds)
+    isbn_negative_ttl = int(os.getenv("ISBN_NEGATIVE_TTL", str(6 * 3600)))
+    isbn_negative_source_ttl = int(os.getenv("ISBN_NEGATIVE_SOURCE_TTL", str(3 * 86400)))
+    # Single-flight: in-process coalescing is always on; the Redis lock extends it across workers
+    isbn_singleflight_redis = _parse_bool_env(os.getenv("ISBN_SINGLEFLIGHT_REDIS"), False)
+    isbn_singleflight_lock_ttl = int(os.getenv("ISBN_SINGLEFLIGHT_LOCK_TTL", "15"))
+    isbn_singleflight_poll_interval = float(os.getenv("ISBN_SINGLEFLIGHT_POLL_INTERVAL", "0.2"))
+    # Source-health snapshot: background refresh interval / max age before an on-demand refresh
+    isbn_source_health_refresh_interval = float(os.getenv("ISBN_SOURCE_HEALTH_REFRESH_INTERVAL", "2"))
+    isbn_source_health_max_age = float(os.getenv("ISBN_SOURCE_HEALTH_MAX_AGE", "5"))
+    # Circuit breaker: sliding window of the last N calls per source; opens when the error
+    # rate or slow-call rate crosses its threshold, probes again after the open period
+    isbn_breaker_window = int(os.getenv("ISBN_BREAKER_WINDOW", "20"))
+    isbn_breaker_min_calls = int(os.getenv("ISBN_BREAKER_MIN_CALLS", "5"))
+    isbn_breaker_error_rate = float(os.getenv("ISBN_BREAKER_ERROR_RATE", "0.5"))
+    isbn_breaker_slow_call_seconds = float(os.getenv("ISBN_BREAKER_SLOW_CALL_SECONDS", "5"))
+    isbn_breaker_slow_call_rate = float(os.getenv("ISBN_BREAKER_SLOW_CALL_RATE", "0.8"))
+    isbn_breaker_open_seconds = float(os.getenv("ISBN_BREAKER_OPEN_SECONDS", "30"))
+    isbn_breaker_half_open_calls = int(os.getenv("ISBN_BREAKER_HALF_OPEN_CALLS", "2"))
+    # Token bucket overrides, e.g. "google_books=1/10,isbndb=1/1" (tokens per second / burst)
+    isbn_source_rate_limits = os.getenv("ISBN_SOURCE_RATE_LIMITS", "")
+    isbn_rate_limit_max_wait = float(os.getenv("ISBN_RATE_LIMIT_MAX_WAIT", "0.5"))
+    # Ban after an upstream 429/403 without a Retry-After header (seconds)
+    isbn_rate_limit_ban_seconds = int(os.getenv("ISBN_RATE_LIMIT_BAN_SECONDS", "3600"))
+    # Adaptive ordering: rank sources by p50 latency / hit rate (per ISBN registration group)
+    # over the last N calls, with the static priority lists as a prior worth N pseudo-calls
+    isbn_adaptive_order = _parse_bool_env(os.getenv("ISBN_ADAPTIVE_ORDER"), True)
+    isbn_source_stats_window = int(os.getenv("ISBN_SOURCE_STATS_WINDOW", "200"))
+    isbn_source_stats_prior_weight = float(os.getenv("ISBN_SOURCE_STATS_PRIOR_WEIGHT", "10"))
+    isbn_source_prior_latency = float(os.getenv("ISBN_SOURCE_PRIOR_LATENCY", "1.0"))
+    # Title search answers from the local catalog first; upstreams are queried only when it
+    # returns fewer than N matches. Upstream hits are added to the catalog for next time.
+    title_search_local = _parse_bool_env(os.getenv("TITLE_SEARCH_LOCAL"), True)
+    title_search_local_min_results = int(os.getenv("TITLE_SEARCH_LOCAL_MIN_RESULTS", "3"))
+    title_search_cache_results = _parse_bool_env(os.getenv("TITLE_SEARCH_CACHE_RESULTS"), True)
+    # Upstream HTTP connection pool (per host)
+    isbn_http_max_connections = int(os.getenv("ISBN_HTTP_MAX_CONNECTIONS", "20"))
+    isbn_http_max_keepalive = int(os.getenv("ISBN_HTTP_MAX_KEEPALIVE", "10"))
+    isbn_http_keepalive_expiry = float(os.getenv("ISBN_HTTP_KEEPALIVE_EXPIRY", "60"))
+    isbn_http2 = _parse_bool_env(os.getenv("ISBN_HTTP2"), True)
+    # OCR: Tesseract passes run in a pool of WORKERS processes (0 = one background thread);
+    # at most MAX_REQUESTS OCR requests are admitted per API worker, more get 503; TIMEOUT is
+    # the per-request OCR deadline in seconds
+    ocr_workers = int(os.getenv("OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+    ocr_max_requests = int(os.getenv("OCR_MAX_REQUESTS", str(2 * max(1, ocr_workers))))
+    ocr_timeout = float(os.getenv("OCR_TIMEOUT", "15"))
+    # Uploads are downscaled so the longest side is at most MAX_SIDE pixels before OCR (0 keeps the
+    # original size); the 1.5x/2x upscale variants only run on images no larger than UPSCALE_MAX_SIDE
+    ocr_max_side = int(os.getenv("OCR_MAX_SIDE", "2000"))
+    ocr_upscale_max_side = int(os.getenv("OCR_UPSCALE_MAX_SIDE", "1000"))
+    # A coarse pass at LOCATE_SIDE pixels finds the barcode / ISBN line so the variant sweep runs on
+    # those crops before the whole image (0 disables localization)
+    ocr_locate_side = int(os.getenv("OCR_LOCATE_SIDE", "1000"))
+
     # Qwen / DashScope (OpenAI compatible)
     dashscope_api_key = os.getenv("DASHSCOPE_API_KEY")
     dashscope_base_url = os.getenv(
@@ -160,4 +302,55 @@ def get_settings() -> AppSettings:
         isbndb_api_key=isbndb_api_key,
         worldcat_wskey=worldcat_wskey,
         kolisnet_service_key=kolisnet_service_key,
+        isbn_resolve_mode=isbn_resolve_mode,
+        isbn_fanout_width=isbn_fanout_width,
+        isbn_hedge_delay=isbn_hedge_delay,
+        isbn_enrich_budget=isbn_enrich_budget,
+        isbn_enrich_max_sources=isbn_enrich_max_sources,
+        isbn_batch_concurrency=isbn_batch_concurrency,
+        isbn_batch_max_size=isbn_batch_max_size,
+        isbn_l1_max_bytes=isbn_l1_max_bytes,
+        isbn_l1_max_item_bytes=isbn_l1_max_item_bytes,
+        isbn_l1_ttl=isbn_l1_ttl,
+        isbn_refresh_enabled=isbn_refresh_enabled,
+        isbn_refresh_ttl=isbn_refresh_ttl,
+        isbn_refresh_source_ttls=isbn_refresh_source_ttls,
+        isbn_refresh_interval=isbn_refresh_interval,
+        isbn_refresh_batch=isbn_refresh_batch,
+        isbn_refresh_concurrency=isbn_refresh_concurrency,
+        isbn_range_check=isbn_range_check,
+        isbn_negative_ttl=isbn_negative_ttl,
+        isbn_negative_source_ttl=isbn_negative_source_ttl,
+        isbn_singleflight_redis=isbn_singleflight_redis,
+        isbn_singleflight_lock_ttl=isbn_singleflight_lock_ttl,
+        isbn_singleflight_poll_interval=isbn_singleflight_poll_interval,
+        isbn_source_health_refresh_interval=isbn_source_health_refresh_interval,
+        isbn_source_health_max_age=isbn_source_health_max_age,
+        isbn_breaker_window=isbn_breaker_window,
+        isbn_breaker_min_calls=isbn_breaker_min_calls,
+        isbn_breaker_error_rate=isbn_breaker_error_rate,
+        isbn_breaker_slow_call_seconds=isbn_breaker_slow_call_seconds,
+        isbn_breaker_slow_call_rate=isbn_breaker_slow_call_rate,
+        isbn_breaker_open_seconds=isbn_breaker_open_seconds,
+        isbn_breaker_half_open_calls=isbn_breaker_half_open_calls,
+        isbn_source_rate_limits=isbn_source_rate_limits,
+        isbn_rate_limit_max_wait=isbn_rate_limit_max_wait,
+        isbn_rate_limit_ban_seconds=isbn_rate_limit_ban_seconds,
+        isbn_adaptive_order=isbn_adaptive_order,
+        isbn_source_stats_window=isbn_source_stats_window,
+        isbn_source_stats_prior_weight=isbn_source_stats_prior_weight,
+        isbn_source_prior_latency=isbn_source_prior_latency,
+        title_search_local=title_search_local,
+        title_search_local_min_results=title_search_local_min_results,
+        title_search_cache_results=title_search_cache_results,
+        isbn_http_max_connections=isbn_http_max_connections,
+        isbn_http_max_keepalive=isbn_http_max_keepalive,
+        isbn_http_keepalive_expiry=isbn_http_keepalive_expiry,
+        isbn_http2=isbn_http2,
+        ocr_workers=ocr_workers,
+        ocr_max_requests=ocr_max_requests,
+        ocr_timeout=ocr_timeout,
+        ocr_max_side=ocr_max_side,
+        ocr_upscale_max_side=ocr_upscale_max_side,
+        ocr_locate_side=ocr_locate_side,
     )
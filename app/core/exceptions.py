@@ -25,7 +25,7 @@ async def http_error_handler(_: Request, exc: StarletteHTTPException):
     else:
         code = "http_error"
     error = ErrorResponse(error=ErrorDetail(code=code, message=str(exc)))
-    return JSONResponse(status_code=status, content=error.model_dump())
+    return JSONResponse(status_code=status, content=error.model_dump(), headers=getattr(exc, "headers", None))
 
 
 async def http_500_handler(_: Request, exc):  # type: ignore[no-untyped-def]
@@ -1,5 +1,7 @@
 # app/main.py
 
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
@@ -9,12 +11,43 @@ from app.core.exceptions import http_422_handler, http_error_handler, http_500_h
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
+from app.services.isbn import catalog as isbn_catalog
+from app.services.isbn import client_base as isbn_http
+from app.services.isbn import manager as isbn_manager
+from app.services.isbn.refresh import get_catalog_refresher
+from app.services.isbn.source_health import get_source_health
+from app.services.mongo_client import aclose_async_client as aclose_async_mongo
+from app.services.ocr import get_ocr_pool
+from app.services.redis_client import get_redis_service
+
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 后台定期批量刷新各来源的限流状态
+    get_source_health().start()
+    # 本地书目索引（已存在时为空操作）
+    await isbn_catalog.ensure_indexes()
+    # 定期刷新最常被请求且已过期的书目条目
+    if settings.isbn_refresh_enabled:
+        get_catalog_refresher().start(isbn_manager.refresh_book)
+    yield
+    await get_source_health().stop()
+    await get_catalog_refresher().stop()
+    # 停止 OCR 工作进程
+    get_ocr_pool().shutdown()
+    # 关闭 ISBN 上游的共享连接池及异步 Mongo/Redis 客户端
+    await isbn_http.aclose_clients()
+    await aclose_async_mongo()
+    await get_redis_service().aclose()
+
+
 app = FastAPI(
     title=settings.app_name,
     version=settings.version,
+    lifespan=lifespan,
 )
 
 # Force OpenAPI 3.0.3 schema
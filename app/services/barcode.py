@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List
+from typing import List, Tuple
 
 import io
 from PIL import Image  # type: ignore
@@ -8,21 +8,25 @@ from PIL import Image  # type: ignore
 from app.utils.isbn import is_valid_isbn13
 
 
-def decode_isbn_from_image_bytes(content: bytes) -> List[str]:
+def scan_barcodes(content: bytes) -> Tuple[List[str], List[Tuple[int, int, int, int]]]:
     """
-    Try to decode barcodes (EAN-13) from image bytes and return valid ISBN-13 strings.
-    Uses pyzbar if available; falls back to empty list if not installed.
+    Decode every barcode in the image bytes once and return the valid ISBN-13 strings
+    (EAN-13) together with the (left, top, width, height) of all barcodes found,
+    decodable as an ISBN or not, so OCR localization can reuse them.
+    Uses pyzbar if available; returns empty lists if not installed.
     """
     try:
         import importlib
         pyzbar = importlib.import_module("pyzbar.pyzbar")  # type: ignore
     except Exception:
-        return []
+        return [], []
 
     image = Image.open(io.BytesIO(content))
     results = []
+    rects = []
     seen = set()
     for obj in pyzbar.decode(image):  # type: ignore[attr-defined]
+        rects.append(tuple(obj.rect))
         data = obj.data.decode("utf-8", errors="ignore").strip()
         # Many ISBN barcodes are EAN-13 and begin with 978/979
         digits = "".join(ch for ch in data if ch.isdigit())
@@ -30,4 +34,26 @@ def decode_isbn_from_image_bytes(content: bytes) -> List[str]:
             if digits not in seen:
                 seen.add(digits)
                 results.append(digits)
-    return results
+    return results, rects
+
+
+def decode_isbn_from_image_bytes(content: bytes) -> List[str]:
+    """
+    Try to decode barcodes (EAN-13) from image bytes and return valid ISBN-13 strings.
+    Uses pyzbar if available; falls back to empty list if not installed.
+    """
+    return scan_barcodes(content)[0]
+
+
+def locate_barcodes(image: Image.Image) -> List[Tuple[int, int, int, int]]:
+    """
+    Return (left, top, width, height) of every barcode pyzbar finds in the image,
+    decodable as an ISBN or not (e.g. a smudged EAN-13 or its price add-on).
+    Returns an empty list if pyzbar is not installed.
+    """
+    try:
+        import importlib
+        pyzbar = importlib.import_module("pyzbar.pyzbar")  # type: ignore
+    except Exception:
+        return []
+    return [tuple(obj.rect) for obj in pyzbar.decode(image)]  # type: ignore[attr-defined,misc]
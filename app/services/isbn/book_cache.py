@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.services.isbn.types import NormalizedBook
+
+
+class BookCache:
+    """
+    Per-worker LRU + TTL cache of NormalizedBook docs, sitting in front of the
+    Mongo `books` collection. Capacity is bounded by the approximate serialized
+    size of the docs (the `raw` payload can be large), not by item count.
+    Each entry keeps the doc's catalog fetched_at, so L1 hits can be checked
+    for staleness like catalog hits. Cached docs are shared between callers
+    and must be treated as read-only.
+    """
+
+    def __init__(self, max_bytes: int, ttl_seconds: float, max_item_bytes: Optional[int] = None) -> None:
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.max_item_bytes = max_item_bytes or max_bytes
+        self._items: "OrderedDict[str, Tuple[float, int, NormalizedBook, Optional[datetime]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _sizeof(doc: NormalizedBook) -> int:
+        return len(json.dumps(doc, ensure_ascii=False, default=str).encode("utf-8"))
+
+    def get(self, isbn: str) -> Optional[NormalizedBook]:
+        entry = self.get_entry(isbn)
+        return entry[0] if entry else None
+
+    def get_entry(self, isbn: str) -> Optional[Tuple[NormalizedBook, Optional[datetime]]]:
+        """返回 (doc, fetched_at)。"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._items.get(isbn)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, size, doc, fetched_at = entry
+            if expires_at <= now:
+                self._drop(isbn)
+                self.misses += 1
+                return None
+            self._items.move_to_end(isbn)
+            self.hits += 1
+            return doc, fetched_at
+
+    def put(self, isbn: str, doc: NormalizedBook, fetched_at: Optional[datetime] = None) -> None:
+        if self.max_bytes <= 0:
+            return
+        size = self._sizeof(doc)
+        with self._lock:
+            self._drop(isbn)
+            if size > self.max_item_bytes:
+                return
+            self._items[isbn] = (time.monotonic() + self.ttl_seconds, size, doc, fetched_at)
+            self._bytes += size
+            while self._bytes > self.max_bytes and self._items:
+                oldest = next(iter(self._items))
+                self._drop(oldest)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "items": len(self._items),
+                "bytes": self._bytes,
+                "maxBytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _drop(self, isbn: str) -> None:
+        entry = self._items.pop(isbn, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+
+@lru_cache(maxsize=1)
+def get_book_cache() -> BookCache:
+    s = get_settings()
+    return BookCache(
+        max_bytes=s.isbn_l1_max_bytes,
+        ttl_seconds=s.isbn_l1_ttl,
+        max_item_bytes=s.isbn_l1_max_item_bytes,
+    )
@@ -2,43 +2,38 @@ from __future__ import annotations
 
 from typing import Any, Dict
 
-from app.services.isbn.client_base import HttpClient, RateLimitError, HttpError
+import httpx
+
+from app.services.isbn import SOURCE_BRITISH_LIBRARY, sru
+from app.services.isbn.client_base import AsyncHttpClient, check_response
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
-    # British Library SRU (XML)
-    client = HttpClient(base_url="https://sru.bl.uk", timeout=timeout)
-    r = client.get("/SRU", params={
+BASE_URL = "https://sru.bl.uk"
+
+
+def _params(isbn: str) -> Dict[str, Any]:
+    return {
         "operation": "searchRetrieve",
         "version": "1.2",
         "query": f"isbn=\"{isbn}\"",
         "maximumRecords": 1,
         "recordSchema": "mods",
-    })
-    if r.status_code in (403, 429):
-        client.close()
-        raise RateLimitError("british_library rate limited")
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
-    xml = r.text
-    book: NormalizedBook = {
-        "source": "british_library",
-        "isbn": isbn,
-        "title": None,
-        "subtitle": None,
-        "creators": [],
-        "publisher": None,
-        "published_date": None,
-        "language": "en",
-        "subjects": [],
-        "description": None,
-        "page_count": None,
-        "identifiers": {},
-        "cover": {},
-        "preview_urls": [],
-        "raw": {"xml": xml},
     }
-    client.close()
+
+
+def _parse_isbn(isbn: str, r: httpx.Response) -> NormalizedBook:
+    check_response(r, SOURCE_BRITISH_LIBRARY)
+    records = sru.parse_response(r.content, sru.SCHEMA_MODS, source=SOURCE_BRITISH_LIBRARY)
+    book = sru.pick(records, isbn) or sru.empty_book(SOURCE_BRITISH_LIBRARY, isbn)
+    book["isbn"] = isbn
+    book["language"] = book.get("language") or "en"
+    book["raw"] = {"xml": r.text}
     return book
+
+
+async def fetch_by_isbn_async(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
+    # British Library SRU (XML)
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/SRU", params=_params(isbn))
+    return _parse_isbn(isbn, r)
@@ -0,0 +1,272 @@
+from __future__ import annotations
+
+import json
+import logging
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import Binary
+from pymongo import ASCENDING, IndexModel, UpdateOne
+
+from app.services.mongo_client import get_async_database
+from app.services.isbn.types import NormalizedBook
+from app.utils.isbn import to_isbn10, to_isbn13
+from app.utils.text_similarity import TitleMatcher, normalize_text, title_tokens
+
+
+logger = logging.getLogger(__name__)
+
+BOOKS = "books"
+# 上游原始响应（zlib 压缩的 JSON），与 books 同主键；books 文档本身不含 raw
+BOOKS_RAW = "books_raw"
+
+# books 集合的二级索引（见 docs/isbn_api/database_design.md）
+INDEXES = [
+    IndexModel([("identifier.isbn_13", ASCENDING)], name="isbn_13", unique=True, sparse=True),
+    IndexModel([("identifier.isbn_10", ASCENDING)], name="isbn_10", sparse=True),
+    IndexModel([("title_normalized", ASCENDING)], name="title_normalized"),
+    IndexModel([("title_tokens", ASCENDING)], name="title_tokens"),
+    IndexModel([("creators.name", ASCENDING)], name="creators"),
+    IndexModel([("publisher", ASCENDING)], name="publisher"),
+    IndexModel([("source", ASCENDING)], name="source"),
+]
+
+# 本地书名检索时参与打分的候选上限
+SEARCH_CANDIDATES = 2000
+
+# 高频虚词：查询含其他词时不用于倒排检索（仍参与相似度计算）
+_STOPWORDS = {"a", "an", "the", "of", "and", "to", "in", "on", "for", "de", "la", "le", "der", "die", "das", "の"}
+
+# 直接以 Dublin Core 字段名平铺存储的 NormalizedBook 字段
+_BOOK_FIELDS = (
+    "title",
+    "subtitle",
+    "creators",
+    "publisher",
+    "published_date",
+    "language",
+    "subjects",
+    "description",
+    "page_count",
+    "cover",
+    "preview_urls",
+    "source",
+    "sources",
+    "provenance",
+)
+
+
+def catalog_key(isbn: str) -> str:
+    """目录主键：合法 ISBN 一律转为 ISBN-13，ISBN-10 与 ISBN-13 查询同一条记录。"""
+    return to_isbn13(isbn) or isbn
+
+
+def book_isbn13(doc: NormalizedBook) -> Optional[str]:
+    """文档的 ISBN-13：依次取 identifiers.isbn_13 / identifiers.isbn_10 / isbn 中首个合法值。"""
+    ids = doc.get("identifiers") or {}
+    return next((k for k in map(to_isbn13, filter(None, (ids.get("isbn_13"), ids.get("isbn_10"), doc.get("isbn")))) if k), None)
+
+
+def without_raw(doc: NormalizedBook) -> NormalizedBook:
+    """去掉上游原始响应 raw（不修改传入的文档）。"""
+    if "raw" not in doc:
+        return doc
+    return {k: v for k, v in doc.items() if k != "raw"}  # type: ignore[return-value]
+
+
+def to_catalog_doc(doc: NormalizedBook) -> Optional[Dict[str, Any]]:
+    """NormalizedBook → books 集合文档（不含 raw 与 created_at/updated_at）；无可用 ISBN 返回 None。"""
+    ids = doc.get("identifiers") or {}
+    isbn13 = book_isbn13(doc)
+    if isbn13 is None:
+        return None
+    row: Dict[str, Any] = {field: doc[field] for field in _BOOK_FIELDS if field in doc}
+    # 其他标识（openlibrary、lccn、oclc ...）按名称保存，读取时并回 identifiers
+    other = {k: v for k, v in ids.items() if k not in ("isbn_13", "isbn_10") and v}
+    row.update(
+        {
+            "_id": isbn13,
+            "identifier": {"isbn_13": isbn13, "isbn_10": to_isbn10(isbn13), "other": other},
+            "title_normalized": normalize_text(doc.get("title")) or None,
+            "title_tokens": title_tokens(doc.get("title")),
+        }
+    )
+    return row
+
+
+def from_catalog_doc(row: Dict[str, Any]) -> Optional[NormalizedBook]:
+    """books 集合文档 → NormalizedBook；兼容旧格式 {"_id": isbn, "lastFetched": {...}}。"""
+    if "identifier" not in row:
+        legacy = row.get("lastFetched")
+        return without_raw(legacy) if legacy else legacy
+    ident = row["identifier"]
+    book: NormalizedBook = {field: row[field] for field in _BOOK_FIELDS if field in row}  # type: ignore[assignment]
+    book["isbn"] = ident.get("isbn_13") or row["_id"]
+    # 早期记录的 other 为不带名称的列表，无法还原，忽略
+    other = ident.get("other")
+    book["identifiers"] = dict(other) if isinstance(other, dict) else {}
+    book["identifiers"].update((k, v) for k, v in (("isbn_13", ident.get("isbn_13")), ("isbn_10", ident.get("isbn_10"))) if v)
+    return book
+
+
+def fetched_at(row: Dict[str, Any]) -> Optional[datetime]:
+    """记录最近一次从上游取得的时间（UTC）；早期记录退化为 updated_at，旧格式记录返回 None。"""
+    value = row.get("fetched_at") or row.get("updated_at")
+    if not isinstance(value, datetime):
+        return None
+    # Mongo 默认返回不带时区的 UTC 时间
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def _update(row: Dict[str, Any], overwrite: bool) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    if overwrite:
+        # 整条替换书目字段：新结果中没有的字段（如上次补全的 sources/provenance）一并清除
+        # raw 一律移出（旧记录内嵌的原始响应改存 books_raw）
+        unset = {field: "" for field in ("lastFetched", "raw", *_BOOK_FIELDS) if field not in row}
+        return {"$set": {**row, "updated_at": now, "fetched_at": now}, "$setOnInsert": {"created_at": now}, "$unset": unset}
+    return {"$setOnInsert": {**row, "created_at": now, "updated_at": now, "fetched_at": now}}
+
+
+def _update_fields(row: Dict[str, Any], fields: Iterable[str]) -> Dict[str, Any]:
+    # 只改写给定字段（及由其派生的索引字段），不更新 fetched_at
+    keys = {*fields, "identifier"}
+    if "title" in keys:
+        keys |= {"title_normalized", "title_tokens"}
+    return {"$set": {**{k: row[k] for k in keys if k in row}, "updated_at": datetime.now(timezone.utc)}}
+
+
+def upsert_op(doc: NormalizedBook, *, overwrite: bool = True) -> Optional[UpdateOne]:
+    """构造单条 upsert；overwrite=False 时只插入新书，不覆盖已有记录（用于导入离线数据）。"""
+    row = to_catalog_doc(doc)
+    if row is None:
+        return None
+    key = row.pop("_id")
+    return UpdateOne({"_id": key}, _update(row, overwrite), upsert=True)
+
+
+def encode_raw(raw: Any) -> Binary:
+    return Binary(zlib.compress(json.dumps(raw, ensure_ascii=False, default=str).encode("utf-8")))
+
+
+def decode_raw(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def _raw_update(doc: NormalizedBook, overwrite: bool) -> Optional[Tuple[str, Dict[str, Any]]]:
+    # 文档不带 raw 或无可用 ISBN 时不写（已存的原始响应保持不变）
+    key = book_isbn13(doc) if doc.get("raw") is not None else None
+    if key is None:
+        return None
+    row = {"source": doc.get("source"), "data": encode_raw(doc["raw"]), "fetched_at": datetime.now(timezone.utc)}
+    return key, {"$set" if overwrite else "$setOnInsert": row}
+
+
+def raw_op(doc: NormalizedBook, *, overwrite: bool = True) -> Optional[UpdateOne]:
+    """books_raw 的 upsert；文档不带 raw 时返回 None。"""
+    update = _raw_update(doc, overwrite)
+    return UpdateOne({"_id": update[0]}, update[1], upsert=True) if update else None
+
+
+async def ensure_indexes() -> None:
+    try:
+        await get_async_database()[BOOKS].create_indexes(INDEXES)
+    except Exception as e:
+        logger.warning(f"failed to create book catalog indexes: {e}")
+
+
+async def find_entry(isbn: str) -> Optional[Tuple[NormalizedBook, Optional[datetime]]]:
+    """按 ISBN 查询，返回 (doc, fetched_at)。"""
+    row = await get_async_database()[BOOKS].find_one({"_id": catalog_key(isbn)})
+    doc = from_catalog_doc(row) if row else None
+    return (doc, fetched_at(row)) if doc else None
+
+
+async def find_entries(isbns: Iterable[str]) -> Dict[str, Tuple[NormalizedBook, Optional[datetime]]]:
+    """一次 $in 查询多个 ISBN，返回 {传入的 isbn: (doc, fetched_at)}。"""
+    keys: Dict[str, List[str]] = {}
+    for isbn in isbns:
+        keys.setdefault(catalog_key(isbn), []).append(isbn)
+    if not keys:
+        return {}
+    found: Dict[str, Tuple[NormalizedBook, Optional[datetime]]] = {}
+    async for row in get_async_database()[BOOKS].find({"_id": {"$in": list(keys)}}):
+        doc = from_catalog_doc(row)
+        if doc:
+            for isbn in keys.get(row["_id"], ()):
+                found[isbn] = (doc, fetched_at(row))
+    return found
+
+
+async def upsert_book(doc: NormalizedBook) -> Optional[str]:
+    """写入/更新一本书，返回目录主键（ISBN-13）；无可用 ISBN 时不写入。"""
+    row = to_catalog_doc(doc)
+    if row is None:
+        return None
+    key = row.pop("_id")
+    db = get_async_database()
+    await db[BOOKS].update_one({"_id": key}, _update(row, True), upsert=True)
+    raw = _raw_update(doc, True)
+    if raw is not None:
+        await db[BOOKS_RAW].update_one({"_id": raw[0]}, raw[1], upsert=True)
+    return key
+
+
+async def update_book_fields(doc: NormalizedBook, fields: Iterable[str]) -> Optional[str]:
+    """只改写已有记录的部分书目字段（如补全得到的字段与 sources/provenance），其余字段与 fetched_at 保持不变。"""
+    row = to_catalog_doc(doc)
+    if row is None:
+        return None
+    key = row.pop("_id")
+    await get_async_database()[BOOKS].update_one({"_id": key}, _update_fields(row, fields))
+    return key
+
+
+async def upsert_books(docs: Iterable[NormalizedBook], *, overwrite: bool = True) -> None:
+    docs = list(docs)
+    db = get_async_database()
+    ops = [op for op in (upsert_op(doc, overwrite=overwrite) for doc in docs) if op is not None]
+    if ops:
+        await db[BOOKS].bulk_write(ops, ordered=False)
+    raw_ops = [op for op in (raw_op(doc, overwrite=overwrite) for doc in docs) if op is not None]
+    if raw_ops:
+        await db[BOOKS_RAW].bulk_write(raw_ops, ordered=False)
+
+
+async def find_raw(isbn: str) -> Optional[Any]:
+    """取回上游原始响应；兼容 raw 仍内嵌在 books 文档中的旧记录。"""
+    key = catalog_key(isbn)
+    db = get_async_database()
+    row = await db[BOOKS_RAW].find_one({"_id": key})
+    if row and row.get("data") is not None:
+        return decode_raw(row["data"])
+    legacy = await db[BOOKS].find_one({"_id": key}, {"raw": 1, "lastFetched.raw": 1})
+    if not legacy:
+        return None
+    return legacy.get("raw", (legacy.get("lastFetched") or {}).get("raw"))
+
+
+async def search_title(title: str, *, limit: int = 10, min_similarity: float = 0.5) -> List[NormalizedBook]:
+    """本地书名检索：title_tokens 倒排索引取候选，TitleMatcher 批量打分排序。
+
+    候选按共享词数在 Mongo 端排序截断（至多 SEARCH_CANDIDATES 条，只取书名），打分后再按 _id 取回入选的完整文档。
+    """
+    tokens = title_tokens(title)
+    if not tokens:
+        return []
+    lookup = [t for t in tokens if t not in _STOPWORDS] or tokens
+    pipeline = [
+        {"$match": {"title_tokens": {"$in": lookup}}},
+        {"$project": {"title": 1, "_overlap": {"$size": {"$setIntersection": ["$title_tokens", tokens]}}}},
+        {"$sort": {"_overlap": -1}},
+        {"$limit": SEARCH_CANDIDATES},
+    ]
+    db = get_async_database()
+    candidates = [row async for row in await db[BOOKS].aggregate(pipeline)]
+    ranked = TitleMatcher(title).rank(candidates, min_similarity)[:limit]
+    if not ranked:
+        return []
+    ids = [row["_id"] for _, row in ranked]
+    rows = {row["_id"]: row async for row in db[BOOKS].find({"_id": {"$in": ids}}, {"raw": 0})}
+    return [doc for doc in (from_catalog_doc(rows[i]) for i in ids if i in rows) if doc]
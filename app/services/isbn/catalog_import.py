@@ -0,0 +1,226 @@
+"""
+Bulk import of Open Library dumps into the local book catalog (`books`).
+
+Dump files (https://openlibrary.org/developers/dumps) are tab separated:
+type, key, revision, last_modified, JSON. Both the editions dump and the
+mixed full dump are accepted (non-edition rows are skipped); `.gz` files are
+decompressed on the fly, so nothing is loaded into memory beyond one batch.
+Author names are resolved from an optional authors dump; without it the
+edition's `by_statement` is used.
+
+Existing catalog entries (e.g. fetched from upstream sources) are kept unless
+`--overwrite` is given. `--reindex` rewrites entries stored before the title
+index existed (including legacy `{_id, lastFetched}` rows) so that they are
+found by the local title search, and moves upstream payloads still embedded
+in `books` into the compressed `books_raw` collection.
+
+Run: python -m app.services.isbn.catalog_import ol_dump_editions_latest.txt.gz --authors ol_dump_authors_latest.txt.gz
+     python -m app.services.isbn.catalog_import --reindex
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import io
+import json
+import logging
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO
+
+from pymongo import DeleteOne
+from pymongo.errors import BulkWriteError
+
+from app.services.mongo_client import get_database
+from app.services.isbn import SOURCE_OPEN_LIBRARY
+from app.services.isbn import catalog
+from app.services.isbn.types import NormalizedBook
+from app.utils.isbn import to_isbn13
+
+
+logger = logging.getLogger(__name__)
+
+COVER_URL = "https://covers.openlibrary.org/b/id/{id}-{size}.jpg"
+OPEN_LIBRARY_URL = "https://openlibrary.org"
+
+
+def _open(path: str) -> TextIO:
+    if path.endswith(".gz"):
+        return io.TextIOWrapper(gzip.open(path, "rb"), encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def iter_dump(path: str, record_type: str) -> Iterator[Dict[str, Any]]:
+    """逐行流式读取 dump，产出指定类型（如 /type/edition）的 JSON 记录。"""
+    with _open(path) as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t", 4)
+            if len(parts) != 5 or parts[0] != record_type:
+                continue
+            try:
+                yield json.loads(parts[4])
+            except ValueError:
+                logger.warning(f"skipping malformed dump row {parts[1]}")
+
+
+def load_author_names(path: str) -> Dict[str, str]:
+    return {rec["key"]: rec["name"] for rec in iter_dump(path, "/type/author") if rec.get("key") and rec.get("name")}
+
+
+def _text(value: Any) -> Optional[str]:
+    # description/notes 可能是字符串或 {"type": "/type/text", "value": ...}
+    if isinstance(value, dict):
+        value = value.get("value")
+    return value if isinstance(value, str) and value else None
+
+
+def edition_to_books(record: Dict[str, Any], author_names: Optional[Dict[str, str]] = None) -> List[NormalizedBook]:
+    """一条 edition 记录 → 每个不同 ISBN-13 一本 NormalizedBook（同一版次常同时登记 ISBN-10 与 ISBN-13）。"""
+    isbns = [to_isbn13(i) for i in (record.get("isbn_13") or []) + (record.get("isbn_10") or []) if isinstance(i, str)]
+    isbns = list(dict.fromkeys(i for i in isbns if i))
+    if not isbns or not record.get("title"):
+        return []
+
+    names = author_names or {}
+    creators = [
+        {"name": names[a["key"]], "role": None}
+        for a in (record.get("authors") or [])
+        if isinstance(a, dict) and a.get("key") in names
+    ]
+    if not creators and record.get("by_statement"):
+        creators = [{"name": record["by_statement"], "role": None}]
+    covers = [c for c in (record.get("covers") or []) if isinstance(c, int) and c > 0]
+    languages = [lang.get("key", "").rsplit("/", 1)[-1] for lang in (record.get("languages") or []) if isinstance(lang, dict)]
+
+    books: List[NormalizedBook] = []
+    for isbn in isbns:
+        books.append(
+            {
+                "source": SOURCE_OPEN_LIBRARY,
+                "isbn": isbn,
+                "title": record["title"],
+                "subtitle": record.get("subtitle"),
+                "creators": creators,
+                "publisher": (record.get("publishers") or [None])[0],
+                "published_date": record.get("publish_date"),
+                "language": languages[0] if languages else None,
+                "subjects": [s for s in (record.get("subjects") or []) if isinstance(s, str)],
+                "description": _text(record.get("description")),
+                "page_count": record.get("number_of_pages"),
+                "identifiers": {"isbn_13": isbn, "openlibrary": record.get("key")},
+                "cover": {"url": COVER_URL.format(id=covers[0], size="L"), "thumbnail": COVER_URL.format(id=covers[0], size="M")} if covers else {},
+                "preview_urls": [OPEN_LIBRARY_URL + record["key"]] if record.get("key") else [],
+            }
+        )
+    return books
+
+
+def import_ol_dump(
+    path: str,
+    *,
+    authors_path: Optional[str] = None,
+    batch_size: int = 1000,
+    overwrite: bool = False,
+    limit: Optional[int] = None,
+) -> Dict[str, int]:
+    """流式导入 editions dump，每 batch_size 条一次无序 bulk_write；返回计数。"""
+    coll = get_database()[catalog.BOOKS]
+    coll.create_indexes(catalog.INDEXES)
+    author_names = load_author_names(authors_path) if authors_path else None
+
+    counts = {"editions": 0, "books": 0, "upserted": 0, "errors": 0}
+    ops = []
+
+    def flush() -> None:
+        if not ops:
+            return
+        try:
+            result = coll.bulk_write(ops, ordered=False)
+            counts["upserted"] += result.upserted_count
+        except BulkWriteError as e:
+            # 无序写入：个别失败（如 ISBN 冲突）不影响同批其余文档
+            counts["upserted"] += e.details.get("nUpserted", 0)
+            counts["errors"] += len(e.details.get("writeErrors", []))
+        ops.clear()
+
+    for record in iter_dump(path, "/type/edition"):
+        counts["editions"] += 1
+        for book in edition_to_books(record, author_names):
+            op = catalog.upsert_op(book, overwrite=overwrite)
+            if op is not None:
+                ops.append(op)
+                counts["books"] += 1
+        if len(ops) >= batch_size:
+            flush()
+        if limit and counts["editions"] >= limit:
+            break
+    flush()
+    return counts
+
+
+def reindex_titles(*, batch_size: int = 1000) -> int:
+    """为缺少 title_tokens 的记录（旧格式或早期写入）补建书名索引字段，并将内嵌的 raw 移入 books_raw；返回处理条数。"""
+    db = get_database()
+    coll = db[catalog.BOOKS]
+    coll.create_indexes(catalog.INDEXES)
+    done = 0
+    ops = []
+    raw_ops = []
+
+    def flush() -> None:
+        # 先写原始响应，再改写 books（改写会移除内嵌的 raw）
+        if raw_ops:
+            db[catalog.BOOKS_RAW].bulk_write(raw_ops, ordered=False)
+            raw_ops.clear()
+        if ops:
+            coll.bulk_write(ops, ordered=True)
+            ops.clear()
+
+    for row in coll.find({"$or": [{"title_tokens": {"$exists": False}}, {"raw": {"$exists": True}}]}):
+        doc = catalog.from_catalog_doc(row)
+        new = catalog.to_catalog_doc(doc) if doc else None
+        if new is None:
+            continue
+        # 旧记录可能以 ISBN-10 为主键：改写到 ISBN-13 主键后删除原记录；
+        # 同一本书已有 ISBN-13 记录时以其为准（只插入不覆盖），原地补建索引字段时才整条改写
+        rekey = new["_id"] != row["_id"]
+        ops.append(catalog.upsert_op(doc, overwrite=not rekey))
+        raw = row.get("raw", (row.get("lastFetched") or {}).get("raw"))
+        op = catalog.raw_op({**doc, "raw": raw}, overwrite=False)
+        if op is not None:
+            raw_ops.append(op)
+        if rekey:
+            ops.append(DeleteOne({"_id": row["_id"]}))
+        done += 1
+        if len(ops) >= batch_size:
+            flush()
+    flush()
+    return done
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("editions", nargs="?", help="ol_dump_editions_*.txt(.gz) or the mixed ol_dump_*.txt(.gz)")
+    parser.add_argument("--authors", help="ol_dump_authors_*.txt(.gz) for author names")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--overwrite", action="store_true", help="replace existing catalog entries")
+    parser.add_argument("--limit", type=int, help="stop after N editions")
+    parser.add_argument("--reindex", action="store_true", help="backfill title index fields of existing entries and move embedded raw payloads to books_raw")
+    args = parser.parse_args()
+    if not args.editions and not args.reindex:
+        parser.error("an editions dump or --reindex is required")
+
+    logging.basicConfig(level=logging.INFO)
+    started = time.perf_counter()
+    if args.reindex:
+        print(f"reindexed {reindex_titles(batch_size=args.batch_size)} entries in {time.perf_counter() - started:.1f}s")
+        if not args.editions:
+            return
+        started = time.perf_counter()
+    counts = import_ol_dump(args.editions, authors_path=args.authors, batch_size=args.batch_size, overwrite=args.overwrite, limit=args.limit)
+    elapsed = time.perf_counter() - started
+    print(f"{counts['editions']} editions, {counts['books']} books, {counts['upserted']} new, {counts['errors']} errors in {elapsed:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
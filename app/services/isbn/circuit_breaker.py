@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, Tuple
+
+from app.core.config import get_settings
+
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Per-source circuit breaker (per worker).
+
+    closed:    calls flow; the outcome and latency of the last `window` calls are
+               kept, and the breaker opens once at least `min_calls` were seen and
+               the error rate or the slow-call rate crosses its threshold.
+    open:      calls are rejected for `open_seconds`.
+    half_open: up to `half_open_calls` probe calls are let through; all of them
+               succeeding closes the breaker, any failure opens it again.
+
+    "Not found" answers are successes: the source is healthy, it just has no
+    record. Only exceptions and timeouts count as errors.
+    """
+
+    def __init__(
+        self,
+        *,
+        window: int,
+        min_calls: int,
+        error_rate: float,
+        slow_call_seconds: float,
+        slow_call_rate: float,
+        open_seconds: float,
+        half_open_calls: int,
+    ) -> None:
+        self.window = max(1, window)
+        self.min_calls = max(1, min_calls)
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        self._calls: Deque[Tuple[bool, bool]] = deque(maxlen=self.window)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._open_for = open_seconds
+        self._probes = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def _maybe_half_open(self) -> None:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self._open_for:
+            self._state = HALF_OPEN
+            self._probes = 0
+            self._probe_successes = 0
+
+    def is_available(self) -> bool:
+        """不占用探测名额的可用性判断，用于来源排序/筛选。"""
+        with self._lock:
+            self._maybe_half_open()
+            return self._state == CLOSED or (self._state == HALF_OPEN and self._probes < self.half_open_calls)
+
+    def allow(self) -> bool:
+        """调用前获取许可；half_open 时占用一个探测名额。"""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == CLOSED:
+                return True
+            if self._state == HALF_OPEN and self._probes < self.half_open_calls:
+                self._probes += 1
+                return True
+            return False
+
+    def release(self) -> None:
+        """许可未产生结果（调用被取消/未发出）时归还探测名额。"""
+        with self._lock:
+            if self._state == HALF_OPEN and self._probes > 0:
+                self._probes -= 1
+
+    def record_success(self, elapsed: float) -> None:
+        with self._lock:
+            slow = elapsed >= self.slow_call_seconds
+            if self._state == HALF_OPEN:
+                if slow:
+                    self._open(self.open_seconds)
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_calls:
+                    self._state = CLOSED
+                    self._calls.clear()
+                return
+            self._calls.append((False, slow))
+            self._evaluate()
+
+    def record_failure(self, elapsed: float = 0.0) -> None:
+        with self._lock:
+            if self._state == HALF_OPEN:
+                self._open(self.open_seconds)
+                return
+            self._calls.append((True, elapsed >= self.slow_call_seconds))
+            self._evaluate()
+
+    def trip(self, open_seconds: float | None = None) -> None:
+        """立即打开（如上游明确限流），open_seconds 缺省为配置的打开时长。"""
+        with self._lock:
+            self._open(self.open_seconds if open_seconds is None else open_seconds)
+
+    def _evaluate(self) -> None:
+        if self._state != CLOSED or len(self._calls) < self.min_calls:
+            return
+        total = len(self._calls)
+        errors = sum(1 for failed, _ in self._calls if failed)
+        slow = sum(1 for _, is_slow in self._calls if is_slow)
+        if errors / total >= self.error_rate or slow / total >= self.slow_call_rate:
+            self._open(self.open_seconds)
+
+    def _open(self, seconds: float) -> None:
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._open_for = seconds
+        self._calls.clear()
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            self._maybe_half_open()
+            total = len(self._calls)
+            return {
+                "state": self._state,
+                "calls": total,
+                "errors": sum(1 for failed, _ in self._calls if failed),
+                "slow": sum(1 for _, is_slow in self._calls if is_slow),
+            }
+
+
+class BreakerRegistry:
+    def __init__(self) -> None:
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, source: str) -> CircuitBreaker:
+        breaker = self._breakers.get(source)
+        if breaker is None:
+            with self._lock:
+                breaker = self._breakers.get(source)
+                if breaker is None:
+                    s = get_settings()
+                    breaker = CircuitBreaker(
+                        window=s.isbn_breaker_window,
+                        min_calls=s.isbn_breaker_min_calls,
+                        error_rate=s.isbn_breaker_error_rate,
+                        slow_call_seconds=s.isbn_breaker_slow_call_seconds,
+                        slow_call_rate=s.isbn_breaker_slow_call_rate,
+                        open_seconds=s.isbn_breaker_open_seconds,
+                        half_open_calls=s.isbn_breaker_half_open_calls,
+                    )
+                    self._breakers[source] = breaker
+        return breaker
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {src: b.stats() for src, b in list(self._breakers.items())}
+
+
+@lru_cache(maxsize=1)
+def get_breakers() -> BreakerRegistry:
+    return BreakerRegistry()
@@ -1,15 +1,73 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+import asyncio
+import importlib.util
+import threading
+from typing import Any, Dict, Optional, Tuple
 
 import httpx
 
+from app.core.config import get_settings
 
-class HttpClient:
+
+# 进程级连接池：按上游 host 各持有一个 httpx 客户端，复用 TLS 连接与 keep-alive；
+# 每个 host 独立的 Limits 即为单 host 连接上限。HTTP/2 通过 ALPN 协商，上游不支持时自动回退 HTTP/1.1。
+_async_clients: Dict[str, Tuple[asyncio.AbstractEventLoop, httpx.AsyncClient]] = {}
+_lock = threading.Lock()
+
+
+def _http2_enabled() -> bool:
+    # h2 为可选依赖（httpx[http2]），未安装时仅使用 HTTP/1.1
+    return get_settings().isbn_http2 and importlib.util.find_spec("h2") is not None
+
+
+def _client_kwargs() -> Dict[str, Any]:
+    s = get_settings()
+    return {
+        "http2": _http2_enabled(),
+        "limits": httpx.Limits(
+            max_connections=s.isbn_http_max_connections,
+            max_keepalive_connections=s.isbn_http_max_keepalive,
+            keepalive_expiry=s.isbn_http_keepalive_expiry,
+        ),
+    }
+
+
+def _pool_key(url: str) -> str:
+    u = httpx.URL(url)
+    return f"{u.scheme}://{u.host}:{u.port or ''}"
+
+
+def get_async_client(url: str) -> httpx.AsyncClient:
+    # AsyncClient 的连接绑定创建它的事件循环；循环变化时（如测试中多次 asyncio.run）重建
+    key = _pool_key(url)
+    loop = asyncio.get_running_loop()
+    with _lock:
+        entry = _async_clients.get(key)
+        if entry is None or entry[0] is not loop or entry[1].is_closed:
+            entry = (loop, httpx.AsyncClient(**_client_kwargs()))
+            _async_clients[key] = entry
+        return entry[1]
+
+
+async def aclose_clients() -> None:
+    """关闭连接池中的所有客户端，由应用 lifespan 在退出时调用。"""
+    with _lock:
+        async_clients = list(_async_clients.values())
+        _async_clients.clear()
+    loop = asyncio.get_running_loop()
+    for owner, client in async_clients:
+        if owner is loop:
+            try:
+                await client.aclose()
+            except Exception:
+                pass
+
+
+class AsyncHttpClient:
     def __init__(self, base_url: Optional[str] = None, timeout: float = 10.0) -> None:
         self.base_url = base_url.rstrip("/") if base_url else None
         self.timeout = timeout
-        self._client = httpx.Client(timeout=timeout)
 
     def _url(self, path: str) -> str:
         if self.base_url:
@@ -18,22 +76,34 @@ class HttpClient:
             return f"{self.base_url}{path if path.startswith('/') else '/' + path}"
         return path
 
-    def get(self, path: str, *, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    async def get(self, path: str, *, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
         url = self._url(path)
-        return self._client.get(url, params=params, headers=headers)
-
-    def close(self) -> None:
-        try:
-            self._client.close()
-        except Exception:
-            pass
+        return await get_async_client(url).get(url, params=params, headers=headers, timeout=self.timeout)
 
 
 class RateLimitError(Exception):
-    pass
+    def __init__(self, message: str | None = None, retry_after: Optional[float] = None):
+        super().__init__(message or "rate limited")
+        self.retry_after = retry_after
+
+
+def _retry_after(r: httpx.Response) -> Optional[float]:
+    # 仅处理秒数形式；HTTP 日期形式较少见，交由默认封禁时长处理
+    value = r.headers.get("Retry-After")
+    try:
+        return max(0.0, float(value)) if value is not None else None
+    except ValueError:
+        return None
 
 
 class HttpError(Exception):
     def __init__(self, status_code: int, message: str | None = None):
         super().__init__(message or f"HTTP error: {status_code}")
         self.status_code = status_code
+
+
+def check_response(r: httpx.Response, source: str, *, rate_limit_statuses: Tuple[int, ...] = (403, 429)) -> None:
+    if r.status_code in rate_limit_statuses:
+        raise RateLimitError(f"{source} rate limited", retry_after=_retry_after(r))
+    if r.status_code >= 400:
+        raise HttpError(r.status_code, r.text)
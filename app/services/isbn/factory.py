@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import Optional
+from typing import List, Optional
 
 from app.services.isbn.types import NormalizedBook
 from app.services.isbn import (
@@ -18,31 +18,41 @@ from app.services.isbn import (
 from app.services.isbn import google_books, open_library, isbndb, loc, worldcat, ndl, british_library, kolisnet, nlc, hkpl
 
 
-def fetch_by_isbn(source: str, isbn: str, *, api_key: Optional[str] = None, lang: Optional[str] = None, timeout: float = 10.0) -> NormalizedBook:
+async def fetch_by_isbn_async(source: str, isbn: str, *, api_key: Optional[str] = None, lang: Optional[str] = None, timeout: float = 10.0) -> NormalizedBook:
     if source == SOURCE_GOOGLE_BOOKS:
-        return google_books.fetch_by_isbn(isbn, api_key=api_key, lang=lang, timeout=timeout)
+        return await google_books.fetch_by_isbn_async(isbn, api_key=api_key, lang=lang, timeout=timeout)
     if source == SOURCE_OPEN_LIBRARY:
-        return open_library.fetch_by_isbn(isbn, timeout=timeout)
+        return await open_library.fetch_by_isbn_async(isbn, timeout=timeout)
     if source == SOURCE_ISBNDB:
         if not api_key:
             raise ValueError("ISBNdb requires api_key")
-        return isbndb.fetch_by_isbn(isbn, api_key=api_key, timeout=timeout)
+        return await isbndb.fetch_by_isbn_async(isbn, api_key=api_key, timeout=timeout)
     if source == SOURCE_LOC:
-        return loc.fetch_by_isbn(isbn, timeout=timeout)
+        return await loc.fetch_by_isbn_async(isbn, timeout=timeout)
     if source == SOURCE_WORLDCAT:
         if not api_key:
             raise ValueError("WorldCat requires wskey")
-        return worldcat.fetch_by_isbn(isbn, wskey=api_key, timeout=timeout)
+        return await worldcat.fetch_by_isbn_async(isbn, wskey=api_key, timeout=timeout)
     if source == SOURCE_NDL:
-        return ndl.fetch_by_isbn(isbn, timeout=timeout)
+        return await ndl.fetch_by_isbn_async(isbn, timeout=timeout)
     if source == SOURCE_BRITISH_LIBRARY:
-        return british_library.fetch_by_isbn(isbn, timeout=timeout)
+        return await british_library.fetch_by_isbn_async(isbn, timeout=timeout)
     if source == SOURCE_KOLISNET:
         if not api_key:
             raise ValueError("KOLIS-NET requires service_key")
-        return kolisnet.fetch_by_isbn(isbn, service_key=api_key, timeout=timeout)
+        return await kolisnet.fetch_by_isbn_async(isbn, service_key=api_key, timeout=timeout)
     if source == SOURCE_NLC_CHINA:
-        return nlc.fetch_by_isbn(isbn, timeout=timeout)
+        return await nlc.fetch_by_isbn_async(isbn, timeout=timeout)
     if source == SOURCE_HKPL:
-        return hkpl.fetch_by_isbn(isbn, timeout=timeout)
+        return await hkpl.fetch_by_isbn_async(isbn, timeout=timeout)
     raise ValueError(f"Unsupported source: {source}")
+
+
+async def search_by_title_async(source: str, title: str, *, api_key: Optional[str] = None, lang: Optional[str] = None, max_results: int = 5, timeout: float = 10.0) -> List[NormalizedBook]:
+    if source == SOURCE_GOOGLE_BOOKS:
+        return await google_books.search_by_title_async(title, api_key=api_key, lang=lang, max_results=max_results, timeout=timeout)
+    if source == SOURCE_OPEN_LIBRARY:
+        return await open_library.search_by_title_async(title, max_results=max_results, timeout=timeout)
+    if source == SOURCE_LOC:
+        return await loc.search_by_title_async(title, max_results=max_results, timeout=timeout)
+    raise ValueError(f"Unsupported source for title search: {source}")
@@ -2,24 +2,35 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional
 
-from app.services.isbn.client_base import HttpClient, RateLimitError, HttpError
+import httpx
+
+from app.services.isbn.client_base import AsyncHttpClient, check_response
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, api_key: Optional[str] = None, lang: Optional[str] = None, timeout: float = 10.0) -> NormalizedBook:
-    client = HttpClient(base_url="https://www.googleapis.com/books/v1", timeout=timeout)
+BASE_URL = "https://www.googleapis.com/books/v1"
+
+
+def _isbn_params(isbn: str, api_key: Optional[str], lang: Optional[str]) -> Dict[str, Any]:
     params: Dict[str, Any] = {"q": f"isbn:{isbn}", "maxResults": 1}
     if api_key:
         params["key"] = api_key
     if lang:
         params["langRestrict"] = lang
-    r = client.get("/volumes", params=params)
-    if r.status_code == 429 or r.status_code == 403:
-        client.close()
-        raise RateLimitError("google_books rate limited")
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
+    return params
+
+
+def _title_params(title: str, api_key: Optional[str], lang: Optional[str], max_results: int) -> Dict[str, Any]:
+    params: Dict[str, Any] = {"q": f"intitle:{title}", "maxResults": max_results}
+    if api_key:
+        params["key"] = api_key
+    if lang:
+        params["langRestrict"] = lang
+    return params
+
+
+def _parse_isbn(isbn: str, r: httpx.Response) -> NormalizedBook:
+    check_response(r, "google_books")
     data = r.json()
     book: NormalizedBook = {
         "source": "google_books",
@@ -38,57 +49,42 @@ def fetch_by_isbn(isbn: str, *, api_key: Optional[str] = None, lang: Optional[st
         "preview_urls": [],
         "raw": data,
     }
-    try:
-        items = data.get("items") or []
-        if not items:
-            return book
-        vi = items[0].get("volumeInfo", {})
-        book["title"] = vi.get("title")
-        book["subtitle"] = vi.get("subtitle")
-        book["creators"] = [{"name": a, "role": None} for a in (vi.get("authors") or [])]
-        book["publisher"] = vi.get("publisher")
-        book["published_date"] = vi.get("publishedDate")
-        book["language"] = vi.get("language")
-        book["subjects"] = list(vi.get("categories") or [])
-        book["description"] = vi.get("description")
-        book["page_count"] = vi.get("pageCount")
-        ids = vi.get("industryIdentifiers") or []
-        for it in ids:
-            t = (it.get("type") or "").lower()
-            val = it.get("identifier")
-            if t == "isbn_10":
-                book.setdefault("identifiers", {})["isbn_10"] = val
-            if t == "isbn_13":
-                book.setdefault("identifiers", {})["isbn_13"] = val
-        links = vi.get("imageLinks") or {}
-        if links:
-            book["cover"] = {
-                "small": links.get("smallThumbnail"),
-                "thumbnail": links.get("thumbnail"),
-            }
-        if vi.get("previewLink"):
-            book["preview_urls"].append(vi.get("previewLink"))
-        if vi.get("infoLink"):
-            book["preview_urls"].append(vi.get("infoLink"))
-    finally:
-        client.close()
+    items = data.get("items") or []
+    if not items:
+        return book
+    vi = items[0].get("volumeInfo", {})
+    book["title"] = vi.get("title")
+    book["subtitle"] = vi.get("subtitle")
+    book["creators"] = [{"name": a, "role": None} for a in (vi.get("authors") or [])]
+    book["publisher"] = vi.get("publisher")
+    book["published_date"] = vi.get("publishedDate")
+    book["language"] = vi.get("language")
+    book["subjects"] = list(vi.get("categories") or [])
+    book["description"] = vi.get("description")
+    book["page_count"] = vi.get("pageCount")
+    ids = vi.get("industryIdentifiers") or []
+    for it in ids:
+        t = (it.get("type") or "").lower()
+        val = it.get("identifier")
+        if t == "isbn_10":
+            book.setdefault("identifiers", {})["isbn_10"] = val
+        if t == "isbn_13":
+            book.setdefault("identifiers", {})["isbn_13"] = val
+    links = vi.get("imageLinks") or {}
+    if links:
+        book["cover"] = {
+            "small": links.get("smallThumbnail"),
+            "thumbnail": links.get("thumbnail"),
+        }
+    if vi.get("previewLink"):
+        book["preview_urls"].append(vi.get("previewLink"))
+    if vi.get("infoLink"):
+        book["preview_urls"].append(vi.get("infoLink"))
     return book
 
 
-def search_by_title(title: str, *, api_key: Optional[str] = None, lang: Optional[str] = None, max_results: int = 5, timeout: float = 10.0) -> List[NormalizedBook]:
-    client = HttpClient(base_url="https://www.googleapis.com/books/v1", timeout=timeout)
-    params: Dict[str, Any] = {"q": f"intitle:{title}", "maxResults": max_results}
-    if api_key:
-        params["key"] = api_key
-    if lang:
-        params["langRestrict"] = lang
-    r = client.get("/volumes", params=params)
-    if r.status_code == 429 or r.status_code == 403:
-        client.close()
-        raise RateLimitError("google_books rate limited")
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
+def _parse_title(r: httpx.Response) -> List[NormalizedBook]:
+    check_response(r, "google_books")
     data = r.json()
     items = data.get("items") or []
     results: List[NormalizedBook] = []
@@ -112,5 +108,16 @@ def search_by_title(title: str, *, api_key: Optional[str] = None, lang: Optional
             "raw": it,
         }
         results.append(nb)
-    client.close()
     return results
+
+
+async def fetch_by_isbn_async(isbn: str, *, api_key: Optional[str] = None, lang: Optional[str] = None, timeout: float = 10.0) -> NormalizedBook:
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/volumes", params=_isbn_params(isbn, api_key, lang))
+    return _parse_isbn(isbn, r)
+
+
+async def search_by_title_async(title: str, *, api_key: Optional[str] = None, lang: Optional[str] = None, max_results: int = 5, timeout: float = 10.0) -> List[NormalizedBook]:
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/volumes", params=_title_params(title, api_key, lang, max_results))
+    return _parse_title(r)
@@ -1,11 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict
-
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
+async def fetch_by_isbn_async(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
     # 占位：HKPL 未公开稳定 JSON API，建议使用开放数据或正式合作接口。
     return {
         "source": "hkpl",
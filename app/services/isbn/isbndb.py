@@ -2,19 +2,17 @@ from __future__ import annotations
 
 from typing import Any, Dict, Optional
 
-from app.services.isbn.client_base import HttpClient, RateLimitError, HttpError
+import httpx
+
+from app.services.isbn.client_base import AsyncHttpClient, check_response
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, api_key: str, timeout: float = 10.0) -> NormalizedBook:
-    client = HttpClient(base_url="https://api2.isbndb.com", timeout=timeout)
-    r = client.get(f"/book/{isbn}", headers={"X-API-KEY": api_key})
-    if r.status_code == 429 or r.status_code == 403:
-        client.close()
-        raise RateLimitError("isbndb rate limited")
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
+BASE_URL = "https://api2.isbndb.com"
+
+
+def _parse_isbn(isbn: str, r: httpx.Response) -> NormalizedBook:
+    check_response(r, "isbndb")
     data = r.json()
     payload = data.get("book", {})
     book: NormalizedBook = {
@@ -34,5 +32,10 @@ def fetch_by_isbn(isbn: str, *, api_key: str, timeout: float = 10.0) -> Normaliz
         "preview_urls": [],
         "raw": data,
     }
-    client.close()
     return book
+
+
+async def fetch_by_isbn_async(isbn: str, *, api_key: str, timeout: float = 10.0) -> NormalizedBook:
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get(f"/book/{isbn}", headers={"X-API-KEY": api_key})
+    return _parse_isbn(isbn, r)
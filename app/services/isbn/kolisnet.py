@@ -2,37 +2,33 @@ from __future__ import annotations
 
 from typing import Any, Dict
 
-from app.services.isbn.client_base import HttpClient, RateLimitError, HttpError
+import httpx
+
+from app.services.isbn import SOURCE_KOLISNET, sru
+from app.services.isbn.client_base import AsyncHttpClient, check_response
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, service_key: str, timeout: float = 10.0) -> NormalizedBook:
-    # Placeholder endpoint form; exact path to be updated per official docs
-    client = HttpClient(base_url="https://api.nl.go.kr", timeout=timeout)
-    r = client.get("/search", params={"serviceKey": service_key, "isbn": isbn, "format": "json"})
-    if r.status_code in (403, 429):
-        client.close()
-        raise RateLimitError("kolisnet rate limited")
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
-    data = r.json() if r.headers.get("content-type", "").startswith("application/json") else {"raw": r.text}
-    book: NormalizedBook = {
-        "source": "kolisnet",
-        "isbn": isbn,
-        "title": None,
-        "subtitle": None,
-        "creators": [],
-        "publisher": None,
-        "published_date": None,
-        "language": "ko",
-        "subjects": [],
-        "description": None,
-        "page_count": None,
-        "identifiers": {},
-        "cover": {},
-        "preview_urls": [],
-        "raw": data if isinstance(data, dict) else {},
-    }
-    client.close()
+# Placeholder endpoint form; exact path to be updated per official docs
+BASE_URL = "https://api.nl.go.kr"
+
+
+def _params(isbn: str, service_key: str) -> Dict[str, Any]:
+    return {"serviceKey": service_key, "isbn": isbn, "format": "xml"}
+
+
+def _parse_isbn(isbn: str, r: httpx.Response) -> NormalizedBook:
+    check_response(r, SOURCE_KOLISNET)
+    # SRU 响应中的 Dublin Core 记录
+    records = sru.parse_response(r.content, sru.SCHEMA_DC, source=SOURCE_KOLISNET)
+    book = sru.pick(records, isbn) or sru.empty_book(SOURCE_KOLISNET, isbn)
+    book["isbn"] = isbn
+    book["language"] = book.get("language") or "ko"
+    book["raw"] = {"xml": r.text}
     return book
+
+
+async def fetch_by_isbn_async(isbn: str, *, service_key: str, timeout: float = 10.0) -> NormalizedBook:
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/search", params=_params(isbn, service_key))
+    return _parse_isbn(isbn, r)
@@ -2,16 +2,17 @@ from __future__ import annotations
 
 from typing import Any, Dict
 
-from app.services.isbn.client_base import HttpClient, HttpError
+import httpx
+
+from app.services.isbn.client_base import AsyncHttpClient, check_response
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
-    client = HttpClient(base_url="https://www.loc.gov", timeout=timeout)
-    r = client.get("/books/", params={"q": f"isbn:{isbn}", "fo": "json", "at": "results", "c": 1})
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
+BASE_URL = "https://www.loc.gov"
+
+
+def _parse_isbn(isbn: str, r: httpx.Response) -> NormalizedBook:
+    check_response(r, "loc", rate_limit_statuses=())
     data = r.json()
     results = data.get("results") or []
     payload = results[0] if results else {}
@@ -32,16 +33,11 @@ def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
         "preview_urls": [payload.get("id")] if payload.get("id") else [],
         "raw": data,
     }
-    client.close()
     return book
 
 
-def search_by_title(title: str, *, max_results: int = 5, timeout: float = 10.0) -> list[NormalizedBook]:
-    client = HttpClient(base_url="https://www.loc.gov", timeout=timeout)
-    r = client.get("/books/", params={"q": title, "fo": "json", "c": max_results})
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
+def _parse_title(r: httpx.Response, max_results: int) -> list[NormalizedBook]:
+    check_response(r, "loc", rate_limit_statuses=())
     data = r.json()
     results = []
     for it in (data.get("results") or [])[:max_results]:
@@ -63,5 +59,16 @@ def search_by_title(title: str, *, max_results: int = 5, timeout: float = 10.0)
             "raw": it,
         }
         results.append(nb)
-    client.close()
     return results
+
+
+async def fetch_by_isbn_async(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/books/", params={"q": f"isbn:{isbn}", "fo": "json", "at": "results", "c": 1})
+    return _parse_isbn(isbn, r)
+
+
+async def search_by_title_async(title: str, *, max_results: int = 5, timeout: float = 10.0) -> list[NormalizedBook]:
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/books/", params={"q": title, "fo": "json", "c": max_results})
+    return _parse_title(r, max_results)
@@ -1,12 +1,16 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List, Optional
+import asyncio
+import time
+from datetime import datetime, timezone
+from contextlib import aclosing
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from app.core.config import get_settings
-from app.services.mongo_client import get_database
-from app.services.redis_client import get_redis_service
-from app.services.isbn.factory import fetch_by_isbn as fetch_from_source
+from app.services.isbn.factory import fetch_by_isbn_async as fetch_from_source
 from app.services.isbn.types import NormalizedBook
+from app.services.isbn.book_cache import get_book_cache
+from app.services.isbn.source_health import get_source_health
 from app.services.isbn import (
     SOURCE_LOC,
     SOURCE_NLC_CHINA,
@@ -20,6 +24,17 @@ from app.services.isbn import (
     SOURCE_WORLDCAT,
 )
 from app.services.isbn.client_base import RateLimitError
+from app.services.isbn import catalog
+from app.services.isbn import merge
+from app.services.isbn.refresh import get_catalog_refresher
+from app.services.isbn import open_library
+from app.services.isbn import negative_cache
+from app.services.isbn import singleflight
+from app.services.isbn import source_guard
+from app.services.isbn import source_stats
+from app.services.isbn.source_stats import get_source_stats
+from app.utils.isbn import infer_country, is_assigned, registration_group
+from app.services.isbn.singleflight import SingleFlight
 
 # 国别优先级映射（示例，可扩展）
 COUNTRY_PRIORITY: Dict[str, List[str]] = {
@@ -34,38 +49,93 @@ COUNTRY_PRIORITY: Dict[str, List[str]] = {
 # 通用优先级：免费强 → 免费小 → 收费
 GLOBAL_PRIORITY = [SOURCE_LOC, SOURCE_OPEN_LIBRARY, SOURCE_GOOGLE_BOOKS, SOURCE_WORLDCAT, SOURCE_ISBNDB]
 
+# 查询模式：顺序逐一调用 / 同时并发前 N 个 / 对冲（上一个来源超时未答再启动下一个）
+MODE_SEQUENTIAL = "sequential"
+MODE_PARALLEL = "parallel"
+MODE_HEDGED = "hedged"
+RESOLVE_MODES = (MODE_SEQUENTIAL, MODE_PARALLEL, MODE_HEDGED)
 
-def _rate_limit_key(source: str) -> str:
-    return f"isbn:ratelimit:{source}"
+# enrich 模式下需要补全的字段（首个命中来源缺失时向其他来源查询）
+ENRICH_FIELDS = ("cover", "description", "page_count", "subjects", "publisher", "published_date", "language")
+
+# 已接入 fetch_by_isbn 的来源；其余来源暂未实现或需要签约
+_SUPPORTED_SOURCES = {
+    SOURCE_GOOGLE_BOOKS,
+    SOURCE_OPEN_LIBRARY,
+    SOURCE_ISBNDB,
+    SOURCE_LOC,
+    SOURCE_WORLDCAT,
+    SOURCE_NDL,
+    SOURCE_BRITISH_LIBRARY,
+}
+
+# 同一 (isbn, force_source, order) 的并发上游解析只执行一次
+_flights = SingleFlight()
 
 
 def _is_rate_limited(source: str) -> bool:
-    r = get_redis_service().get_client()
-    return bool(r.get(_rate_limit_key(source)))
+    # 读取本地快照（后台批量 MGET 刷新），热路径不再逐个 GET Redis
+    return get_source_health().is_rate_limited(source)
 
 
-def _set_rate_limited(source: str, ttl_seconds: int = 86400) -> None:
-    r = get_redis_service().get_client()
-    r.setex(_rate_limit_key(source), ttl_seconds, "1")
+async def _cache_book(doc: NormalizedBook) -> None:
+    # 写入本地书目（books 集合，ISBN-13 为主键并冗余 ISBN-10，两种形式都能命中）
+    # raw 另存于 books_raw，L1 与 books 只保留精简文档
+    key = await catalog.upsert_book(doc)
+    if key:
+        # 写入新文档后刷新本进程 L1；其他 worker 的 L1 依赖 TTL 过期
+        get_book_cache().put(key, catalog.without_raw(doc), datetime.now(timezone.utc))
 
 
-def _cache_book(doc: NormalizedBook) -> None:
-    # 简易缓存：以 isbn 为 key 写入 mongo 集合 books（若采用我们之前的 schema）
-    db = get_database()
-    isbn = doc.get("identifiers", {}).get("isbn_13") or doc.get("isbn")
-    if not isbn:
-        return
-    db["books"].update_one({"_id": isbn}, {"$set": {"lastFetched": doc}}, upsert=True)
+async def _cache_enrichment(doc: NormalizedBook, fields: List[str]) -> None:
+    # 补全只改写补到的字段：fetched_at 仍反映主来源的获取时间，过期条目照常由后台刷新
+    key = await catalog.update_book_fields(doc, fields)
+    if key:
+        # 补全前刚由 _get_cached / _resolve_upstream 写入 L1，沿用其 fetched_at
+        l1 = get_book_cache()
+        entry = l1.get_entry(key)
+        l1.put(key, catalog.without_raw(doc), entry[1] if entry else None)
+
+
+async def refresh_book(key: str, doc: NormalizedBook) -> None:
+    """后台重新获取过期条目（原来源优先）；命中后由 _resolve_upstream 写回书目并更新 fetched_at。
+
+    已合并过的记录（带 sources）写回前与新结果合并，其他来源补全的字段与 provenance 不因刷新丢失。
+    """
+    await get_source_health().ensure_fresh()
+    source = doc.get("source")
+    order = _candidate_order(key, None, [source] if source in _SUPPORTED_SOURCES else None, None)
+    width, delay = _race_params(None, None, None)
+    await _resolve_coalesced(key, order, api_keys=None, timeout=10.0, force_source=None, width=width, hedge_delay=delay, previous=doc)
 
 
-def resolve_isbn(isbn: str, *, country_code: Optional[str] = None, prefer_order: Optional[List[str]] = None, api_keys: Optional[Dict[str, str]] = None, timeout: float = 10.0, force_source: Optional[str] = None) -> Optional[NormalizedBook]:
-    # 1) 本地 Mongo 查询（简单示例）
-    db = get_database()
-    cached = db["books"].find_one({"_id": isbn})
-    if cached and cached.get("lastFetched"):
-        return cached["lastFetched"]
+def _revalidate(key: str, doc: NormalizedBook, fetched_at: Optional[datetime]) -> None:
+    # stale-while-revalidate：过期条目照常返回，同时在后台刷新
+    if get_settings().isbn_refresh_enabled:
+        get_catalog_refresher().revalidate(key, doc, fetched_at, refresh_book)
 
-    # 2) 构造候选来源列表
+
+async def _get_cached(isbn: str) -> Optional[NormalizedBook]:
+    # 先查进程内 L1，未命中再查本地书目并回填；两者命中都按 fetched_at 判断是否过期
+    key = catalog.catalog_key(isbn)
+    l1 = get_book_cache()
+    entry = l1.get_entry(key)
+    if entry is None:
+        entry = await catalog.find_entry(key)
+        if entry is None:
+            return None
+        l1.put(key, *entry)
+    doc, fetched_at = entry
+    _revalidate(key, doc, fetched_at)
+    return doc
+
+
+def _is_resolvable(isbn: str) -> bool:
+    # 校验位错误或号段未分配的 ISBN 不可能有书目，不请求上游
+    return not get_settings().isbn_range_check or is_assigned(isbn)
+
+
+def _build_order(country_code: Optional[str], prefer_order: Optional[List[str]]) -> List[str]:
     order: List[str] = []
     if country_code:
         order += COUNTRY_PRIORITY.get(country_code.upper(), [])
@@ -79,53 +149,535 @@ def resolve_isbn(isbn: str, *, country_code: Optional[str] = None, prefer_order:
             if src in order:
                 order.remove(src)
             order.insert(0, src)
+    return order
+
+
+def _source_api_key(src: str, api_keys: Optional[Dict[str, str]]) -> Optional[str]:
+    s = get_settings()
+    if src == SOURCE_GOOGLE_BOOKS:
+        return (api_keys or {}).get("google_books") or s.google_books_api_key
+    if src == SOURCE_ISBNDB:
+        return (api_keys or {}).get("isbndb") or s.isbndb_api_key
+    if src == SOURCE_WORLDCAT:
+        return (api_keys or {}).get("worldcat") or s.worldcat_wskey
+    return None
+
+
+def _is_configured(src: str, api_keys: Optional[Dict[str, str]]) -> bool:
+    """来源已接入且具备所需密钥。"""
+    if src not in _SUPPORTED_SOURCES:
+        return False
+    return not (src in (SOURCE_ISBNDB, SOURCE_WORLDCAT) and not _source_api_key(src, api_keys))
+
+
+def _is_eligible(src: str, api_keys: Optional[Dict[str, str]]) -> bool:
+    """来源可用且不在限流屏蔽期内。"""
+    return _is_configured(src, api_keys) and not _is_rate_limited(src) and source_guard.is_available(src)
+
 
+def _eligible_sources(order: Iterable[str], api_keys: Optional[Dict[str, str]]) -> Iterator[str]:
+    # 惰性过滤：命中靠前来源时不必再检查后续来源的限流状态
+    for src in order:
+        if _is_eligible(src, api_keys):
+            yield src
+
+
+def _is_good(doc: Optional[NormalizedBook]) -> bool:
+    # 命中标题或作者等基本字段即认为有效
+    return bool(doc and (doc.get("title") or doc.get("creators")))
+
+
+def _raise_if_forced_rejected(src: str, exc: Exception) -> None:
+    # 用户强制的来源被限流或被熔断/配额拒绝，则直接抛出限流错误（其他错误按未命中处理）
+    if isinstance(exc, RateLimitError):
+        raise exc
+    if isinstance(exc, source_guard.SourceRejected):
+        raise RateLimitError(str(exc)) from exc
+
+
+def _record_call(src: str, isbn: str, started: float, *, doc: Optional[NormalizedBook] = None, exc: Optional[Exception] = None) -> None:
+    # 被熔断/配额拒绝的调用未到达上游，不计入统计
+    if isinstance(exc, source_guard.SourceRejected):
+        return
+    outcome = source_stats.ERROR if exc is not None else (source_stats.HIT if _is_good(doc) else source_stats.MISS)
+    get_source_stats().record(src, registration_group(isbn), outcome, time.monotonic() - started)
+
+
+async def _try_source(src: str, isbn: str, *, api_keys: Optional[Dict[str, str]], timeout: float, force: bool = False) -> Optional[NormalizedBook]:
+    started = time.monotonic()
+    try:
+        doc = await source_guard.call(src, lambda: fetch_from_source(src, isbn, api_key=_source_api_key(src, api_keys), timeout=timeout))
+    except Exception as e:
+        _record_call(src, isbn, started, exc=e)
+        if force:
+            _raise_if_forced_rejected(src, e)
+        return None
+    _record_call(src, isbn, started, doc=doc)
+    if not _is_good(doc):
+        # 来源正常应答但无可用记录：记入负缓存，下次跳过该来源
+        await negative_cache.mark_source_missing(isbn, src)
+        return None
+    return doc
+
+
+def _candidate_order(isbn: str, country_code: Optional[str], prefer_order: Optional[List[str]], force_source: Optional[str]) -> List[str]:
     # 如果强制指定来源，优先且仅尝试该来源。如果该来源在屏蔽期内，直接返回限流错误。
     if force_source:
         if _is_rate_limited(force_source):
             raise RateLimitError(f"{force_source} currently rate-limited")
-        order = [force_source]
+        if not source_guard.is_available(force_source):
+            raise RateLimitError(f"{force_source} circuit open")
+        return [force_source]
+    # 未指定国别时按 ISBN 注册组推断（978-7 → CN，978-4 → JP ...）
+    order = _build_order(country_code or infer_country(isbn), prefer_order)
+    if not prefer_order and get_settings().isbn_adaptive_order:
+        # 以静态顺序为先验，按近期延迟与该注册组命中率估计的“得到有效结果的期望耗时”排序
+        order = get_source_stats().rank(order, registration_group(isbn))
+    return order
+
+
+async def _skip_known_missing(isbn: str, order: List[str], force: bool) -> Optional[List[str]]:
+    """去除负缓存中已知未命中的来源；整体已知未命中（且非强制来源）时返回 None。"""
+    missing_all, missing = await negative_cache.lookup(isbn, order)
+    if missing_all and not force:
+        return None
+    return [s for s in order if s not in missing]
 
-    # 3) 逐一尝试调用，遇到 429 或明确限流错误则标记 24h 不再调用
+
+async def _record_exhausted(isbn: str, order: List[str], api_keys: Optional[Dict[str, str]]) -> None:
+    # 所有已配置来源都明确答复“未找到”时，写入整体未命中标记
+    await negative_cache.mark_missing_if_exhausted(isbn, [s for s in order if _is_configured(s, api_keys)])
+
+
+def _flight_key(isbn: str, order: List[str], force_source: Optional[str]) -> Tuple[str, str, Tuple[str, ...]]:
+    # 来源集合相同即可合并；自适应排序造成的先后差异不影响结果
+    return (isbn, force_source or "", tuple(sorted(order)))
+
+
+def _flight_name(key: Tuple[str, str, Tuple[str, ...]]) -> str:
+    isbn, force, order = key
+    return f"{isbn}:{force}:{','.join(order)}"
+
+
+async def _wait_for_peer(isbn: str, name: str) -> Optional[NormalizedBook]:
+    # 其他 worker 持锁解析中：轮询缓存直到拿到结果、锁释放或超时
     s = get_settings()
-    for src in order:
-        if _is_rate_limited(src):
-            continue
-        try:
-            if src == SOURCE_GOOGLE_BOOKS:
-                doc = fetch_from_source(src, isbn, api_key=(api_keys or {}).get("google_books") or s.google_books_api_key, timeout=timeout)
-            elif src == SOURCE_OPEN_LIBRARY:
-                doc = fetch_from_source(src, isbn, timeout=timeout)
-            elif src == SOURCE_ISBNDB:
-                key = (api_keys or {}).get("isbndb") or s.isbndb_api_key
-                if not key:
-                    continue
-                doc = fetch_from_source(src, isbn, api_key=key, timeout=timeout)
-            elif src == SOURCE_LOC:
-                doc = fetch_from_source(src, isbn, timeout=timeout)
-            elif src == SOURCE_WORLDCAT:
-                key = (api_keys or {}).get("worldcat") or s.worldcat_wskey
-                if not key:
-                    continue
-                doc = fetch_from_source(src, isbn, api_key=key, timeout=timeout)
-            else:
-                # 其他来源暂未实现或需要签约：跳过
-                continue
-            # 命中标题或作者等基本字段即认为有效
-            if doc and (doc.get("title") or doc.get("creators")):
-                _cache_book(doc)
-                return doc
-        except RateLimitError:
-            _set_rate_limited(src)
-            if force_source:
-                # 用户强制的来源被限流，则直接抛出
-                raise
-            continue
-        except Exception as e:
-            msg = str(e).lower()
-            if "429" in msg or "rate limit" in msg or "too many requests" in msg:
-                _set_rate_limited(src)
-                continue
-            # 其他错误继续下一个来源
-            continue
+    deadline = time.monotonic() + s.isbn_singleflight_lock_ttl
+    while time.monotonic() < deadline:
+        await asyncio.sleep(s.isbn_singleflight_poll_interval)
+        doc = await _get_cached(isbn)
+        if doc:
+            return doc
+        if not await singleflight.is_locked(name):
+            break
     return None
+
+
+async def _race_sources(
+    sources: Iterable[str],
+    attempt: Callable[[str], Awaitable[Optional[NormalizedBook]]],
+    *,
+    width: int,
+    hedge_delay: Optional[float],
+) -> Optional[NormalizedBook]:
+    """按优先级启动来源任务，返回最先得到的有效结果并取消其余在途任务。
+
+    - width: 同时在途的来源上限
+    - hedge_delay 为 None：立即启动 width 个来源（parallel）
+    - hedge_delay 为秒数：仅当在途来源超过该时长仍未返回时才启动下一个（hedged）
+    某个来源返回空结果或失败时，立即由下一个来源补位。
+    """
+    it = iter(sources)
+    in_flight: set[asyncio.Task] = set()
+    exhausted = False
+
+    def launch() -> bool:
+        nonlocal exhausted
+        if exhausted or len(in_flight) >= width:
+            return False
+        src = next(it, None)
+        if src is None:
+            exhausted = True
+            return False
+        in_flight.add(asyncio.ensure_future(attempt(src)))
+        return True
+
+    try:
+        if hedge_delay is None:
+            while launch():
+                pass
+        else:
+            launch()
+        while in_flight:
+            wait_for = hedge_delay if (hedge_delay is not None and not exhausted and len(in_flight) < width) else None
+            done, _ = await asyncio.wait(in_flight, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                # 对冲：当前来源迟迟未答，追加下一个来源
+                launch()
+                continue
+            for task in done:
+                in_flight.discard(task)
+            for task in done:
+                doc = task.result()
+                if doc:
+                    return doc
+            # 空结果/失败：补位
+            launch()
+            if hedge_delay is None:
+                while launch():
+                    pass
+        return None
+    finally:
+        for task in in_flight:
+            task.cancel()
+
+
+def _race_params(mode: Optional[str], fanout: Optional[int], hedge_delay: Optional[float]) -> Tuple[int, Optional[float]]:
+    """将查询模式换算为 (同时在途上限, 对冲延迟)。"""
+    s = get_settings()
+    mode = (mode or s.isbn_resolve_mode).lower()
+    if mode not in RESOLVE_MODES:
+        raise ValueError(f"Unsupported resolve mode: {mode}")
+    if mode == MODE_SEQUENTIAL:
+        return 1, None
+    width = max(1, fanout or s.isbn_fanout_width)
+    if mode == MODE_PARALLEL:
+        return width, None
+    return width, (s.isbn_hedge_delay if hedge_delay is None else max(0.0, hedge_delay))
+
+
+async def _resolve_upstream(
+    isbn: str,
+    order: List[str],
+    *,
+    api_keys: Optional[Dict[str, str]],
+    timeout: float,
+    force: bool,
+    width: int,
+    hedge_delay: Optional[float],
+    scope: Optional[List[str]] = None,
+    previous: Optional[NormalizedBook] = None,
+) -> Optional[NormalizedBook]:
+    """跳过已知未命中来源后竞速查询；全部来源答复未找到时写入负缓存。
+
+    scope 为判断“全部来源均未找到”的来源范围，默认即 order（批量解析会把已批量查询过的来源从 order 中剔除）。
+    previous 为刷新前的记录：已合并过时与新结果合并后再写回。刷新的是书目中已有的书，
+    不受整体未命中标记影响、也不写入该标记（原来源一次未找到不代表书不存在）。
+    """
+    refresh = previous is not None
+    remaining = await _skip_known_missing(isbn, order, force or refresh)
+    if remaining is None:
+        return None
+    await get_source_health().ensure_fresh()
+    sources = list(_eligible_sources(remaining, api_keys))
+
+    async def attempt(src: str) -> Optional[NormalizedBook]:
+        return await _try_source(src, isbn, api_keys=api_keys, timeout=timeout, force=force)
+
+    doc = await _race_sources(sources, attempt, width=width, hedge_delay=hedge_delay)
+    if doc:
+        if previous and "sources" in previous:
+            doc = merge.refresh_merged(previous, doc)
+        await _cache_book(doc)
+    elif not (force or refresh):
+        await _record_exhausted(isbn, scope or order, api_keys)
+    return doc
+
+
+async def _resolve_coalesced(
+    isbn: str,
+    order: List[str],
+    *,
+    api_keys: Optional[Dict[str, str]],
+    timeout: float,
+    force_source: Optional[str],
+    width: int,
+    hedge_delay: Optional[float],
+    scope: Optional[List[str]] = None,
+    previous: Optional[NormalizedBook] = None,
+) -> Optional[NormalizedBook]:
+    """同 (isbn, force_source, order) 的并发请求只跑一次上游解析；可选 Redis 锁跨 worker 合并。"""
+    key = _flight_key(isbn, order, force_source)
+
+    async def upstream() -> Optional[NormalizedBook]:
+        return await _resolve_upstream(isbn, order, api_keys=api_keys, timeout=timeout, force=bool(force_source), width=width, hedge_delay=hedge_delay, scope=scope, previous=previous)
+
+    async def run() -> Optional[NormalizedBook]:
+        if not get_settings().isbn_singleflight_redis:
+            return await upstream()
+        name = _flight_name(key)
+        token = await singleflight.try_acquire(name)
+        if token is None:
+            doc = await _wait_for_peer(isbn, name)
+            # 持锁方未产出结果（未找到、失败或超时），自行解析
+            return doc or await upstream()
+        try:
+            return await upstream()
+        finally:
+            await singleflight.release(name, token)
+
+    return await _flights.do(key, run)
+
+
+def _missing_fields(doc: NormalizedBook) -> List[str]:
+    return [f for f in ENRICH_FIELDS if merge.is_empty(doc.get(f))]
+
+
+async def _enrich(
+    isbn: str,
+    doc: NormalizedBook,
+    *,
+    country_code: Optional[str],
+    api_keys: Optional[Dict[str, str]],
+    timeout: float,
+    budget: float,
+) -> NormalizedBook:
+    """在 budget 秒内并发查询其他来源补全 doc 缺失的字段，合并结果写回本地书目。
+
+    已合并过的记录（带 sources）不再补全；所有候选来源都在预算内答复、或缺失字段已全部补齐时才写回，
+    否则只返回本次的合并结果，超时的来源下次仍会被尝试。写回只改写补全的字段与 sources/provenance。
+    """
+    missing = _missing_fields(doc)
+    if not missing or "sources" in doc:
+        return doc
+    s = get_settings()
+    order = [src for src in _candidate_order(isbn, country_code, None, None) if src != doc.get("source")]
+    remaining = await _skip_known_missing(isbn, order, force=True) or []
+    # 优先查询在缺失字段上可信度高的来源（如封面/简介优先 Google Books）
+    candidates = sorted(_eligible_sources(remaining, api_keys), key=lambda src: min(merge.trust(src, f) for f in missing))
+    candidates = candidates[: max(1, s.isbn_enrich_max_sources)]
+    if not candidates:
+        return doc
+
+    pending = {asyncio.ensure_future(_try_source(src, isbn, api_keys=api_keys, timeout=min(timeout, budget))) for src in candidates}
+    found: List[NormalizedBook] = []
+    deadline = time.monotonic() + budget
+    try:
+        while pending:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=left, return_when=asyncio.FIRST_COMPLETED)
+            found += [task.result() for task in done if task.result()]
+            if found and not _missing_fields(merge.fill_missing(doc, found)):
+                break
+    finally:
+        for task in pending:
+            task.cancel()
+
+    enriched = merge.fill_missing(doc, found)
+    if not pending or not _missing_fields(enriched):
+        fields = [f for f in (*merge.MERGED_FIELDS, "preview_urls", "sources", "provenance") if enriched.get(f) != doc.get(f)]
+        await _cache_enrichment(enriched, fields)
+    return enriched
+
+
+async def _resolve_enriched(isbn: str, doc: NormalizedBook, **kwargs: Any) -> NormalizedBook:
+    # 同一 ISBN 的并发补全只执行一次
+    return await _flights.do((isbn, "enrich", ()), lambda: _enrich(isbn, doc, **kwargs))
+
+
+async def _with_raw(isbn: str, doc: Optional[NormalizedBook], include_raw: bool) -> Optional[NormalizedBook]:
+    """按 include_raw 附带上游原始响应（缓存命中时从 books_raw 取回）或将其去除。"""
+    if not doc:
+        return doc
+    if not include_raw:
+        return catalog.without_raw(doc)
+    if "raw" in doc:
+        return doc
+    raw = await catalog.find_raw(isbn)
+    return doc if raw is None else {**doc, "raw": raw}
+
+
+async def resolve_isbn(
+    isbn: str,
+    *,
+    country_code: Optional[str] = None,
+    prefer_order: Optional[List[str]] = None,
+    api_keys: Optional[Dict[str, str]] = None,
+    timeout: float = 10.0,
+    force_source: Optional[str] = None,
+    mode: Optional[str] = None,
+    fanout: Optional[int] = None,
+    hedge_delay: Optional[float] = None,
+    enrich: bool = False,
+    enrich_budget: Optional[float] = None,
+    include_raw: bool = False,
+) -> Optional[NormalizedBook]:
+    """解析单个 ISBN：本地缓存 → 候选来源；校验位错误或号段未分配的 ISBN 不请求上游，直接返回 None。
+
+    sequential 逐一调用来源；parallel 同时请求前 fanout 个可用来源，hedged 按 hedge_delay 错峰启动。
+    首个包含标题或作者的结果即返回，其余来源的在途请求被取消（共享连接池中的连接随之释放）。
+    enrich=True 时若结果缺少封面、简介、页数等字段，在 enrich_budget 秒内并发查询其他来源补全（指定 force_source 时不补全）。
+    上游原始响应 raw 仅在 include_raw=True 时返回。
+    全程不阻塞事件循环（Mongo/Redis/HTTP 均为异步客户端）。
+    """
+    width, delay = _race_params(mode, fanout, hedge_delay)
+
+    # 本地缓存查询（进程内 L1 → Mongo）
+    doc = await _get_cached(isbn)
+    if doc:
+        get_catalog_refresher().record_hit(catalog.catalog_key(isbn))
+    elif not _is_resolvable(isbn):
+        return None
+    else:
+        await get_source_health().ensure_fresh()
+        order = _candidate_order(isbn, country_code, prefer_order, force_source)
+        doc = await _resolve_coalesced(isbn, order, api_keys=api_keys, timeout=timeout, force_source=force_source, width=width, hedge_delay=delay)
+    if doc and enrich and not force_source:
+        budget = get_settings().isbn_enrich_budget if enrich_budget is None else enrich_budget
+        doc = await _resolve_enriched(isbn, doc, country_code=country_code, api_keys=api_keys, timeout=timeout, budget=budget)
+    return await _with_raw(isbn, doc, include_raw)
+
+
+async def _get_cached_many(isbns: List[str]) -> Dict[str, NormalizedBook]:
+    l1 = get_book_cache()
+    entries: Dict[str, Tuple[NormalizedBook, Optional[datetime]]] = {}
+    for isbn in isbns:
+        entry = l1.get_entry(catalog.catalog_key(isbn))
+        if entry is not None:
+            entries[isbn] = entry
+    rest = [i for i in isbns if i not in entries]
+    for isbn, entry in (await catalog.find_entries(rest)).items():
+        entries[isbn] = entry
+        l1.put(catalog.catalog_key(isbn), *entry)
+    refresher = get_catalog_refresher()
+    for isbn, (doc, fetched_at) in entries.items():
+        _revalidate(catalog.catalog_key(isbn), doc, fetched_at)
+        refresher.record_hit(catalog.catalog_key(isbn))
+    return {isbn: doc for isbn, (doc, _) in entries.items()}
+
+
+async def _cache_books(docs: List[NormalizedBook]) -> None:
+    await catalog.upsert_books(docs)
+    l1 = get_book_cache()
+    now = datetime.now(timezone.utc)
+    for doc in docs:
+        row = catalog.to_catalog_doc(doc)
+        if row:
+            l1.put(row["_id"], catalog.without_raw(doc), now)
+
+
+async def _mark_source_missing_many(isbns: List[str], source: str) -> None:
+    await asyncio.gather(*(negative_cache.mark_source_missing(isbn, source) for isbn in isbns))
+
+
+async def _bulk_open_library(isbns: List[str], *, timeout: float) -> Dict[str, NormalizedBook]:
+    try:
+        books = await source_guard.call(SOURCE_OPEN_LIBRARY, lambda: open_library.fetch_by_isbns_async(isbns, timeout=timeout))
+    except Exception:
+        return {}
+    found = {isbn: doc for isbn, doc in books.items() if _is_good(doc)}
+    missing = [i for i in isbns if i not in found]
+    # 多键请求的耗时与单键不可比，只记录命中情况
+    stats = get_source_stats()
+    for isbn in isbns:
+        stats.record(SOURCE_OPEN_LIBRARY, registration_group(isbn), source_stats.HIT if isbn in found else source_stats.MISS)
+    if missing:
+        await _mark_source_missing_many(missing, SOURCE_OPEN_LIBRARY)
+    return found
+
+
+async def _iter_completed(aws: Iterable[Awaitable[Any]]) -> AsyncIterator[Any]:
+    # 按完成顺序产出结果；调用方提前退出（如客户端断开）时取消剩余任务
+    pending = {asyncio.ensure_future(a) for a in aws}
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def resolve_isbn_batch(
+    isbns: List[str],
+    *,
+    country_code: Optional[str] = None,
+    timeout: float = 10.0,
+    concurrency: Optional[int] = None,
+    mode: Optional[str] = None,
+    fanout: Optional[int] = None,
+    hedge_delay: Optional[float] = None,
+    include_raw: bool = False,
+) -> AsyncIterator[Tuple[str, Optional[NormalizedBook], Optional[str]]]:
+    """批量解析 ISBN，按完成顺序产出 (isbn, doc, error)。
+
+    1) 一次 $in 查询本地书目（books），命中项立即产出；负缓存中已知无解的 ISBN 直接产出空结果
+    2) 未命中项按 MAX_BIBKEYS 分组走 Open Library 多键接口
+    3) 仍未命中的逐个走来源链（跳过 Open Library），并发数受 concurrency 限制
+    上游原始响应 raw 仅在 include_raw=True 时返回。
+    """
+    batch = _resolve_batch(isbns, country_code=country_code, timeout=timeout, concurrency=concurrency, mode=mode, fanout=fanout, hedge_delay=hedge_delay)
+    async with aclosing(batch) as results:
+        async for isbn, doc, error in results:
+            yield isbn, await _with_raw(isbn, doc, include_raw), error
+
+
+async def _resolve_batch(
+    isbns: List[str],
+    *,
+    country_code: Optional[str],
+    timeout: float,
+    concurrency: Optional[int],
+    mode: Optional[str],
+    fanout: Optional[int],
+    hedge_delay: Optional[float],
+) -> AsyncIterator[Tuple[str, Optional[NormalizedBook], Optional[str]]]:
+    s = get_settings()
+    width, delay = _race_params(mode, fanout, hedge_delay)
+    sem = asyncio.Semaphore(max(1, concurrency or s.isbn_batch_concurrency))
+    unique = list(dict.fromkeys(isbns))
+
+    cached = await _get_cached_many(unique)
+    for isbn in unique:
+        if isbn in cached:
+            yield isbn, cached[isbn], None
+    misses = [i for i in unique if i not in cached]
+    for isbn in misses:
+        if not _is_resolvable(isbn):
+            yield isbn, None, None
+    misses = [i for i in misses if _is_resolvable(i)]
+    known_missing = await negative_cache.known_missing_many(misses)
+    for isbn in misses:
+        if isbn in known_missing:
+            yield isbn, None, None
+    misses = [i for i in misses if i not in known_missing]
+    if not misses:
+        return
+
+    await get_source_health().ensure_fresh()
+    # Open Library 在所有候选顺序中（GLOBAL_PRIORITY），可用时先走多键接口
+    bulk_done = _is_eligible(SOURCE_OPEN_LIBRARY, None)
+    if bulk_done:
+
+        async def bulk(chunk: List[str]) -> Dict[str, NormalizedBook]:
+            async with sem:
+                found = await _bulk_open_library(chunk, timeout=timeout)
+            if found:
+                await _cache_books(list(found.values()))
+            return found
+
+        chunks = [misses[i:i + open_library.MAX_BIBKEYS] for i in range(0, len(misses), open_library.MAX_BIBKEYS)]
+        resolved = set()
+        async with aclosing(_iter_completed(bulk(c) for c in chunks)) as results:
+            async for found in results:
+                for isbn, doc in found.items():
+                    resolved.add(isbn)
+                    yield isbn, doc, None
+        misses = [i for i in misses if i not in resolved]
+
+    async def one(isbn: str) -> Tuple[str, Optional[NormalizedBook], Optional[str]]:
+        full_order = _candidate_order(isbn, country_code, None, None)
+        order = [src for src in full_order if not (bulk_done and src == SOURCE_OPEN_LIBRARY)]
+        async with sem:
+            try:
+                doc = await _resolve_coalesced(isbn, order, api_keys=None, timeout=timeout, force_source=None, width=width, hedge_delay=delay, scope=full_order)
+            except Exception as e:
+                return isbn, None, str(e)
+        return isbn, doc, None
+
+    async with aclosing(_iter_completed(one(i) for i in misses)) as results:
+        async for item in results:
+            yield item
@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional, Sequence
+
+from app.services.isbn import (
+    SOURCE_LOC,
+    SOURCE_NLC_CHINA,
+    SOURCE_NDL,
+    SOURCE_KOLISNET,
+    SOURCE_BRITISH_LIBRARY,
+    SOURCE_HKPL,
+    SOURCE_GOOGLE_BOOKS,
+    SOURCE_OPEN_LIBRARY,
+    SOURCE_ISBNDB,
+    SOURCE_WORLDCAT,
+    SOURCE_MANUAL,
+)
+from app.services.isbn.catalog import book_isbn13
+from app.services.isbn.types import NormalizedBook
+from app.utils.text_similarity import main_title, normalize_text
+
+# 默认来源可信度（靠前优先）：人工录入 → 国家图书馆编目 → 商业书目 → 聚合/众包
+DEFAULT_TRUST = [
+    SOURCE_MANUAL,
+    SOURCE_LOC,
+    SOURCE_NLC_CHINA,
+    SOURCE_NDL,
+    SOURCE_KOLISNET,
+    SOURCE_BRITISH_LIBRARY,
+    SOURCE_HKPL,
+    SOURCE_ISBNDB,
+    SOURCE_WORLDCAT,
+    SOURCE_GOOGLE_BOOKS,
+    SOURCE_OPEN_LIBRARY,
+]
+
+# 按字段覆盖默认可信度：简介/封面以商业来源为准，页数以 ISBNdb/Google Books 为准
+FIELD_TRUST: Dict[str, List[str]] = {
+    "description": [SOURCE_MANUAL, SOURCE_GOOGLE_BOOKS, SOURCE_ISBNDB, SOURCE_OPEN_LIBRARY],
+    "cover": [SOURCE_MANUAL, SOURCE_GOOGLE_BOOKS, SOURCE_OPEN_LIBRARY, SOURCE_ISBNDB],
+    "page_count": [SOURCE_MANUAL, SOURCE_ISBNDB, SOURCE_GOOGLE_BOOKS],
+}
+
+# 整体取自单一来源的字段（creators、subjects 等列表不做跨来源拼接，避免重复与格式混杂）
+MERGED_FIELDS = (
+    "title",
+    "subtitle",
+    "creators",
+    "publisher",
+    "published_date",
+    "language",
+    "subjects",
+    "description",
+    "page_count",
+    "cover",
+)
+
+
+def trust(source: Optional[str], field: str = "") -> int:
+    """来源在该字段上的可信度排名，越小越可信。"""
+    order = FIELD_TRUST.get(field, []) + DEFAULT_TRUST
+    return order.index(source) if source in order else len(order)
+
+
+def is_empty(value: Any) -> bool:
+    return value is None or value == "" or value == [] or value == {}
+
+
+def _author_key(book: NormalizedBook) -> str:
+    # 姓名词排序后比较："Bloch, Joshua, 1961-" 与 "Joshua Bloch" 视为同一作者
+    creators = book.get("creators") or []
+    name = creators[0].get("name") if creators and isinstance(creators[0], dict) else None
+    return " ".join(sorted(t for t in normalize_text(name).split() if not t.isdigit()))
+
+
+def _title_author_key(book: NormalizedBook) -> Optional[str]:
+    title = normalize_text(main_title(book.get("title") or ""))
+    return f"{title}|{_author_key(book)}" if title else None
+
+
+def cluster_books(items: Sequence[NormalizedBook]) -> List[List[NormalizedBook]]:
+    """按同一版次聚类：ISBN-10/13 等价的记录归为一类；无 ISBN 的记录按规范化主标题 + 第一作者并入。
+
+    不同 ISBN 的记录即使书名作者相同也不合并（不同版次/装帧），无法校验的 ISBN 按原值比较；
+    类的顺序为首条记录出现的顺序。
+    """
+    clusters: List[List[NormalizedBook]] = []
+    by_isbn: Dict[str, int] = {}
+    by_title: Dict[str, int] = {}
+    without_isbn: List[NormalizedBook] = []
+    for book in items:
+        isbn = book_isbn13(book) or book.get("isbn")
+        if not isbn:
+            without_isbn.append(book)
+            continue
+        idx = by_isbn.get(isbn)
+        if idx is None:
+            idx = by_isbn[isbn] = len(clusters)
+            clusters.append([])
+        clusters[idx].append(book)
+        key = _title_author_key(book)
+        if key:
+            by_title.setdefault(key, idx)
+    for book in without_isbn:
+        key = _title_author_key(book)
+        idx = by_title.get(key) if key else None
+        if idx is None:
+            idx = len(clusters)
+            clusters.append([])
+            if key:
+                by_title[key] = idx
+        clusters[idx].append(book)
+    return clusters
+
+
+def fuse(records: Sequence[NormalizedBook]) -> NormalizedBook:
+    """将同一版次的多条记录融合为一条。
+
+    每个字段取可信度最高且非空的来源（FIELD_TRUST / DEFAULT_TRUST），identifiers 与 preview_urls 取并集；
+    sources 为参与融合的来源（按可信度），provenance 记录每个字段的取值来源。
+    """
+    ranked = sorted(records, key=lambda r: trust(r.get("source")))
+    primary = ranked[0]
+    book: NormalizedBook = {"source": primary.get("source")}
+    provenance: Dict[str, str] = {}
+    for field in MERGED_FIELDS:
+        chosen = next((r for r in sorted(ranked, key=lambda r: trust(r.get("source"), field)) if not is_empty(r.get(field))), None)
+        if chosen is None:
+            if field in primary:
+                book[field] = primary[field]  # type: ignore[literal-required]
+            continue
+        book[field] = chosen[field]  # type: ignore[literal-required]
+        provenance[field] = chosen.get("source") or ""
+
+    identifiers: Dict[str, Optional[str]] = {}
+    for r in ranked:
+        for k, v in (r.get("identifiers") or {}).items():
+            if v and k not in identifiers:
+                identifiers[k] = v
+    isbn13 = next(filter(None, map(book_isbn13, ranked)), None)
+    if isbn13:
+        identifiers.setdefault("isbn_13", isbn13)
+    book["isbn"] = isbn13 or primary.get("isbn") or ""
+    book["identifiers"] = identifiers
+    book["preview_urls"] = list(dict.fromkeys(u for r in ranked for u in (r.get("preview_urls") or [])))
+    if "raw" in primary:
+        book["raw"] = primary["raw"]
+    book["sources"] = list(dict.fromkeys(r["source"] for r in ranked if r.get("source")))
+    book["provenance"] = provenance
+    return book
+
+
+def merge_books(items: Sequence[NormalizedBook]) -> List[NormalizedBook]:
+    """聚类并融合，同一版次只保留一条记录。"""
+    return [fuse(cluster) for cluster in cluster_books(items)]
+
+
+def fill_missing(base: NormalizedBook, extras: Sequence[NormalizedBook]) -> NormalizedBook:
+    """以 base 为准，仅用 extras 补全 base 中为空的字段（按可信度选择来源）；identifiers 与 preview_urls 取并集。"""
+    book = fuse([base, *extras])
+    source = base.get("source") or ""
+    provenance = dict(book["provenance"])
+    for field in MERGED_FIELDS:
+        if not is_empty(base.get(field)):
+            book[field] = base[field]  # type: ignore[literal-required]
+            provenance[field] = (base.get("provenance") or {}).get(field, source)
+    book["source"] = base.get("source")
+    book["sources"] = list(dict.fromkeys([*(base.get("sources") or [source]), *book["sources"]]))
+    book["provenance"] = provenance
+    if "raw" in base:
+        book["raw"] = base["raw"]
+    else:
+        book.pop("raw", None)
+    return book
+
+
+def refresh_merged(stored: NormalizedBook, fresh: NormalizedBook) -> NormalizedBook:
+    """已合并记录刷新后的结果：fresh 中非空的字段以 fresh 为准，其余字段中此前由其他来源补全的（见 provenance）保留。
+
+    fresh 来源自身不再提供的字段随之清除；identifiers 与 preview_urls 取并集。
+    """
+    source = fresh.get("source") or ""
+    previous = stored.get("provenance") or {}
+    book: NormalizedBook = dict(fresh)  # type: ignore[assignment]
+    provenance: Dict[str, str] = {}
+    for field in MERGED_FIELDS:
+        if not is_empty(fresh.get(field)):
+            provenance[field] = source
+        elif not is_empty(stored.get(field)) and previous.get(field) not in (None, source):
+            book[field] = stored[field]  # type: ignore[literal-required]
+            provenance[field] = previous[field]
+    book["identifiers"] = {**(stored.get("identifiers") or {}), **(fresh.get("identifiers") or {})}
+    book["preview_urls"] = list(dict.fromkeys([*(fresh.get("preview_urls") or []), *(stored.get("preview_urls") or [])]))
+    book["sources"] = list(dict.fromkeys([source, *(stored.get("sources") or [])]))
+    book["provenance"] = provenance
+    return book
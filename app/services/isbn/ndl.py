@@ -1,44 +1,39 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict
 
-from app.services.isbn.client_base import HttpClient, RateLimitError, HttpError
+import httpx
+
+from app.services.isbn import SOURCE_NDL, sru
+from app.services.isbn.client_base import AsyncHttpClient, check_response
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
-    # NDL SRU endpoint (XML). Here we call JSON if ever available; otherwise leave raw as placeholder.
-    client = HttpClient(base_url="https://ndlsearch.ndl.go.jp", timeout=timeout)
-    r = client.get("/api/sru", params={
+BASE_URL = "https://ndlsearch.ndl.go.jp"
+
+
+def _params(isbn: str) -> Dict[str, Any]:
+    return {
         "operation": "searchRetrieve",
         "recordSchema": "dcndl",
+        "recordPacking": "xml",
         "maximumRecords": 1,
         "query": f"isbn={isbn}",
-    })
-    if r.status_code in (403, 429):
-        client.close()
-        raise RateLimitError("ndl rate limited")
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
-    # For simplicity retain raw XML as string; a full XML parse can be added later
-    data = r.text
-    book: NormalizedBook = {
-        "source": "ndl",
-        "isbn": isbn,
-        "title": None,
-        "subtitle": None,
-        "creators": [],
-        "publisher": None,
-        "published_date": None,
-        "language": "ja",
-        "subjects": [],
-        "description": None,
-        "page_count": None,
-        "identifiers": {},
-        "cover": {},
-        "preview_urls": [],
-        "raw": {"xml": data},
     }
-    client.close()
+
+
+def _parse_isbn(isbn: str, r: httpx.Response) -> NormalizedBook:
+    check_response(r, SOURCE_NDL)
+    records = sru.parse_response(r.content, sru.SCHEMA_DCNDL, source=SOURCE_NDL)
+    book = sru.pick(records, isbn) or sru.empty_book(SOURCE_NDL, isbn)
+    book["isbn"] = isbn
+    book["language"] = book.get("language") or "ja"
+    book["raw"] = {"xml": r.text}
     return book
+
+
+async def fetch_by_isbn_async(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
+    # NDL Search SRU（dcndl 记录，XML 内联返回）
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/api/sru", params=_params(isbn))
+    return _parse_isbn(isbn, r)
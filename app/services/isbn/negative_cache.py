@@ -0,0 +1,74 @@
+"""
+Negative cache for ISBNs that upstream sources could not resolve.
+
+- isbn:notfound:{isbn}:{source}  the source answered but had no usable record
+- isbn:notfound:{isbn}           every configured source answered "not found"
+
+Only clean empty answers are recorded; errors and rate limits never are, so a
+transient outage does not hide a book. Redis failures are ignored (fail-open).
+"""
+from __future__ import annotations
+
+from typing import Iterable, List, Set, Tuple
+
+from app.core.config import get_settings
+from app.services.redis_client import get_redis_service
+
+
+def _key(isbn: str) -> str:
+    return f"isbn:notfound:{isbn}"
+
+
+def _source_key(isbn: str, source: str) -> str:
+    return f"isbn:notfound:{isbn}:{source}"
+
+
+async def lookup(isbn: str, sources: Iterable[str]) -> Tuple[bool, Set[str]]:
+    """单次 MGET 同时返回 (整体是否已知未命中, 已知未命中的来源集合)。"""
+    sources = list(sources)
+    try:
+        values = await get_redis_service().get_async_client().mget([_key(isbn)] + [_source_key(isbn, s) for s in sources])
+    except Exception:
+        return False, set()
+    return bool(values[0]), {src for src, v in zip(sources, values[1:]) if v}
+
+
+async def known_missing_many(isbns: List[str]) -> Set[str]:
+    if not isbns:
+        return set()
+    try:
+        values = await get_redis_service().get_async_client().mget([_key(i) for i in isbns])
+    except Exception:
+        return set()
+    return {isbn for isbn, v in zip(isbns, values) if v}
+
+
+async def missing_sources(isbn: str, sources: Iterable[str]) -> Set[str]:
+    sources = list(sources)
+    if not sources:
+        return set()
+    try:
+        values = await get_redis_service().get_async_client().mget([_source_key(isbn, s) for s in sources])
+    except Exception:
+        return set()
+    return {src for src, v in zip(sources, values) if v}
+
+
+async def mark_source_missing(isbn: str, source: str) -> None:
+    try:
+        await get_redis_service().get_async_client().setex(_source_key(isbn, source), get_settings().isbn_negative_source_ttl, "1")
+    except Exception:
+        pass
+
+
+async def mark_missing_if_exhausted(isbn: str, sources: Iterable[str]) -> bool:
+    """若 sources 均已记录“未找到”，写入整体未命中标记并返回 True。"""
+    sources = list(sources)
+    if not sources or await missing_sources(isbn, sources) != set(sources):
+        return False
+    try:
+        await get_redis_service().get_async_client().setex(_key(isbn), get_settings().isbn_negative_ttl, "1")
+    except Exception:
+        return False
+    return True
+
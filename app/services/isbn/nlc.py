@@ -1,11 +1,9 @@
 from __future__ import annotations
 
-from typing import Any, Dict
-
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
+async def fetch_by_isbn_async(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
     # 占位：建议通过正式 SRU/合作接口接入。此处不抓取 HTML。
     return {
         "source": "nlc_china",
@@ -1,21 +1,25 @@
 from __future__ import annotations
 
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable, List
 
-from app.services.isbn.client_base import HttpClient, HttpError
+import httpx
+
+from app.services.isbn.client_base import AsyncHttpClient, check_response
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
-    client = HttpClient(base_url="https://openlibrary.org", timeout=timeout)
-    # Try data API first
-    r = client.get("/api/books", params={"bibkeys": f"ISBN:{isbn}", "format": "json", "jscmd": "data"})
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
-    data = r.json()
-    book_key = f"ISBN:{isbn}"
-    payload = data.get(book_key) or {}
+BASE_URL = "https://openlibrary.org"
+
+
+# /api/books 单次可携带的 bibkeys 上限（URL 长度约束下的保守值）
+MAX_BIBKEYS = 50
+
+
+def _isbn_params(isbns: Iterable[str]) -> Dict[str, Any]:
+    return {"bibkeys": ",".join(f"ISBN:{i}" for i in isbns), "format": "json", "jscmd": "data"}
+
+
+def _book_from_payload(isbn: str, payload: Dict[str, Any], raw: Dict[str, Any]) -> NormalizedBook:
     book: NormalizedBook = {
         "source": "open_library",
         "isbn": isbn,
@@ -31,7 +35,7 @@ def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
         "identifiers": {},
         "cover": payload.get("cover") or {},
         "preview_urls": [],
-        "raw": data,
+        "raw": raw,
     }
     # identifiers if present in "identifiers" field
     ids = payload.get("identifiers") or {}
@@ -43,17 +47,29 @@ def fetch_by_isbn(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
     # Preview
     if payload.get("url"):
         book["preview_urls"].append(payload.get("url"))
-    client.close()
     return book
 
 
-def search_by_title(title: str, *, max_results: int = 5, timeout: float = 10.0) -> List[NormalizedBook]:
-    # Open Library search API
-    client = HttpClient(base_url="https://openlibrary.org", timeout=timeout)
-    r = client.get("/search.json", params={"title": title, "limit": max_results})
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
+def _parse_isbn(isbn: str, r: httpx.Response) -> NormalizedBook:
+    check_response(r, "open_library", rate_limit_statuses=())
+    data = r.json()
+    return _book_from_payload(isbn, data.get(f"ISBN:{isbn}") or {}, data)
+
+
+def _parse_isbns(isbns: List[str], r: httpx.Response) -> Dict[str, NormalizedBook]:
+    check_response(r, "open_library", rate_limit_statuses=())
+    data = r.json()
+    books: Dict[str, NormalizedBook] = {}
+    for isbn in isbns:
+        key = f"ISBN:{isbn}"
+        payload = data.get(key)
+        if payload:
+            books[isbn] = _book_from_payload(isbn, payload, {key: payload})
+    return books
+
+
+def _parse_title(r: httpx.Response) -> List[NormalizedBook]:
+    check_response(r, "open_library", rate_limit_statuses=())
     data = r.json()
     docs = data.get("docs") or []
     results: List[NormalizedBook] = []
@@ -76,5 +92,27 @@ def search_by_title(title: str, *, max_results: int = 5, timeout: float = 10.0)
             "raw": d,
         }
         results.append(nb)
-    client.close()
     return results
+
+
+async def fetch_by_isbn_async(isbn: str, *, timeout: float = 10.0) -> NormalizedBook:
+    # Try data API first
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/api/books", params=_isbn_params([isbn]))
+    return _parse_isbn(isbn, r)
+
+
+async def fetch_by_isbns_async(isbns: List[str], *, timeout: float = 10.0) -> Dict[str, NormalizedBook]:
+    """一次请求查询多个 ISBN（bibkeys 逗号分隔，至多 MAX_BIBKEYS 个），仅返回命中的条目。"""
+    if len(isbns) > MAX_BIBKEYS:
+        raise ValueError(f"at most {MAX_BIBKEYS} bibkeys per request")
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/api/books", params=_isbn_params(isbns))
+    return _parse_isbns(isbns, r)
+
+
+async def search_by_title_async(title: str, *, max_results: int = 5, timeout: float = 10.0) -> List[NormalizedBook]:
+    # Open Library search API
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    r = await client.get("/search.json", params={"title": title, "limit": max_results})
+    return _parse_title(r)
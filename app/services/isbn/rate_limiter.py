@@ -0,0 +1,125 @@
+"""
+Distributed token bucket per upstream ISBN source.
+
+Each source has a bucket `isbn:bucket:{source}` (a Redis hash of tokens and
+last-refill time) shared by all workers; a Lua script refills and takes a token
+atomically, using the Redis server clock so worker clock skew does not matter.
+Sources without a configured rate are unlimited. Redis failures fail open.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+from app.core.config import get_settings
+from app.services.redis_client import get_redis_service
+from app.services.isbn import (
+    SOURCE_LOC,
+    SOURCE_GOOGLE_BOOKS,
+    SOURCE_OPEN_LIBRARY,
+    SOURCE_ISBNDB,
+    SOURCE_WORLDCAT,
+)
+
+logger = logging.getLogger(__name__)
+
+# 默认配额（每秒令牌数, 桶容量），略低于各服务公开的限额
+DEFAULT_RATE_LIMITS: Dict[str, Tuple[float, int]] = {
+    SOURCE_LOC: (1.2, 10),
+    SOURCE_OPEN_LIBRARY: (1.0, 5),
+    SOURCE_GOOGLE_BOOKS: (1.0, 10),
+    SOURCE_ISBNDB: (1.0, 1),
+    SOURCE_WORLDCAT: (2.0, 5),
+}
+
+# KEYS[1]=bucket; ARGV: rate (tokens/s), burst。返回 0 表示已取得令牌，否则为需等待的毫秒数
+TOKEN_BUCKET_LUA = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+
+def bucket_key(source: str) -> str:
+    return f"isbn:bucket:{source}"
+
+
+def parse_rate_limits(spec: str) -> Dict[str, Tuple[float, int]]:
+    """解析 "source=rate/burst,..."；rate 为 0 表示不限速。格式错误的条目被忽略。"""
+    limits: Dict[str, Tuple[float, int]] = {}
+    for item in (spec or "").split(","):
+        name, _, value = item.strip().partition("=")
+        if not name or not value:
+            continue
+        rate, _, burst = value.partition("/")
+        try:
+            r = float(rate)
+            b = int(burst) if burst else max(1, int(r))
+        except ValueError:
+            logger.warning(f"ignoring malformed rate limit entry: {item!r}")
+            continue
+        limits[name.strip()] = (r, max(1, b))
+    return limits
+
+
+class TokenBucketLimiter:
+    def __init__(self, limits: Dict[str, Tuple[float, int]], max_wait: float) -> None:
+        self.limits = {src: lim for src, lim in limits.items() if lim[0] > 0}
+        self.max_wait = max_wait
+        self._scripts: Dict[int, Tuple[Any, Any]] = {}
+
+    def _script(self, client: Any) -> Any:
+        entry = self._scripts.get(id(client))
+        if entry is None or entry[0] is not client:
+            entry = (client, client.register_script(TOKEN_BUCKET_LUA))
+            self._scripts[id(client)] = entry
+        return entry[1]
+
+    async def try_acquire(self, source: str) -> float:
+        """尝试取一个令牌：返回 0 表示成功，否则为建议等待的秒数。"""
+        limit = self.limits.get(source)
+        if limit is None:
+            return 0.0
+        try:
+            script = self._script(get_redis_service().get_async_client())
+            wait_ms = await script(keys=[bucket_key(source)], args=list(limit))
+        except Exception as e:
+            logger.warning(f"token bucket unavailable for {source}: {e}")
+            return 0.0
+        return int(wait_ms or 0) / 1000.0
+
+    async def acquire(self, source: str) -> bool:
+        """在 max_wait 内等待令牌；超出则返回 False，调用方应跳过该来源。"""
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            wait = await self.try_acquire(source)
+            if wait <= 0:
+                return True
+            if time.monotonic() + wait > deadline:
+                return False
+            await asyncio.sleep(wait)
+
+
+@lru_cache(maxsize=1)
+def get_rate_limiter() -> TokenBucketLimiter:
+    s = get_settings()
+    limits = dict(DEFAULT_RATE_LIMITS)
+    limits.update(parse_rate_limits(s.isbn_source_rate_limits))
+    return TokenBucketLimiter(limits, max_wait=s.isbn_rate_limit_max_wait)
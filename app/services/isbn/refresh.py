@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections import Counter
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import get_settings
+from app.services.isbn import (
+    SOURCE_LOC,
+    SOURCE_NLC_CHINA,
+    SOURCE_NDL,
+    SOURCE_KOLISNET,
+    SOURCE_BRITISH_LIBRARY,
+    SOURCE_HKPL,
+    SOURCE_WORLDCAT,
+    SOURCE_MANUAL,
+)
+from app.services.isbn import catalog
+from app.services.isbn.types import NormalizedBook
+
+logger = logging.getLogger(__name__)
+
+DAY = 86400
+
+# 内置的来源 TTL（秒）：国家图书馆编目记录很少变动；未列出的来源（商业/众包，封面与简介常更新）取 ISBN_REFRESH_TTL
+SOURCE_TTLS: Dict[str, int] = {
+    SOURCE_LOC: 180 * DAY,
+    SOURCE_NLC_CHINA: 180 * DAY,
+    SOURCE_NDL: 180 * DAY,
+    SOURCE_KOLISNET: 180 * DAY,
+    SOURCE_BRITISH_LIBRARY: 180 * DAY,
+    SOURCE_HKPL: 180 * DAY,
+    SOURCE_WORLDCAT: 90 * DAY,
+}
+
+# 不过期的来源（人工录入不应被上游结果覆盖）
+NEVER_STALE = {SOURCE_MANUAL}
+
+# 每个周期最多跟踪的不同 ISBN 数，超出后新 ISBN 不再计数
+MAX_TRACKED = 100_000
+
+Refetch = Callable[[str, NormalizedBook], Awaitable[Any]]
+
+
+def parse_ttls(spec: str) -> Dict[str, int]:
+    """解析 "source=seconds,..."；格式错误的条目被忽略。"""
+    ttls: Dict[str, int] = {}
+    for item in (spec or "").split(","):
+        name, _, value = item.strip().partition("=")
+        if not name or not value:
+            continue
+        try:
+            ttls[name.strip()] = int(value)
+        except ValueError:
+            logger.warning(f"ignoring malformed refresh ttl entry: {item!r}")
+    return ttls
+
+
+class CatalogRefresher:
+    """
+    Freshness policy and background refresh of local catalog entries.
+
+    An entry is stale once it is older than its source's TTL; stale hits are
+    still served from the catalog while `revalidate` re-fetches them in the
+    background (at most one refresh per ISBN and `concurrency` refreshes per
+    worker at a time; extra requests are dropped and retried on a later hit).
+    Cache hits are counted per worker, and every `interval` seconds the most
+    requested stale entries are refreshed in bulk, so popular books are
+    usually fresh before anyone sees them stale.
+    """
+
+    def __init__(self, ttls: Dict[str, int], default_ttl: int, interval: float, batch: int, concurrency: int) -> None:
+        self.ttls = ttls
+        self.default_ttl = default_ttl
+        self.interval = interval
+        self.batch = batch
+        self.concurrency = max(1, concurrency)
+        self._hits: Counter = Counter()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        self._task: Optional[asyncio.Task] = None
+
+    def ttl(self, source: Optional[str]) -> Optional[int]:
+        if source in NEVER_STALE:
+            return None
+        return self.ttls.get(source or "", self.default_ttl)
+
+    def is_stale(self, source: Optional[str], fetched_at: Optional[datetime], now: Optional[datetime] = None) -> bool:
+        ttl = self.ttl(source)
+        if ttl is None:
+            return False
+        if fetched_at is None:
+            return True
+        return ((now or datetime.now(timezone.utc)) - fetched_at).total_seconds() >= ttl
+
+    def record_hit(self, key: str) -> None:
+        if self.interval > 0 and (key in self._hits or len(self._hits) < MAX_TRACKED):
+            self._hits[key] += 1
+
+    def take_popular(self, limit: int) -> List[str]:
+        """本周期内命中最多的 ISBN（按次数降序），并开始新的计数周期。"""
+        popular = [key for key, _ in self._hits.most_common(limit)]
+        self._hits.clear()
+        return popular
+
+    async def _refetch(self, key: str, doc: NormalizedBook, refetch: Refetch) -> None:
+        try:
+            await refetch(key, doc)
+        except Exception as e:
+            logger.warning(f"background refresh of {key} failed: {e}")
+
+    def revalidate(self, key: str, doc: NormalizedBook, fetched_at: Optional[datetime], refetch: Refetch) -> bool:
+        """条目已过期时在后台重新获取，返回是否已安排刷新。"""
+        if not self.is_stale(doc.get("source"), fetched_at):
+            return False
+        if key in self._inflight or len(self._inflight) >= self.concurrency:
+            return False
+        task = asyncio.get_running_loop().create_task(self._refetch(key, doc, refetch))
+        self._inflight[key] = task
+        task.add_done_callback(lambda t, k=key: self._inflight.pop(k, None))
+        return True
+
+    async def refresh_popular(self, refetch: Refetch) -> int:
+        """刷新本周期内最常被请求且已过期的条目（至多 batch 条），返回刷新条数。"""
+        keys = [k for k in self.take_popular(self.batch * 4) if k not in self._inflight]
+        if not keys:
+            return 0
+        entries = await catalog.find_entries(keys)
+        stale = [(k, entries[k][0]) for k in keys if k in entries and self.is_stale(entries[k][0].get("source"), entries[k][1])]
+        stale = stale[: self.batch]
+        for i in range(0, len(stale), self.concurrency):
+            await asyncio.gather(*(self._refetch(k, doc, refetch) for k, doc in stale[i:i + self.concurrency]))
+        return len(stale)
+
+    async def _run(self, refetch: Refetch) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                refreshed = await self.refresh_popular(refetch)
+            except Exception as e:
+                logger.warning(f"catalog refresh failed: {e}")
+                continue
+            if refreshed:
+                logger.info(f"refreshed {refreshed} stale catalog entries")
+
+    def start(self, refetch: Refetch) -> None:
+        if self.interval <= 0:
+            return
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run(refetch))
+
+    async def stop(self) -> None:
+        tasks = [t for t in (self._task, *self._inflight.values()) if t is not None]
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+
+
+@lru_cache(maxsize=1)
+def get_catalog_refresher() -> CatalogRefresher:
+    s = get_settings()
+    return CatalogRefresher(
+        {**SOURCE_TTLS, **parse_ttls(s.isbn_refresh_source_ttls)},
+        default_ttl=s.isbn_refresh_ttl,
+        interval=s.isbn_refresh_interval,
+        batch=s.isbn_refresh_batch,
+        concurrency=s.isbn_refresh_concurrency,
+    )
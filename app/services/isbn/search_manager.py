@@ -1,22 +1,45 @@
 from __future__ import annotations
 
-from typing import Dict, List, Optional
+import asyncio
+import logging
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Set, Tuple
 
-from app.services.isbn.factory import search_by_title as search_from_source
+from app.services.isbn.client_base import RateLimitError
+from app.services.isbn.factory import search_by_title_async as search_from_source
 from app.services.isbn.types import NormalizedBook
+from app.services.isbn import catalog
+from app.services.isbn import merge
+from app.services.isbn import source_guard
+from app.services.isbn.source_health import get_source_health
 from app.services.isbn import (
     SOURCE_LOC,
     SOURCE_OPEN_LIBRARY,
     SOURCE_GOOGLE_BOOKS,
 )
 from app.core.config import get_settings
-from app.utils.text_similarity import jaccard_token_similarity
+from app.utils.text_similarity import TitleMatcher
+
+logger = logging.getLogger(__name__)
 
 # 默认顺序：免费强 → 免费小 → 另一个全球
 DEFAULT_SOURCES = [SOURCE_LOC, SOURCE_OPEN_LIBRARY, SOURCE_GOOGLE_BOOKS]
 
+# 本地书目（books 集合）作为一个伪来源，先于上游查询
+SOURCE_LOCAL = "local"
+
+# 单个来源在本次搜索中的状态
+STATUS_OK = "ok"
+STATUS_EMPTY = "empty"
+STATUS_ERROR = "error"
+STATUS_RATE_LIMITED = "rate_limited"
+STATUS_UNAVAILABLE = "unavailable"
+STATUS_TIMEOUT = "timeout"
+
+SourceResult = Tuple[str, Dict[str, Any], List[NormalizedBook]]
+
 
-def search_title(title: str, *, max_results_per_source: int = 5, min_similarity: float = 0.5, api_keys: Optional[Dict[str, str]] = None, lang: Optional[str] = None, timeout: float = 10.0, prefer_order: Optional[List[str]] = None, force_source: Optional[str] = None) -> List[NormalizedBook]:
+def _source_order(prefer_order: Optional[List[str]], force_source: Optional[str]) -> List[str]:
     order = list(DEFAULT_SOURCES)
     if prefer_order:
         for s in reversed(prefer_order):
@@ -25,28 +48,149 @@ def search_title(title: str, *, max_results_per_source: int = 5, min_similarity:
             order.insert(0, s)
     if force_source:
         order = [force_source]
+    return [s for s in order if s in DEFAULT_SOURCES]
 
-    collected: List[NormalizedBook] = []
-    seen = set()
+
+def _source_kwargs(src: str, api_keys: Optional[Dict[str, str]], lang: Optional[str]) -> Dict[str, Any]:
+    if src == SOURCE_GOOGLE_BOOKS:
+        return {"api_key": (api_keys or {}).get("google_books") or get_settings().google_books_api_key, "lang": lang}
+    return {}
+
+
+def _matches(matcher: TitleMatcher, items: List[NormalizedBook], min_similarity: float) -> List[NormalizedBook]:
+    return [nb for _, nb in matcher.rank(items, min_similarity)]
+
+
+def dedup_books(items: List[NormalizedBook], seen: Set[str]) -> List[NormalizedBook]:
+    """流式输出用的去重：ISBN-10/13 等价视为同一条，无 ISBN 时按 title|isbn。"""
+    out: List[NormalizedBook] = []
+    for nb in items:
+        key = catalog.book_isbn13(nb) or (nb.get("title") or "") + "|" + (nb.get("isbn") or "")
+        if key in seen:
+            continue
+        seen.add(key)
+        out.append(nb)
+    return out
+
+
+async def _search_local(title: str, *, max_results: int, min_similarity: float) -> SourceResult:
+    started = time.monotonic()
+    status: Dict[str, Any] = {"status": STATUS_OK, "count": 0, "error": None}
+    items: List[NormalizedBook] = []
+    try:
+        items = await catalog.search_title(title, limit=max_results, min_similarity=min_similarity)
+    except Exception as e:
+        status.update(status=STATUS_ERROR, error=str(e) or type(e).__name__)
+    else:
+        status.update(status=STATUS_OK if items else STATUS_EMPTY, count=len(items))
+    status["elapsed"] = round(time.monotonic() - started, 3)
+    return SOURCE_LOCAL, status, items
+
+
+# 写入本地书目的后台任务（持有引用，防止任务被提前回收）
+_pending_writes: Set[asyncio.Task] = set()
+
+
+async def _store(items: List[NormalizedBook]) -> None:
+    try:
+        # 只补充新书，不覆盖 ISBN 解析得到的完整记录
+        await catalog.upsert_books(items, overwrite=False)
+    except Exception as e:
+        logger.warning(f"failed to add search results to the catalog: {e}")
+
+
+def _remember(items: List[NormalizedBook]) -> None:
+    if not items or not get_settings().title_search_cache_results:
+        return
+    task = asyncio.ensure_future(_store(items))
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+async def _search_one(src: str, matcher: TitleMatcher, *, max_results: int, min_similarity: float, api_keys: Optional[Dict[str, str]], lang: Optional[str], timeout: float) -> SourceResult:
+    started = time.monotonic()
+    status: Dict[str, Any] = {"status": STATUS_OK, "count": 0, "error": None}
+    items: List[NormalizedBook] = []
+    kwargs = _source_kwargs(src, api_keys, lang)
+    try:
+        raw = await source_guard.call(src, lambda: search_from_source(src, matcher.query, max_results=max_results, timeout=timeout, **kwargs))
+    except (RateLimitError, source_guard.SourceRejected) as e:
+        status.update(status=STATUS_RATE_LIMITED, error=str(e))
+    except Exception as e:
+        status.update(status=STATUS_ERROR, error=str(e) or type(e).__name__)
+    else:
+        items = _matches(matcher, raw, min_similarity)
+        status.update(status=STATUS_OK if items else STATUS_EMPTY, count=len(items))
+        _remember(items)
+    status["elapsed"] = round(time.monotonic() - started, 3)
+    return src, status, items
+
+
+async def iter_search_title(
+    title: str,
+    *,
+    max_results_per_source: int = 5,
+    min_similarity: float = 0.5,
+    api_keys: Optional[Dict[str, str]] = None,
+    lang: Optional[str] = None,
+    timeout: float = 10.0,
+    deadline: Optional[float] = None,
+    prefer_order: Optional[List[str]] = None,
+    force_source: Optional[str] = None,
+) -> AsyncIterator[SourceResult]:
+    """先查本地书目，结果不足时并发查询各来源，按完成顺序产出 (source, status, items)。
+
+    本地书目以 source="local" 首先产出；命中数达到 title_search_local_min_results（或 force_source="local"）时不再请求上游。
+    deadline 秒（默认同 timeout）后仍未返回的来源被取消并以 timeout 状态产出；被封禁或熔断中的来源不发请求，以 unavailable 产出。
+    items 按与 title 的相似度过滤并降序排列，跨来源去重由调用方负责。
+    """
     s = get_settings()
-    for src in order:
-        try:
-            if src == SOURCE_GOOGLE_BOOKS:
-                items = search_from_source(src, title, api_key=(api_keys or {}).get("google_books") or s.google_books_api_key, lang=lang, max_results=max_results_per_source, timeout=timeout)
-            elif src == SOURCE_OPEN_LIBRARY:
-                items = search_from_source(src, title, max_results=max_results_per_source, timeout=timeout)
-            elif src == SOURCE_LOC:
-                items = search_from_source(src, title, max_results=max_results_per_source, timeout=timeout)
-            else:
-                continue
-        except Exception:
+    if s.title_search_local and force_source in (None, SOURCE_LOCAL):
+        local = await _search_local(title, max_results=max_results_per_source, min_similarity=min_similarity)
+        yield local
+        if force_source == SOURCE_LOCAL or len(local[2]) >= max(1, s.title_search_local_min_results):
+            return
+    if force_source == SOURCE_LOCAL:
+        return
+
+    matcher = TitleMatcher(title)
+    health = get_source_health()
+    await health.ensure_fresh()
+    tasks: Dict[asyncio.Task, str] = {}
+    for src in _source_order(prefer_order, force_source):
+        if health.is_rate_limited(src) or not source_guard.is_available(src):
+            yield src, {"status": STATUS_UNAVAILABLE, "count": 0, "error": None, "elapsed": 0.0}, []
             continue
-        for nb in items:
-            sim = jaccard_token_similarity(title, nb.get("title") or "")
-            if sim >= min_similarity:
-                key = (nb.get("title") or "") + "|" + (nb.get("isbn") or "")
-                if key in seen:
-                    continue
-                seen.add(key)
-                collected.append(nb)
-    return collected
+        task = asyncio.ensure_future(_search_one(src, matcher, max_results=max_results_per_source, min_similarity=min_similarity, api_keys=api_keys, lang=lang, timeout=timeout))
+        tasks[task] = src
+
+    started = time.monotonic()
+    limit = timeout if deadline is None else deadline
+    pending = set(tasks)
+    try:
+        while pending:
+            remaining = limit - (time.monotonic() - started)
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield task.result()
+        for task in pending:
+            yield tasks[task], {"status": STATUS_TIMEOUT, "count": 0, "error": None, "elapsed": round(time.monotonic() - started, 3)}, []
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def search_title(title: str, **kwargs: Any) -> Tuple[List[NormalizedBook], Dict[str, Dict[str, Any]]]:
+    """本地书目优先，再并发查询各来源；返回截止时间前到达的结果（跨来源融合后按相似度排序）及各来源状态。参数同 iter_search_title。"""
+    statuses: Dict[str, Dict[str, Any]] = {}
+    by_source: Dict[str, List[NormalizedBook]] = {}
+    async for src, status, items in iter_search_title(title, **kwargs):
+        statuses[src] = status
+        by_source[src] = items
+    collected: List[NormalizedBook] = []
+    for src in [SOURCE_LOCAL] + _source_order(kwargs.get("prefer_order"), kwargs.get("force_source")):
+        collected += by_source.get(src, [])
+    # 同一版次的跨来源记录融合为一条，再一次批量打分排序；同分时本地与优先级高的来源在前
+    return [nb for _, nb in TitleMatcher(title).rank(merge.merge_books(collected))], statuses
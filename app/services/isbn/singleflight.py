@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from app.core.config import get_settings
+from app.services.redis_client import get_redis_service
+
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Request coalescing within one worker: while a call for a key is in flight,
+    later callers with the same key wait for that call's result instead of
+    starting their own. The work runs as an independent task, so a waiter being
+    cancelled (e.g. client disconnect) does not cancel the work other waiters
+    depend on.
+    """
+
+    def __init__(self) -> None:
+        self._tasks: Dict[Hashable, Tuple[asyncio.AbstractEventLoop, asyncio.Task]] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        loop = asyncio.get_running_loop()
+        entry = self._tasks.get(key)
+        if entry is None or entry[0] is not loop or entry[1].done():
+            task = loop.create_task(fn())
+            self._tasks[key] = (loop, task)
+            task.add_done_callback(lambda t, k=key: self._forget(k, t))
+        else:
+            task = entry[1]
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task) -> None:
+        entry = self._tasks.get(key)
+        if entry is not None and entry[1] is task:
+            del self._tasks[key]
+        # 所有等待方都已离开时避免 "exception was never retrieved" 告警
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self) -> int:
+        return len(self._tasks)
+
+
+# 跨 worker：短期 Redis 锁，未抢到锁的 worker 轮询缓存等待持锁方的结果
+# KEYS[1]=锁；ARGV[1]=持锁令牌。令牌一致时才删除，比较与删除在 Redis 端原子执行
+RELEASE_LUA = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+_scripts: Dict[int, Tuple[Any, Any]] = {}
+
+
+def _lock_key(name: str) -> str:
+    return f"isbn:inflight:{name}"
+
+
+def _release_script(client: Any) -> Any:
+    entry = _scripts.get(id(client))
+    if entry is None or entry[0] is not client:
+        entry = (client, client.register_script(RELEASE_LUA))
+        _scripts[id(client)] = entry
+    return entry[1]
+
+
+async def try_acquire(name: str) -> Optional[str]:
+    """抢占跨 worker 锁，成功返回持锁令牌，锁被其他 worker 持有时返回 None。
+
+    Redis 不可用时同样返回令牌，退化为仅进程内合并。
+    """
+    token = uuid.uuid4().hex
+    try:
+        ok = await get_redis_service().get_async_client().set(_lock_key(name), token, nx=True, ex=get_settings().isbn_singleflight_lock_ttl)
+    except Exception:
+        return token
+    return token if ok else None
+
+
+async def is_locked(name: str) -> bool:
+    try:
+        return bool(await get_redis_service().get_async_client().get(_lock_key(name)))
+    except Exception:
+        return False
+
+
+async def release(name: str, token: str) -> None:
+    # 仅释放自己持有的锁（锁可能已过期并被其他 worker 重新获取）
+    try:
+        await _release_script(get_redis_service().get_async_client())(keys=[_lock_key(name)], args=[token])
+    except Exception:
+        pass
@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from app.core.config import get_settings
+from app.services.isbn.circuit_breaker import get_breakers
+from app.services.isbn.client_base import RateLimitError
+from app.services.isbn.rate_limiter import get_rate_limiter
+from app.services.isbn.source_health import get_source_health
+
+
+T = TypeVar("T")
+
+
+class SourceRejected(Exception):
+    """熔断器打开或令牌桶在等待上限内无令牌，本次未调用上游。"""
+
+
+def is_available(source: str) -> bool:
+    return get_breakers().get(source).is_available()
+
+
+def _ban_seconds(exc: RateLimitError) -> int:
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after:
+        return max(1, int(retry_after))
+    return get_settings().isbn_rate_limit_ban_seconds
+
+
+def _admit_or_raise(source: str, admitted: bool) -> None:
+    if not admitted:
+        raise SourceRejected(f"{source} over its request quota")
+
+
+async def call(source: str, fn: Callable[[], Awaitable[T]]) -> T:
+    """经熔断器与令牌桶调用上游；限流错误同时打开熔断器并写入跨 worker 封禁。
+
+    未放行时抛出 SourceRejected；上游异常原样抛出。
+    """
+    breaker = get_breakers().get(source)
+    if not breaker.allow():
+        raise SourceRejected(f"{source} circuit open")
+    try:
+        _admit_or_raise(source, await get_rate_limiter().acquire(source))
+    except BaseException:
+        breaker.release()
+        raise
+    started = time.monotonic()
+    try:
+        result = await fn()
+    except RateLimitError as e:
+        ban = _ban_seconds(e)
+        breaker.trip(ban)
+        await get_source_health().mark_rate_limited(source, ban)
+        raise
+    except Exception:
+        breaker.record_failure(time.monotonic() - started)
+        raise
+    except BaseException:
+        # 竞速中被取消（其他来源已返回）：不计入统计，归还探测名额
+        breaker.release()
+        raise
+    breaker.record_success(time.monotonic() - started)
+    return result
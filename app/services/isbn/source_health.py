@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.services.redis_client import get_redis_service
+from app.services.isbn import (
+    SOURCE_LOC,
+    SOURCE_NLC_CHINA,
+    SOURCE_NDL,
+    SOURCE_KOLISNET,
+    SOURCE_BRITISH_LIBRARY,
+    SOURCE_HKPL,
+    SOURCE_GOOGLE_BOOKS,
+    SOURCE_OPEN_LIBRARY,
+    SOURCE_ISBNDB,
+    SOURCE_WORLDCAT,
+)
+
+logger = logging.getLogger(__name__)
+
+ALL_SOURCES: List[str] = [
+    SOURCE_LOC,
+    SOURCE_OPEN_LIBRARY,
+    SOURCE_GOOGLE_BOOKS,
+    SOURCE_WORLDCAT,
+    SOURCE_ISBNDB,
+    SOURCE_NLC_CHINA,
+    SOURCE_HKPL,
+    SOURCE_NDL,
+    SOURCE_KOLISNET,
+    SOURCE_BRITISH_LIBRARY,
+]
+
+
+def rate_limit_key(source: str) -> str:
+    return f"isbn:ratelimit:{source}"
+
+
+class SourceHealth:
+    """
+    Local snapshot of the per-source rate-limit bans stored in Redis.
+
+    All sources are read with a single MGET and the snapshot is reused until it
+    is older than `max_age`; a background task keeps it fresh while the app is
+    running, so the resolve hot path only reads local memory. Bans set by this
+    worker are applied to the snapshot immediately. Redis errors keep the last
+    known snapshot.
+    """
+
+    def __init__(self, sources: List[str], max_age: float, refresh_interval: float) -> None:
+        self.sources = list(sources)
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self._banned: Dict[str, bool] = {}
+        self._fetched_at = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def _apply(self, values: List[Optional[str]]) -> None:
+        self._banned = {src: bool(v) for src, v in zip(self.sources, values)}
+        self._fetched_at = time.monotonic()
+
+    def is_stale(self) -> bool:
+        return time.monotonic() - self._fetched_at > self.max_age
+
+    async def refresh(self) -> None:
+        try:
+            values = await get_redis_service().get_async_client().mget([rate_limit_key(s) for s in self.sources])
+        except Exception as e:
+            logger.warning(f"source health refresh failed: {e}")
+            self._fetched_at = time.monotonic()
+            return
+        self._apply(values)
+
+    async def ensure_fresh(self) -> None:
+        if self.is_stale():
+            await self.refresh()
+
+    def is_rate_limited(self, source: str) -> bool:
+        # 只读本地快照；调用方在一次解析开始时 await ensure_fresh()
+        return self._banned.get(source, False)
+
+    async def mark_rate_limited(self, source: str, ttl_seconds: int) -> None:
+        self._banned[source] = True
+        try:
+            await get_redis_service().get_async_client().setex(rate_limit_key(source), ttl_seconds, "1")
+        except Exception as e:
+            logger.warning(f"failed to persist rate limit for {source}: {e}")
+
+    def snapshot(self) -> Dict[str, bool]:
+        return dict(self._banned)
+
+    async def _run(self) -> None:
+        while True:
+            await self.refresh()
+            await asyncio.sleep(self.refresh_interval)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+@lru_cache(maxsize=1)
+def get_source_health() -> SourceHealth:
+    s = get_settings()
+    return SourceHealth(
+        ALL_SOURCES,
+        max_age=s.isbn_source_health_max_age,
+        refresh_interval=s.isbn_source_health_refresh_interval,
+    )
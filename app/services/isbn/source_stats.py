@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import threading
+from collections import deque
+from functools import lru_cache
+from typing import Deque, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+
+
+HIT = "hit"
+MISS = "miss"
+ERROR = "error"
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    idx = min(len(sorted_values) - 1, max(0, int(round(q * (len(sorted_values) - 1)))))
+    return sorted_values[idx]
+
+
+class SourceStats:
+    """
+    Rolling per-worker statistics of upstream ISBN sources.
+
+    Latency is kept per source (last `window` calls); outcomes (hit / miss /
+    error) are kept per source and per (source, ISBN registration group), since
+    e.g. NLC is excellent for 978-7 and useless for 978-0. `rank` orders
+    candidate sources by expected time to a good answer, latency / P(hit),
+    which is the optimal order for trying sources one after another. The
+    static priority list acts as the prior, so with no data the order is
+    unchanged and a few unlucky calls do not reshuffle it.
+    """
+
+    def __init__(self, window: int, prior_weight: float, prior_latency: float) -> None:
+        self.window = max(1, window)
+        self.prior_weight = prior_weight
+        self.prior_latency = prior_latency
+        self._latency: Dict[str, Deque[float]] = {}
+        self._outcomes: Dict[Tuple[str, str], Deque[str]] = {}
+        self._lock = threading.Lock()
+
+    def _deque(self, store: Dict, key) -> Deque:
+        d = store.get(key)
+        if d is None:
+            d = store[key] = deque(maxlen=self.window)
+        return d
+
+    def record(self, source: str, group: Optional[str], outcome: str, elapsed: Optional[float] = None) -> None:
+        with self._lock:
+            if elapsed is not None:
+                self._deque(self._latency, source).append(elapsed)
+            self._deque(self._outcomes, (source, "")).append(outcome)
+            if group:
+                self._deque(self._outcomes, (source, group)).append(outcome)
+
+    def latency(self, source: str) -> Optional[Tuple[float, float]]:
+        """(p50, p95)，无样本返回 None。"""
+        with self._lock:
+            values = sorted(self._latency.get(source) or ())
+        if not values:
+            return None
+        return _percentile(values, 0.5), _percentile(values, 0.95)
+
+    def _rates(self, source: str, group: str) -> Tuple[int, int, int]:
+        outcomes = self._outcomes.get((source, group)) or ()
+        hits = sum(1 for o in outcomes if o == HIT)
+        errors = sum(1 for o in outcomes if o == ERROR)
+        return len(outcomes), hits, errors
+
+    def hit_rate(self, source: str, group: Optional[str], prior: float) -> float:
+        """贝叶斯平滑的命中率：静态先验 → 来源整体 → 注册组，逐级以 prior_weight 个伪样本收缩。"""
+        w = self.prior_weight
+        with self._lock:
+            n, hits, _ = self._rates(source, "")
+            p = (hits + prior * w) / (n + w)
+            if group:
+                n, hits, _ = self._rates(source, group)
+                p = (hits + p * w) / (n + w)
+        return p
+
+    def expected_cost(self, source: str, group: Optional[str], prior: float) -> float:
+        with self._lock:
+            samples = sorted(self._latency.get(source) or ())
+        w = self.prior_weight
+        p50 = _percentile(samples, 0.5) if samples else self.prior_latency
+        latency = (p50 * len(samples) + self.prior_latency * w) / (len(samples) + w)
+        return latency / max(self.hit_rate(source, group, prior), 1e-3)
+
+    def rank(self, order: List[str], group: Optional[str]) -> List[str]:
+        # 先验命中率随静态位次递减，无统计数据时排序与静态顺序一致
+        priors = {src: max(0.05, 0.9 * 0.8 ** i) for i, src in enumerate(order)}
+        costs = {src: self.expected_cost(src, group, priors[src]) for src in order}
+        return sorted(order, key=lambda src: costs[src])
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        with self._lock:
+            sources = {src for src, _ in self._outcomes} | set(self._latency)
+        result: Dict[str, Dict[str, object]] = {}
+        for src in sorted(sources):
+            with self._lock:
+                n, hits, errors = self._rates(src, "")
+                groups = {
+                    g: round(sum(1 for o in d if o == HIT) / len(d), 3)
+                    for (s, g), d in self._outcomes.items()
+                    if s == src and g and d
+                }
+            lat = self.latency(src)
+            result[src] = {
+                "calls": n,
+                "hitRate": round(hits / n, 3) if n else None,
+                "errorRate": round(errors / n, 3) if n else None,
+                "p50": round(lat[0], 3) if lat else None,
+                "p95": round(lat[1], 3) if lat else None,
+                "groupHitRate": groups,
+            }
+        return result
+
+
+@lru_cache(maxsize=1)
+def get_source_stats() -> SourceStats:
+    s = get_settings()
+    return SourceStats(
+        window=s.isbn_source_stats_window,
+        prior_weight=s.isbn_source_stats_prior_weight,
+        prior_latency=s.isbn_source_prior_latency,
+    )
@@ -0,0 +1,312 @@
+"""
+Streaming parser for SRU (Search/Retrieve via URL) XML responses.
+
+The response is fed to an XMLPullParser chunk by chunk; each <recordData>
+subtree is mapped to a NormalizedBook as soon as its end tag arrives and is
+then cleared, so memory is bounded by one record rather than by the whole
+response. Record schemas:
+
+- dcndl  NDL Search (RDF/XML with dcterms, dcndl and foaf)
+- mods   MODS v3 (British Library)
+- dc     simple Dublin Core (srw_dc / oai_dc; KOLIS-NET)
+
+The ISBN adapters (NDL, British Library, KOLIS-NET) ask for a single record
+and keep the response XML as `raw`, so they parse the buffered body with
+parse_response; iter_records is for large multi-record responses.
+
+Records packed as escaped strings (recordPacking=string) are parsed as well.
+An SRU diagnostic with no records raises SruDiagnostic, so a bad query is
+reported as an error rather than as "not found".
+"""
+from __future__ import annotations
+
+import re
+import xml.etree.ElementTree as ET
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
+
+from app.services.isbn.types import NormalizedBook
+from app.utils.isbn import to_isbn10, to_isbn13
+
+SCHEMA_DCNDL = "dcndl"
+SCHEMA_MODS = "mods"
+SCHEMA_DC = "dc"
+
+NS = {
+    "rdf": "http://www.w3.org/1999/02/22-rdf-syntax-ns#",
+    "dc": "http://purl.org/dc/elements/1.1/",
+    "dcterms": "http://purl.org/dc/terms/",
+    "dcndl": "http://ndl.go.jp/dcndl/terms/",
+    "foaf": "http://xmlns.com/foaf/0.1/",
+    "mods": "http://www.loc.gov/mods/v3",
+}
+
+CHUNK_SIZE = 64 * 1024
+
+# ISO 639-2 → ISO 639-1（与其他来源的 language 取值保持一致）
+_LANGUAGES = {
+    "jpn": "ja", "eng": "en", "kor": "ko", "chi": "zh", "zho": "zh", "fre": "fr", "fra": "fr",
+    "ger": "de", "deu": "de", "spa": "es", "ita": "it", "rus": "ru", "por": "pt", "dut": "nl", "nld": "nl",
+}
+
+# 载体形态中的页数："268p ; 20cm" / "xiii, 392 pages" / "320頁" / "412쪽"
+_PAGES = re.compile(r"(\d+)\s*(?:p\b|p\.|pp\.|pages?\b|頁|ページ|쪽|면)", re.IGNORECASE)
+
+# SRU 1.x / 2.0 响应中需要处理的元素（按完整标签名直接查表，避免逐个事件解析命名空间）
+_SRU_NAMESPACES = (
+    "",
+    "{http://www.loc.gov/zing/srw/}",
+    "{http://docs.oasis-open.org/ns/search-ws/sruResponse}",
+    "{http://www.loc.gov/zing/srw/diagnostic/}",
+    "{http://docs.oasis-open.org/ns/search-ws/diagnostic}",
+)
+_SRU_TAGS = {ns + name: name for ns in _SRU_NAMESPACES for name in ("records", "record", "recordData", "diagnostic")}
+
+_RDF_ABOUT = f"{{{NS['rdf']}}}about"
+_RDF_DATATYPE = f"{{{NS['rdf']}}}datatype"
+
+
+class SruDiagnostic(Exception):
+    """SRU 服务返回诊断信息（查询错误、服务不可用等）且没有记录。"""
+
+
+@lru_cache(maxsize=None)
+def _q(path: str) -> str:
+    """前缀路径 → Clark 记法（{uri}name），省去 ElementPath 每次按命名空间表展开。"""
+    return re.sub(r"(\w+):(?=\w)", lambda m: f"{{{NS[m.group(1)]}}}", path)
+
+
+def _local(tag: object) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _text(elem: Optional[ET.Element]) -> Optional[str]:
+    if elem is None or elem.text is None:
+        return None
+    value = " ".join(elem.text.split())
+    return value or None
+
+
+def _texts(elems: Iterable[ET.Element]) -> List[str]:
+    return list(dict.fromkeys(t for t in map(_text, elems) if t))
+
+
+def _language(code: Optional[str]) -> Optional[str]:
+    if not code:
+        return None
+    return _LANGUAGES.get(code.lower(), code.lower())
+
+
+def _page_count(extent: Optional[str]) -> Optional[int]:
+    m = _PAGES.search(extent or "")
+    return int(m.group(1)) if m else None
+
+
+def _isbn_identifiers(values: Iterable[str]) -> Dict[str, Optional[str]]:
+    for value in values:
+        isbn13 = to_isbn13(value)
+        if isbn13:
+            return {"isbn_13": isbn13, "isbn_10": to_isbn10(isbn13)}
+    return {}
+
+
+def _book(source: str, identifiers: Dict[str, Optional[str]], **fields) -> NormalizedBook:
+    book: NormalizedBook = {
+        "source": source,
+        "isbn": identifiers.get("isbn_13") or "",
+        "title": None,
+        "subtitle": None,
+        "creators": [],
+        "publisher": None,
+        "published_date": None,
+        "language": None,
+        "subjects": [],
+        "description": None,
+        "page_count": None,
+        "identifiers": {k: v for k, v in identifiers.items() if v},
+        "cover": {},
+        "preview_urls": [],
+    }
+    book.update(fields)  # type: ignore[typeddict-item]
+    return book
+
+
+def _map_dcndl(root: ET.Element, source: str) -> Optional[NormalizedBook]:
+    res = root.find(_q("dcndl:BibResource")) if _local(root.tag) == "RDF" else root
+    if res is None:
+        return None
+    identifiers: Dict[str, Optional[str]] = {}
+    isbns = []
+    for ident in res.findall(_q("dcterms:identifier")):
+        kind = (ident.get(_RDF_DATATYPE) or "").rsplit("/", 1)[-1]
+        value = _text(ident)
+        if not value:
+            continue
+        if kind == "ISBN":
+            isbns.append(value)
+        elif kind in ("JPNO", "NDLBibID"):
+            identifiers[kind.lower()] = value
+    identifiers.update(_isbn_identifiers(isbns))
+
+    title = _text(res.find(_q("dcterms:title"))) or _text(res.find(_q("dc:title/rdf:Description/rdf:value")))
+    creators = [{"name": name, "role": None} for name in _texts(res.findall(_q("dcterms:creator/foaf:Agent/foaf:name")))]
+    if not creators:
+        creators = [{"name": name, "role": None} for name in _texts(res.findall(_q("dc:creator")))]
+    subjects = _texts(res.findall(_q("dcterms:subject/rdf:Description/rdf:value"))) + _texts(res.findall(_q("dcterms:subject")))
+    about = (res.get(_RDF_ABOUT) or "").split("#", 1)[0]
+    return _book(
+        source,
+        identifiers,
+        title=title,
+        creators=creators,
+        publisher=_text(res.find(_q("dcterms:publisher/foaf:Agent/foaf:name"))),
+        published_date=_text(res.find(_q("dcterms:issued"))) or _text(res.find(_q("dcterms:date"))),
+        language=_language(_text(res.find(_q("dcterms:language")))),
+        subjects=list(dict.fromkeys(subjects)),
+        description=_text(res.find(_q("dcterms:abstract"))) or _text(res.find(_q("dcterms:description"))),
+        page_count=_page_count(_text(res.find(_q("dcterms:extent")))),
+        preview_urls=[about] if about.startswith("http") else [],
+    )
+
+
+def _mods_name(name: ET.Element) -> Dict[str, Optional[str]]:
+    parts = {p.get("type"): _text(p) for p in name.findall(_q("mods:namePart"))}
+    full = parts.get(None) or ", ".join(filter(None, (parts.get("family"), parts.get("given"))))
+    role = _text(name.find(_q("mods:role/mods:roleTerm[@type='text']"))) or _text(name.find(_q("mods:role/mods:roleTerm")))
+    return {"name": full or None, "role": role}
+
+
+def _map_mods(root: ET.Element, source: str) -> Optional[NormalizedBook]:
+    mods = root if _local(root.tag) == "mods" else root.find(_q(".//mods:mods"))
+    if mods is None:
+        return None
+    info = next((t for t in mods.findall(_q("mods:titleInfo")) if t.get("type") is None), None)
+    title = None
+    if info is not None:
+        title = " ".join(filter(None, (_text(info.find(_q("mods:nonSort"))), _text(info.find(_q("mods:title")))))) or None
+    identifiers = _isbn_identifiers(_texts(mods.findall(_q("mods:identifier[@type='isbn']"))))
+    record_id = _text(mods.find(_q("mods:recordInfo/mods:recordIdentifier")))
+    if record_id:
+        identifiers[f"{source}_record"] = record_id
+    creators = [c for c in map(_mods_name, mods.findall(_q("mods:name"))) if c["name"]]
+    return _book(
+        source,
+        identifiers,
+        title=title,
+        subtitle=_text(info.find(_q("mods:subTitle"))) if info is not None else None,
+        creators=creators,
+        publisher=_text(mods.find(_q("mods:originInfo/mods:publisher"))),
+        published_date=_text(mods.find(_q("mods:originInfo/mods:dateIssued"))),
+        language=_language(_text(mods.find(_q("mods:language/mods:languageTerm")))),
+        subjects=_texts(mods.findall(_q("mods:subject/mods:topic"))),
+        description=_text(mods.find(_q("mods:abstract"))),
+        page_count=_page_count(_text(mods.find(_q("mods:physicalDescription/mods:extent")))),
+    )
+
+
+def _map_dc(root: ET.Element, source: str) -> Optional[NormalizedBook]:
+    identifiers = _isbn_identifiers(_texts(root.iter(f"{{{NS['dc']}}}identifier")))
+
+    def first(name: str) -> Optional[str]:
+        return _text(root.find(_q(f".//dc:{name}")))
+
+    return _book(
+        source,
+        identifiers,
+        title=first("title"),
+        creators=[{"name": name, "role": None} for name in _texts(root.iter(f"{{{NS['dc']}}}creator"))],
+        publisher=first("publisher"),
+        published_date=first("date"),
+        language=_language(first("language")),
+        subjects=_texts(root.iter(f"{{{NS['dc']}}}subject")),
+        description=first("description"),
+        page_count=_page_count(first("format")),
+    )
+
+
+_MAPPERS: Dict[str, Callable[[ET.Element, str], Optional[NormalizedBook]]] = {
+    SCHEMA_DCNDL: _map_dcndl,
+    SCHEMA_MODS: _map_mods,
+    SCHEMA_DC: _map_dc,
+}
+
+
+def _record_root(record_data: ET.Element) -> Optional[ET.Element]:
+    children = list(record_data)
+    if children:
+        return children[0]
+    # recordPacking=string：记录以转义的 XML 文本出现
+    text = (record_data.text or "").strip()
+    if text.startswith("<"):
+        try:
+            return ET.fromstring(text)
+        except ET.ParseError:
+            return None
+    return None
+
+
+def iter_records(chunks: Iterable[bytes], schema: str, *, source: str) -> Iterator[NormalizedBook]:
+    """逐块解析 SRU 响应，按文档顺序产出每条记录对应的 NormalizedBook；已处理的记录子树随即释放。"""
+    mapper = _MAPPERS[schema]
+    parser = ET.XMLPullParser(events=("start", "end"))
+    diagnostics: List[str] = []
+    produced = 0
+    container: List[ET.Element] = []
+
+    def drain() -> Iterator[NormalizedBook]:
+        nonlocal produced
+        for event, elem in parser.read_events():
+            name = _SRU_TAGS.get(elem.tag)
+            if name is None:
+                continue
+            if event == "start":
+                if name == "records":
+                    container.append(elem)
+                continue
+            if name == "recordData":
+                root = _record_root(elem)
+                book = mapper(root, source) if root is not None else None
+                elem.clear()
+                if book is not None:
+                    produced += 1
+                    yield book
+            elif name == "record":
+                # 已处理的记录从 <records> 中摘除，避免空元素随记录数累积
+                if container and len(container[-1]) and container[-1][0] is elem:
+                    del container[-1][0]
+                else:
+                    elem.clear()
+            elif name == "diagnostic":
+                parts = {_local(c.tag): _text(c) for c in elem}
+                diagnostics.append(" ".join(filter(None, (parts.get("message"), parts.get("details")))) or "unknown diagnostic")
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from drain()
+    parser.close()
+    yield from drain()
+    if diagnostics and not produced:
+        raise SruDiagnostic(f"{source}: {'; '.join(diagnostics)}")
+
+
+def parse_response(content: Union[bytes, str], schema: str, *, source: str) -> List[NormalizedBook]:
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    return list(iter_records((data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)), schema, source=source))
+
+
+def pick(records: List[NormalizedBook], isbn: str) -> Optional[NormalizedBook]:
+    """ISBN 一致的首条记录；没有时取首条未登记 ISBN 的记录。
+
+    登记了其他 ISBN 的记录是别的书，不作为结果返回（否则会以其 ISBN 写入书目）。
+    """
+    wanted = to_isbn13(isbn)
+    if wanted:
+        match = next((r for r in records if r["identifiers"].get("isbn_13") == wanted), None)
+        if match is not None:
+            return match
+    return next((r for r in records if not (r["identifiers"].get("isbn_13") or r["identifiers"].get("isbn_10"))), None)
+
+
+def empty_book(source: str, isbn: str) -> NormalizedBook:
+    """无记录时的空结果（title 为空，按未命中处理）。"""
+    return _book(source, {}, isbn=isbn)
@@ -19,6 +19,9 @@ class NormalizedBook(TypedDict, total=False):
     cover: Dict[str, Optional[str]]
     preview_urls: List[str]
     raw: Dict[str, Any]
+    # 多来源融合的记录：参与融合的来源及每个字段的取值来源
+    sources: List[str]
+    provenance: Dict[str, str]
 
 
 class SearchResult(TypedDict, total=False):
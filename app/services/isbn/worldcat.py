@@ -1,25 +1,26 @@
 from __future__ import annotations
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
 
-from app.services.isbn.client_base import HttpClient, RateLimitError, HttpError
+import httpx
+
+from app.services.isbn.client_base import AsyncHttpClient, check_response
 from app.services.isbn.types import NormalizedBook
 
 
-def fetch_by_isbn(isbn: str, *, wskey: str, access_token: Optional[str] = None, timeout: float = 10.0) -> NormalizedBook:
-    # Prefer SRU-like JSON endpoint without OAuth where available
-    client = HttpClient(base_url="https://worldcat.org", timeout=timeout)
+BASE_URL = "https://worldcat.org"
+
+
+def _request(isbn: str, wskey: str, access_token: Optional[str]) -> Tuple[Dict[str, Any], Dict[str, str]]:
     headers: Dict[str, str] = {}
     params: Dict[str, Any] = {"q": f"isbn:{isbn}", "wskey": wskey, "format": "json", "limit": 1}
     if access_token:
         headers["Authorization"] = f"Bearer {access_token}"
-    r = client.get("/discovery/bib/search", params=params, headers=headers)
-    if r.status_code in (403, 429):
-        client.close()
-        raise RateLimitError("worldcat rate limited")
-    if r.status_code >= 400:
-        client.close()
-        raise HttpError(r.status_code, r.text)
+    return params, headers
+
+
+def _parse_isbn(isbn: str, r: httpx.Response) -> NormalizedBook:
+    check_response(r, "worldcat")
     data = r.json()
     items = (data.get("bibRecords") or []) if isinstance(data, dict) else []
     first = items[0] if items else {}
@@ -61,5 +62,12 @@ def fetch_by_isbn(isbn: str, *, wskey: str, access_token: Optional[str] = None,
         "preview_urls": [],
         "raw": data if isinstance(data, dict) else {},
     }
-    client.close()
     return book
+
+
+async def fetch_by_isbn_async(isbn: str, *, wskey: str, access_token: Optional[str] = None, timeout: float = 10.0) -> NormalizedBook:
+    # Prefer SRU-like JSON endpoint without OAuth where available
+    client = AsyncHttpClient(base_url=BASE_URL, timeout=timeout)
+    params, headers = _request(isbn, wskey, access_token)
+    r = await client.get("/discovery/bib/search", params=params, headers=headers)
+    return _parse_isbn(isbn, r)
@@ -1,13 +1,16 @@
 from __future__ import annotations
 
-from typing import Optional
+import asyncio
+from typing import Optional, Tuple
 
-from pymongo import MongoClient
+from pymongo import AsyncMongoClient, MongoClient
 
 from app.core.config import get_settings
 
 
 _client: Optional[MongoClient] = None
+# 异步客户端绑定创建时的事件循环，循环变化（如测试/脚本多次 asyncio.run）时重建
+_async_client: Optional[Tuple[asyncio.AbstractEventLoop, AsyncMongoClient]] = None
 
 
 def get_mongo_client() -> MongoClient:
@@ -21,3 +24,26 @@ def get_mongo_client() -> MongoClient:
 def get_database():
     settings = get_settings()
     return get_mongo_client()[settings.mongo_db]
+
+
+def get_async_mongo_client() -> AsyncMongoClient:
+    global _async_client
+    loop = asyncio.get_running_loop()
+    if _async_client is None or _async_client[0] is not loop:
+        settings = get_settings()
+        _async_client = (loop, AsyncMongoClient(settings.mongo_uri, serverSelectionTimeoutMS=2000))
+    return _async_client[1]
+
+
+def get_async_database():
+    settings = get_settings()
+    return get_async_mongo_client()[settings.mongo_db]
+
+
+async def aclose_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        loop, client = _async_client
+        _async_client = None
+        if loop is asyncio.get_running_loop():
+            await client.close()
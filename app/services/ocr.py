@@ -1,10 +1,241 @@
 from __future__ import annotations
 
-from typing import List, Tuple
-
+import asyncio
 import io
+import logging
+import multiprocessing
+import re
+import threading
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache, partial
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple
+
 from PIL import Image, ImageOps, ImageFilter  # type: ignore
 
+from app.core.config import get_settings
+from app.services.barcode import locate_barcodes
+
+logger = logging.getLogger(__name__)
+
+
+def _binarize(base: Image.Image) -> Image.Image:
+    return base.point(lambda p: 255 if p > 180 else 0).convert("L")
+
+
+def _median(base: Image.Image) -> Image.Image:
+    # Slight blur then sharpen to remove noise
+    return base.filter(ImageFilter.MedianFilter(size=3))
+
+
+def _rotate(base: Image.Image, angle: float) -> Image.Image:
+    # Try rotations (deskew approximate)
+    return base.rotate(angle, expand=True, fillcolor=255)
+
+
+def _upscale(base: Image.Image, factor: float) -> Image.Image:
+    # Upscale to help small text
+    w, h = base.size
+    return base.resize((int(w * factor), int(h * factor)))
+
+
+# One TSV pass per variant yields words, boxes, confidences and line grouping at once
+_TESSERACT_CONFIG = "--oem 3 --psm 6"
+
+# Localization: one sparse-text pass over a low-resolution copy finds lines that look like an ISBN
+_LOCATE_CONFIG = "--oem 3 --psm 11"
+_ISBN_HINT = re.compile(r"[I1l|]\s?[S5]\s?[B8]\s?[NM]|(?:\d[\s-]?){9,}[\dX]", re.IGNORECASE)
+LOCATE_PASS = -1  # OCRPage.variant of the localization pass
+_MAX_REGIONS = 3
+# Crops covering more than this share of the image save too little; sweep the whole image instead
+_MAX_REGION_AREA = 0.5
+
+Box = Tuple[int, int, int, int]  # left, top, width, height
+
+# Preprocessing variants of the grayscale image, ordered cheapest / most likely to read
+# first so staged OCR can stop early: plain and contrast-normalised grayscale, cleanups,
+# small rotations, then upscales (2.25x / 4x the pixels, the slowest passes) last. Each worker
+# builds only the variant it runs, and upscales are skipped for images that are not small.
+_VARIANTS: List[Callable[[Image.Image], Image.Image]] = [
+    lambda base: base,
+    ImageOps.autocontrast,
+    _binarize,
+    ImageOps.equalize,
+    _median,
+    *(partial(_rotate, angle=a) for a in (-5, 5, -10, 10)),
+    partial(_upscale, factor=1.5),
+    partial(_upscale, factor=2),
+]
+
+
+class BaseImage(NamedTuple):
+    """Decoded grayscale upload, sent to pool workers as raw pixels (decoded once per request)."""
+
+    size: Tuple[int, int]
+    pixels: bytes
+    scale: float = 1.0  # base pixels per upload pixel (< 1 when downscaled)
+
+    @classmethod
+    def from_bytes(cls, content: bytes, max_side: int = 0) -> "BaseImage":
+        image = Image.open(io.BytesIO(content))
+        width = image.width
+        if max_side and max(image.size) > max_side:
+            # 超大图片（如手机原图）缩到 OCR 适宜分辨率；JPEG 直接按 1/2、1/4、1/8 缩放解码，不先解出整幅原图
+            scale = max_side / max(image.size)
+            image.draft("L", (round(image.width * scale), round(image.height * scale)))
+            image = image.convert("L")
+            image.thumbnail((max_side, max_side), Image.LANCZOS)
+        else:
+            image = image.convert("L")
+        return cls(image.size, image.tobytes(), image.width / width)
+
+    def to_image(self) -> Image.Image:
+        return Image.frombytes("L", self.size, self.pixels)
+
+    def crop(self, box: Box) -> "BaseImage":
+        x, y, w, h = box
+        region = self.to_image().crop((x, y, x + w, y + h))
+        return BaseImage(region.size, region.tobytes(), self.scale)
+
+
+class SharedImage(NamedTuple):
+    """
+    Handle to a BaseImage copied into shared memory once per stage: variant jobs
+    receive only the block name and size instead of each pickling the pixels.
+    """
+
+    name: str
+    size: Tuple[int, int]
+
+    @classmethod
+    def create(cls, base: BaseImage) -> Tuple["SharedImage", SharedMemory]:
+        # 块由创建方（OCRPool）在所有任务离开进程池后释放
+        block = SharedMemory(create=True, size=max(1, len(base.pixels)))
+        block.buf[: len(base.pixels)] = base.pixels
+        return cls(block.name, base.size), block
+
+    def load(self) -> BaseImage:
+        block = SharedMemory(self.name)
+        try:
+            return BaseImage(self.size, bytes(block.buf[: self.size[0] * self.size[1]]))
+        finally:
+            block.close()
+
+
+class OCRWord(NamedTuple):
+    text: str
+    conf: float
+    box: Box
+    line: Tuple[int, int, int]  # block_num, par_num, line_num
+
+
+class OCRPage(NamedTuple):
+    """Words recognised in one variant; plain text, line texts and samples are all derived from them."""
+
+    variant: int
+    words: List[OCRWord]
+
+    @classmethod
+    def from_data(cls, data: Dict[str, List[Any]], variant: int = 0) -> "OCRPage":
+        words: List[OCRWord] = []
+        for i, raw in enumerate(data.get("text") or []):
+            text = str(raw).strip()
+            if not text:
+                continue
+            try:
+                conf = float(data["conf"][i])
+            except (KeyError, IndexError, TypeError, ValueError):
+                conf = 0.0
+            if conf < 0:
+                # -1：非文字区域（页/块/段/行的汇总行）
+                continue
+            box = tuple(int(data[k][i]) for k in ("left", "top", "width", "height"))
+            line = tuple(int(data[k][i]) for k in ("block_num", "par_num", "line_num"))
+            words.append(OCRWord(text, conf, box, line))  # type: ignore[arg-type]
+        return cls(variant, words)
+
+    def line_items(self) -> List[Tuple[str, Box]]:
+        """Text and bounding box of each line."""
+        # line_num 在每个段落内重新计数，按 (块, 段, 行) 分组
+        groups: Dict[Tuple[int, int, int], List[OCRWord]] = {}
+        for word in self.words:
+            groups.setdefault(word.line, []).append(word)
+        items: List[Tuple[str, Box]] = []
+        for ws in groups.values():
+            left = min(w.box[0] for w in ws)
+            top = min(w.box[1] for w in ws)
+            right = max(w.box[0] + w.box[2] for w in ws)
+            bottom = max(w.box[1] + w.box[3] for w in ws)
+            items.append((" ".join(w.text for w in ws), (left, top, right - left, bottom - top)))
+        return items
+
+    @property
+    def lines(self) -> List[str]:
+        return [text for text, _ in self.line_items()]
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.lines)
+
+
+def _expand(box: Box, size: Tuple[int, int], left: float, top: float, right: float, bottom: float) -> Box:
+    x, y, w, h = box
+    x0, y0 = max(0, int(x - left)), max(0, int(y - top))
+    x1, y1 = min(size[0], int(x + w + right)), min(size[1], int(y + h + bottom))
+    return x0, y0, max(0, x1 - x0), max(0, y1 - y0)
+
+
+def _around_barcode(rect: Box, size: Tuple[int, int]) -> Box:
+    # 书号文字通常印在条码正上方（偶尔在下方）；zbar 给出的一维码高度不可靠，按宽度外扩
+    w = rect[2]
+    return _expand(rect, size, 0.15 * w, 0.6 * w, 0.15 * w, 0.9 * w)
+
+
+def _around_line(box: Box, size: Tuple[int, int]) -> Box:
+    # 低分辨率下数字常识别不全：向右延伸，上下各留一行高
+    h = box[3]
+    return _expand(box, size, 2 * h, h, 25 * h, h)
+
+
+def _overlaps(a: Box, b: Box) -> bool:
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def _union(a: Box, b: Box) -> Box:
+    x0, y0 = min(a[0], b[0]), min(a[1], b[1])
+    return x0, y0, max(a[0] + a[2], b[0] + b[2]) - x0, max(a[1] + a[3], b[1] + b[3]) - y0
+
+
+def _regions(boxes: List[Box], size: Tuple[int, int]) -> List[Box]:
+    """合并重叠区域；区域过多或合计面积过大时返回空列表（直接整图识别）。"""
+    merged: List[Box] = []
+    for box in boxes:
+        if not box[2] or not box[3]:
+            continue
+        # 新区域可能同时与多个已有区域重叠，反复合并到不再变化
+        while True:
+            hit = next((m for m in merged if _overlaps(m, box)), None)
+            if hit is None:
+                break
+            merged.remove(hit)
+            box = _union(hit, box)
+        merged.append(box)
+    area = sum(w * h for _, _, w, h in merged)
+    if len(merged) > _MAX_REGIONS or area > _MAX_REGION_AREA * size[0] * size[1]:
+        return []
+    return merged
+
+
+def _is_upscale(variant: Callable[[Image.Image], Image.Image]) -> bool:
+    return isinstance(variant, partial) and variant.func is _upscale
+
+
+def variant_indices(size: Tuple[int, int], upscale_max_side: int) -> Iterator[int]:
+    """Variants worth running on a base image of this size; upscaling only helps small images."""
+    small = max(size) <= upscale_max_side
+    return (i for i, variant in enumerate(_VARIANTS) if small or not _is_upscale(variant))
+
 
 class OCRService:
     """
@@ -15,123 +246,259 @@ class OCRService:
     def __init__(self, languages: str = "eng+chi_sim") -> None:
         self.languages = languages
 
-    def _preprocess_variants(self, image: Image.Image) -> List[Image.Image]:
-        variants: List[Image.Image] = []
-        base = image.convert("L")
-        variants.append(base)
-        # Increase contrast and sharpness
-        variants.append(ImageOps.autocontrast(base))
-        variants.append(ImageOps.equalize(base))
-        # Binarize
-        variants.append(base.point(lambda p: 255 if p > 180 else 0).convert("L"))
-        # Slight blur then sharpen to remove noise
-        variants.append(base.filter(ImageFilter.MedianFilter(size=3)))
-        # Upscale to help small text
-        try:
-            w, h = base.size
-            variants.append(base.resize((int(w * 1.5), int(h * 1.5))))
-            variants.append(base.resize((w * 2, h * 2)))
-        except Exception:
-            pass
-        # Try rotations (deskew approximate)
-        for angle in (-10, -5, 5, 10):
-            variants.append(base.rotate(angle, expand=True, fillcolor=255))
-        return variants
-
-    def image_bytes_to_texts(self, content: bytes) -> List[Tuple[str, str]]:
+    def _tesseract(self):
         # Lazy import pytesseract to avoid hard dependency during tests
         try:
             import importlib
-            pytesseract = importlib.import_module("pytesseract")  # type: ignore
+            return importlib.import_module("pytesseract")  # type: ignore
         except Exception as exc:  # pragma: no cover
             raise RuntimeError("pytesseract is not installed. Please install runtime deps.") from exc
 
-        image = Image.open(io.BytesIO(content))
-        texts: List[Tuple[str, str]] = []
-        for variant in self._preprocess_variants(image):
-            txt = pytesseract.image_to_string(variant, lang=self.languages)
-            if txt:
-                texts.append(("plain", txt))
-            # Also try oem/psm tweaks for strong block text
-            txt2 = pytesseract.image_to_string(variant, lang=self.languages, config="--oem 3 --psm 6")
-            if txt2 and txt2 != txt:
-                texts.append(("psm6", txt2))
-        return texts
-
-    def image_bytes_to_lines(self, content: bytes) -> List[str]:
+    def ocr_variant(self, base: BaseImage, index: int) -> OCRPage:
+        """One Tesseract pass (TSV) over one preprocessing variant of the grayscale base image."""
+        pytesseract = self._tesseract()
+        variant = _VARIANTS[index](base.to_image())
+        data = pytesseract.image_to_data(
+            variant,
+            lang=self.languages,
+            config=_TESSERACT_CONFIG,
+            output_type=getattr(pytesseract, 'Output').DICT,  # type: ignore
+        )
+        return OCRPage.from_data(data, index)
+
+    def locate(self, base: BaseImage, side: int, barcodes: Optional[List[Box]] = None) -> Tuple[OCRPage, List[Box]]:
         """
-        Use tesseract TSV output to assemble line-wise texts across preprocessing variants.
-        Group by line number to maintain local context (help locating 'ISBN' followed by digits).
+        Coarse localization: barcode rectangles (pyzbar) and lines that look like an
+        ISBN in one sparse-text pass over a copy downscaled to `side` pixels. Returns
+        that pass as a page (it may already contain a readable ISBN) and the regions
+        of the base image worth the full variant sweep.
+
+        `barcodes` are rectangles from an earlier pyzbar pass over the upload (upload
+        pixels); pyzbar only runs here when they are None.
         """
+        pytesseract = self._tesseract()
+        image = base.to_image()
+        if barcodes is None:
+            rects = locate_barcodes(image)
+        else:
+            rects = [tuple(round(v * base.scale) for v in rect) for rect in barcodes]  # type: ignore[misc]
+        boxes = [_around_barcode(rect, image.size) for rect in rects]
+        small = image.copy()
+        small.thumbnail((side, side))
+        scale = image.width / small.width
+        data = pytesseract.image_to_data(
+            small,
+            lang=self.languages,
+            config=_LOCATE_CONFIG,
+            output_type=getattr(pytesseract, 'Output').DICT,  # type: ignore
+        )
+        page = OCRPage.from_data(data, LOCATE_PASS)
+        for text, box in page.line_items():
+            if _ISBN_HINT.search(text):
+                boxes.append(_around_line(tuple(round(v * scale) for v in box), image.size))  # type: ignore[arg-type]
+        return page, _regions(boxes, image.size)
+
+
+def _ocr_variant_job(languages: str, image: SharedImage, index: int) -> OCRPage:
+    # 进程池任务入口（须为模块级函数以便序列化）
+    try:
+        return OCRService(languages).ocr_variant(image.load(), index)
+    except RuntimeError:
+        raise
+    except Exception as exc:
+        # pytesseract 的异常无法在主进程反序列化（会使进程池结果线程卡死），转为 RuntimeError
+        raise RuntimeError(f"{type(exc).__name__}: {exc}") from None
+
+
+def _locate_job(languages: str, base: BaseImage, side: int, barcodes: Optional[List[Box]]) -> Tuple[OCRPage, List[Box]]:
+    try:
+        return OCRService(languages).locate(base, side, barcodes)
+    except RuntimeError:
+        raise
+    except Exception as exc:
+        raise RuntimeError(f"{type(exc).__name__}: {exc}") from None
+
+
+class OCRBusy(Exception):
+    """OCR 请求名额已满。"""
+
+
+class OCRTimeout(Exception):
+    """单次请求的 OCR 截止时间已到。"""
+
+
+class _Slot:
+    """
+    One admitted request. Its admission slot is returned only once the request has
+    ended and every job it submitted has left the pool (finished, or cancelled before
+    it started); the request's shared images are freed at the same time.
+    """
+
+    def __init__(self, owner: "OCRPool") -> None:
+        self._owner = owner
+        self._holds = 1  # 请求本身
+        self._jobs: List[Future] = []
+        self._blocks: List[SharedMemory] = []
+
+    def share(self, image: BaseImage) -> SharedImage:
+        shared, block = SharedImage.create(image)
+        self._blocks.append(block)
+        return shared
+
+    def submit(self, pool: Executor, fn: Callable[..., Any], *args: Any) -> "asyncio.Future[Any]":
+        job = pool.submit(fn, *args)
+        with self._owner._lock:
+            self._holds += 1
+        self._jobs.append(job)
+        # 回调在结果线程（或取消方）中执行；已完成的任务立即回调
+        job.add_done_callback(self._release)
+        return asyncio.wrap_future(job)
+
+    def close(self) -> None:
+        # 取消尚未开始的任务；已在工作进程中运行的任务跑完后才归还名额
+        for job in self._jobs:
+            job.cancel()
+        self._release()
+
+    def _release(self, _job: Optional[Future] = None) -> None:
+        with self._owner._lock:
+            self._holds -= 1
+            if self._holds:
+                return
+            self._owner._active -= 1
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+
+class OCRPool:
+    """
+    Bounded worker pool that keeps Tesseract off the event loop.
+
+    Each preprocessing variant is one job (a single Tesseract pass). A request
+    decodes the upload once (downscaled to at most `max_side` pixels) and runs in
+    stages, each yielding pages in completion order:
+
+    1. one coarse pass (`locate_side` pixels) that finds the barcode (or reuses
+       the caller's pyzbar rectangles) and lines that look like an ISBN, yielded
+       as the first page;
+    2. the variant sweep on each of those regions, cropped from the base image;
+    3. the variant sweep on the whole image, submitted only if the caller is
+       still iterating after the region sweep (or no region was found).
+
+    Each image a stage sweeps is copied into shared memory once; variant jobs
+    carry only its name.
+
+    At most `max_requests` requests are admitted per API worker; further ones
+    fail fast with OCRBusy instead of queueing behind a saturated pool. When the
+    caller stops early or the deadline passes, jobs that have not started are
+    cancelled; jobs already running in a worker process finish in the background
+    and keep the request's slot until they do, so admission follows the actual
+    load on the workers rather than the number of open requests.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        max_requests: int,
+        languages: str = "eng+chi_sim",
+        executor: Optional[Executor] = None,
+        max_side: int = 2000,
+        upscale_max_side: int = 1000,
+        locate_side: int = 1000,
+    ) -> None:
+        self.workers = workers
+        self.max_requests = max(1, max_requests)
+        self.languages = languages
+        self.max_side = max_side
+        self.upscale_max_side = upscale_max_side
+        self.locate_side = locate_side
+        self._executor = executor
+        self._active = 0
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    def _pool(self) -> Executor:
+        if self._executor is None:
+            if self.workers > 0:
+                # spawn：不从已启动事件循环与线程的进程 fork
+                self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            else:
+                self._executor = ThreadPoolExecutor(1, thread_name_prefix="ocr")
+        return self._executor
+
+    @staticmethod
+    async def _next(pending: Set["asyncio.Future[Any]"], deadline: float, timeout: float) -> Any:
+        """等待任意一个任务完成，返回其结果，并从 pending 中移除。"""
+        loop = asyncio.get_running_loop()
+        remaining = deadline - loop.time()
+        if remaining <= 0:
+            raise OCRTimeout(f"OCR deadline of {timeout}s exceeded")
+        done, _ = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+        if not done:
+            raise OCRTimeout(f"OCR deadline of {timeout}s exceeded")
+        fut = done.pop()
+        pending.remove(fut)
+        return fut.result()
+
+    async def iter_pages(
+        self, content: bytes, *, timeout: float, barcodes: Optional[List[Box]] = None
+    ) -> AsyncIterator[OCRPage]:
+        """
+        Pages of all stages in completion order. `barcodes` are rectangles the caller
+        already got from pyzbar on the upload, so localization does not decode again.
+        """
+        with self._lock:
+            if self._active >= self.max_requests:
+                raise OCRBusy(f"OCR busy ({self._active} requests in progress)")
+            self._active += 1
+        slot = _Slot(self)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        pending: Set["asyncio.Future[Any]"] = set()
         try:
-            import importlib
-            pytesseract = importlib.import_module("pytesseract")  # type: ignore
-        except Exception as exc:  # pragma: no cover
-            raise RuntimeError("pytesseract is not installed. Please install runtime deps.") from exc
+            pool = self._pool()
+            # 上传图片只解码一次，各工作进程从灰度原图生成各自的预处理方案
+            base = await asyncio.to_thread(BaseImage.from_bytes, content, self.max_side)
+            regions: List[Box] = []
+            if self.locate_side:
+                pending.add(slot.submit(pool, _locate_job, self.languages, base, self.locate_side, barcodes))
+                page, regions = await self._next(pending, deadline, timeout)
+                yield page
+            # 先识别候选区域，都没读到再整图识别
+            stages = [[base.crop(box) for box in regions]] if regions else []
+            stages.append([base])
+            for stage in stages:
+                for image in stage:
+                    shared = slot.share(image)
+                    for index in variant_indices(image.size, self.upscale_max_side):
+                        pending.add(slot.submit(pool, _ocr_variant_job, self.languages, shared, index))
+                while pending:
+                    yield await self._next(pending, deadline, timeout)
+        except BrokenProcessPool:
+            # 工作进程异常退出：丢弃进程池，下个请求重建
+            logger.warning("OCR process pool broken, recreating on next request")
+            self._executor = None
+            raise
+        finally:
+            slot.close()
 
-        image = Image.open(io.BytesIO(content))
-        lines: List[str] = []
-        for variant in self._preprocess_variants(image):
-            try:
-                tsv = pytesseract.image_to_data(
-                    variant,
-                    lang=self.languages,
-                    config="--oem 3 --psm 6",
-                    output_type=getattr(pytesseract, 'Output').STRING,  # type: ignore
-                )
-            except Exception:
-                # Fallback to plain string if tsv not supported
-                txt = pytesseract.image_to_string(variant, lang=self.languages)
-                if txt:
-                    lines.extend([l.strip() for l in txt.splitlines() if l.strip()])
-                continue
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
-            # Parse TSV manually (header present)
-            try:
-                rows = [r for r in tsv.splitlines() if r.strip()]
-                if not rows:
-                    continue
-                header = rows[0].split('\t')
-                idx_word = header.index('text') if 'text' in header else -1
-                idx_conf = header.index('conf') if 'conf' in header else -1
-                idx_line = header.index('line_num') if 'line_num' in header else -1
-                if idx_word == -1 or idx_line == -1:
-                    continue
-                from collections import defaultdict
-                groups = defaultdict(list)
-                for row in rows[1:]:
-                    cols = row.split('\t')
-                    if len(cols) <= max(idx_word, idx_line, idx_conf if idx_conf != -1 else 0):
-                        continue
-                    word = cols[idx_word].strip()
-                    if not word:
-                        continue
-                    conf_ok = True
-                    if idx_conf != -1:
-                        try:
-                            conf_ok = float(cols[idx_conf]) >= 0  # accept all OCR words; adjust if needed
-                        except Exception:
-                            conf_ok = True
-                    if not conf_ok:
-                        continue
-                    line_no = cols[idx_line]
-                    groups[line_no].append(word)
-                for ln in sorted(groups.keys(), key=lambda x: int(x) if x.isdigit() else 0):
-                    line_text = ' '.join(groups[ln]).strip()
-                    if line_text:
-                        lines.append(line_text)
-            except Exception:
-                # ignore parsing errors for this variant
-                continue
-        # Deduplicate lines preserving order
-        seen = set()
-        uniq: List[str] = []
-        for l in lines:
-            if l not in seen:
-                seen.add(l)
-                uniq.append(l)
-        return uniq
-
-
-def get_ocr_service() -> OCRService:
-    return OCRService()
+
+@lru_cache(maxsize=1)
+def get_ocr_pool() -> OCRPool:
+    s = get_settings()
+    return OCRPool(
+        workers=s.ocr_workers,
+        max_requests=s.ocr_max_requests,
+        max_side=s.ocr_max_side,
+        upscale_max_side=s.ocr_upscale_max_side,
+        locate_side=s.ocr_locate_side,
+    )
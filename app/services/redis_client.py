@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from functools import lru_cache
 from typing import Optional, Any
 
@@ -16,10 +17,13 @@ class RedisService:
         key_prefix: str,
     ) -> None:
         self._prefix = key_prefix
+        self._conn_kwargs = {"host": host, "port": port, "db": db, "password": password, "decode_responses": True}
         # Lazy import to avoid hard dependency during tests unless used
         import importlib
         redis_mod: Any = importlib.import_module("redis")
-        self._client = redis_mod.Redis(host=host, port=port, db=db, password=password, decode_responses=True)
+        self._client = redis_mod.Redis(**self._conn_kwargs)
+        self._async_client: Any = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
 
     def prefixed(self, key: str) -> str:
         return f"{self._prefix}:{key}" if self._prefix else key
@@ -33,6 +37,21 @@ class RedisService:
     def get_client(self) -> Any:
         return self._client
 
+    def get_async_client(self) -> Any:
+        """redis.asyncio client; its connection pool is bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            import importlib
+            redis_asyncio: Any = importlib.import_module("redis.asyncio")
+            self._async_client = redis_asyncio.Redis(**self._conn_kwargs)
+            self._async_loop = loop
+        return self._async_client
+
+    async def aclose(self) -> None:
+        client, self._async_client = self._async_client, None
+        if client is not None and self._async_loop is asyncio.get_running_loop():
+            await client.aclose()
+
 
 @lru_cache(maxsize=1)
 def get_redis_service() -> RedisService:
@@ -3,6 +3,8 @@ from __future__ import annotations
 import re
 from typing import List, Tuple, Optional
 
+from app.utils.isbn_ranges import get_isbn_ranges
+
 ISBN10_REGEX = re.compile(r"\b(?:ISBN(?:-10)?:?\s*)?([0-9]{1,5}[-\s]?[0-9]+[-\s]?[0-9]+[-\s]?[0-9Xx])\b")
 ISBN13_REGEX = re.compile(r"\b(?:ISBN(?:-13)?:?\s*)?((?:978|979)[-\s]?[0-9]+[-\s]?[0-9]+[-\s]?[0-9]+[-\s]?[0-9])\b")
 
@@ -60,34 +62,166 @@ def _correction_variants(s: str) -> List[str]:
     return list(dict.fromkeys(variants))
 
 
-def normalize_isbn(raw: str) -> Optional[Tuple[str, str]]:
+def _normalize(raw: str, assigned_only: bool) -> Optional[Tuple[str, str]]:
     s0 = _clean_isbn(raw)
     for s in _correction_variants(s0):
-        if is_valid_isbn13(s):
+        # assigned_only：校验位碰巧正确但号段未分配的串（OCR 误识别常见）不算 ISBN，继续尝试其他纠错结果
+        if is_valid_isbn13(s) and (not assigned_only or is_assigned(s)):
             return ("ISBN-13", s)
-        if is_valid_isbn10(s):
+        if is_valid_isbn10(s) and (not assigned_only or is_assigned(s)):
             return ("ISBN-10", s)
     return None
 
 
-def extract_isbn_candidates(text: str) -> List[Tuple[str, str]]:
-    """Return list of tuples (type, normalized) for valid ISBNs found."""
+def normalize_isbn(raw: str) -> Optional[Tuple[str, str]]:
+    """清洗并按校验位识别 ISBN（含 OCR 常见误识别纠正），返回 (类型, 规范值)。"""
+    return _normalize(raw, False)
+
+
+def extract_isbn_candidates(text: str, *, assigned_only: bool = False) -> List[Tuple[str, str]]:
+    """Return list of tuples (type, normalized) for valid ISBNs found.
+
+    assigned_only 时只保留号段已分配的 ISBN（由调用方按 ISBN_RANGE_CHECK 决定）。
+    """
     results: List[Tuple[str, str]] = []
     seen = set()
     for m in ISBN13_REGEX.finditer(text):
-        norm = normalize_isbn(m.group(1))
+        norm = _normalize(m.group(1), assigned_only)
         if norm and norm[1] not in seen:
             seen.add(norm[1])
             results.append(norm)
     for m in ISBN10_REGEX.finditer(text):
-        norm = normalize_isbn(m.group(1))
+        norm = _normalize(m.group(1), assigned_only)
         if norm and norm[1] not in seen:
             seen.add(norm[1])
             results.append(norm)
     # Fallback: scan every long digit/hyphen chunk
     for m in re.finditer(r"[0-9Xx][-\s]?[0-9Xx][-\s0-9Xx]{8,16}", text):
-        norm = normalize_isbn(m.group(0))
+        norm = _normalize(m.group(0), assigned_only)
         if norm and norm[1] not in seen:
             seen.add(norm[1])
             results.append(norm)
     return results
+
+
+def to_isbn13(raw: str) -> Optional[str]:
+    """合法的 ISBN-10/13 统一转为 ISBN-13，非法返回 None。"""
+    s = _clean_isbn(raw)
+    if is_valid_isbn13(s):
+        return s
+    if is_valid_isbn10(s):
+        body = "978" + s[:9]
+        total = sum(int(ch) * (1 if i % 2 == 0 else 3) for i, ch in enumerate(body))
+        return body + str((10 - total % 10) % 10)
+    return None
+
+
+def to_isbn10(raw: str) -> Optional[str]:
+    """合法的 ISBN 转为 ISBN-10；979 前缀没有对应的 ISBN-10，返回 None。"""
+    s = to_isbn13(raw)
+    if s is None or not s.startswith("978"):
+        return None
+    body = s[3:12]
+    check = (11 - sum((10 - i) * int(ch) for i, ch in enumerate(body)) % 11) % 11
+    return body + ("X" if check == 10 else str(check))
+
+
+def split_isbn(raw: str) -> Optional[Tuple[str, str, str, str, str]]:
+    """按 ISBN 国际中心号段表拆分为 (前缀, 注册组, 出版者, 出版序号, 校验位)；校验位错误或号段未分配返回 None。"""
+    s = to_isbn13(raw)
+    return get_isbn_ranges().split(s) if s else None
+
+
+def is_assigned(raw: str) -> bool:
+    """校验位正确且注册组、出版者号段均已分配。"""
+    return split_isbn(raw) is not None
+
+
+def hyphenate(raw: str) -> Optional[str]:
+    """规范连字符格式：ISBN-10 输入返回 ISBN-10（如 7-02-000220-X），否则返回 ISBN-13（如 978-7-02-000220-7）。"""
+    parts = split_isbn(raw)
+    if parts is None:
+        return None
+    s = _clean_isbn(raw)
+    if len(s) == 10:
+        return "-".join(parts[1:4] + (s[9],))
+    return "-".join(parts)
+
+
+def registration_group(raw: str) -> Optional[str]:
+    """返回 "前缀-注册组"，如 978-7、978-89、979-11；非法 ISBN 或注册组未分配返回 None。"""
+    s = to_isbn13(raw)
+    if s is None:
+        return None
+    ranges = get_isbn_ranges()
+    group = ranges.group(s)
+    return None if group is None else ranges.names[group]
+
+
+def registration_agency(raw: str) -> Optional[str]:
+    """注册组所属的 ISBN 机构，如 "China, People's Republic"、"English language"。"""
+    s = to_isbn13(raw)
+    if s is None:
+        return None
+    ranges = get_isbn_ranges()
+    group = ranges.group(s)
+    return None if group is None else ranges.agencies[group]
+
+
+# ISBN 机构 → 国别/地区代码（仅收录单一国家/地区的机构；English/French/German language 等跨国语言区不推断）
+AGENCY_COUNTRY = {
+    "Argentina": "AR",
+    "Brazil": "BR",
+    "Bulgaria": "BG",
+    "Chile": "CL",
+    "China, People's Republic": "CN",
+    "Colombia": "CO",
+    "Croatia": "HR",
+    "Denmark": "DK",
+    "Egypt": "EG",
+    "Estonia": "EE",
+    "Finland": "FI",
+    "France": "FR",
+    "Greece": "GR",
+    "Hong Kong, China": "HK",
+    "Hungary": "HU",
+    "India": "IN",
+    "Indonesia": "ID",
+    "Iran": "IR",
+    "Israel": "IL",
+    "Italy": "IT",
+    "Japan": "JP",
+    "Korea, Republic": "KR",
+    "Latvia": "LV",
+    "Lithuania": "LT",
+    "Macau": "MO",
+    "Malaysia": "MY",
+    "Mexico": "MX",
+    "Netherlands": "NL",
+    "Norway": "NO",
+    "Pakistan": "PK",
+    "Peru": "PE",
+    "Philippines": "PH",
+    "Poland": "PL",
+    "Portugal": "PT",
+    "Romania": "RO",
+    "Saudi Arabia": "SA",
+    "Singapore": "SG",
+    "Slovenia": "SI",
+    "Spain": "ES",
+    "Sweden": "SE",
+    "Taiwan": "TW",
+    "Thailand": "TH",
+    "Türkiye": "TR",
+    "Ukraine": "UA",
+    "United States": "US",
+    "Vietnam": "VN",
+    # 历史机构的注册组现由继承国使用（978-5 俄罗斯，978-80 捷克/斯洛伐克）
+    "former U.S.S.R": "RU",
+    "former Czechoslovakia": "CZ",
+}
+
+
+def infer_country(raw: str) -> Optional[str]:
+    agency = registration_agency(raw)
+    return AGENCY_COUNTRY.get(agency) if agency else None
@@ -0,0 +1,183 @@
+"""
+Offline ISBN range registry compiled from the International ISBN Agency RangeMessage.
+
+RangeMessage.xml (https://www.isbn-international.org/range_file_generation)
+lists every registration group (978-7, 979-11, ...) with its agency and the
+registrant ranges defined inside it. The compiled table maps the first 12
+digits of an ISBN-13 onto a partition of [0, 10^12): each interval carries
+the registration group (or none) and the registrant length inside it (0 for
+ranges the agency has not defined). A lookup is one bisect over a sorted
+array of interval starts, so the loaded table is a few flat arrays instead
+of thousands of Python objects.
+
+The table is bundled as `isbn_ranges.bin` (zlib-compressed, little endian):
+
+    header   "ISBR" | version u8 | pad u8 | groups u16 | intervals u32
+    body     meta_len u32 | meta (UTF-8: "serial\\tdate" then "group\\tagency" per line)
+             starts u64[intervals] | group index u16[intervals] (0xFFFF = none)
+             registrant length u8[intervals]
+
+Rebuild it when the agency publishes new ranges:
+
+Run: python -m app.utils.isbn_ranges RangeMessage.xml
+"""
+
+from __future__ import annotations
+
+import argparse
+import struct
+import sys
+import xml.etree.ElementTree as ET
+import zlib
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+DEFAULT_PATH = Path(__file__).with_name("isbn_ranges.bin")
+
+_MAGIC = b"ISBR"
+_VERSION = 1
+_HEADER = struct.Struct("<4sBxHI")
+_NO_GROUP = 0xFFFF
+_BODY_DIGITS = 9  # ISBN-13 去掉前缀与校验位后的位数
+
+
+class IsbnRanges:
+    """
+    Registration groups and registrant ranges of the ISBN system.
+
+    `split` returns the five hyphenation elements of an ISBN-13 (prefix,
+    group, registrant, publication, check digit), or None when the group or
+    the registrant range is not defined in the RangeMessage the table was
+    compiled from.
+    """
+
+    def __init__(self, starts: array, groups: array, lengths: array, names: List[str], agencies: List[str], serial: str = "", date: str = "") -> None:
+        self._starts = starts
+        self._groups = groups
+        self._lengths = lengths
+        self.names = names
+        self.agencies = agencies
+        self.serial = serial
+        self.date = date
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    def _interval(self, isbn13: str) -> int:
+        return bisect_right(self._starts, int(isbn13[:12])) - 1
+
+    def group(self, isbn13: str) -> Optional[int]:
+        """ISBN-13 所属注册组的序号（names/agencies 的下标），组未分配时返回 None。"""
+        g = self._groups[self._interval(isbn13)]
+        return None if g == _NO_GROUP else g
+
+    def split(self, isbn13: str) -> Optional[Tuple[str, str, str, str, str]]:
+        i = self._interval(isbn13)
+        g, length = self._groups[i], self._lengths[i]
+        if g == _NO_GROUP or not length:
+            return None
+        cut = len(self.names[g]) - 1  # "978-7" → 前缀与组号共 4 位
+        return isbn13[:3], isbn13[3:cut], isbn13[cut:cut + length], isbn13[cut + length:12], isbn13[12]
+
+    @classmethod
+    def from_range_message(cls, xml: bytes) -> "IsbnRanges":
+        root = ET.fromstring(xml)
+        entries: List[Tuple[int, int, int]] = []  # (起点, 组序号, 出版者号长度)
+        names: List[str] = []
+        agencies: List[str] = []
+        for el in root.iter("Group"):
+            name = el.findtext("Prefix", "").strip()
+            prefix, _, code = name.partition("-")
+            free = _BODY_DIGITS - len(code)
+            base = int(prefix + code) * 10 ** free
+            gi = len(names)
+            names.append(name)
+            agencies.append(el.findtext("Agency", "").strip())
+            # 出版者区段：7 位区间按组号之后的剩余位数截断或补齐（区段边界的有效位数不超过出版者号长度）
+            cursor = base
+            for rule in el.iter("Rule"):
+                length = int(rule.findtext("Length", "0"))
+                lo, _, hi = rule.findtext("Range", "").partition("-")
+                if not length:
+                    continue
+                start, end = base + int(lo.ljust(free, "0")[:free]), base + int(hi.ljust(free, "9")[:free])
+                if start > cursor:
+                    entries.append((cursor, gi, 0))
+                entries.append((start, gi, length))
+                cursor = end + 1
+            end = base + 10 ** free
+            if cursor < end:
+                entries.append((cursor, gi, 0))
+            entries.append((end, _NO_GROUP, 0))
+
+        starts, gidx, lengths = array("Q"), array("H"), array("B")
+        for start, g, length in sorted(entries, key=lambda e: (e[0], e[1] != _NO_GROUP)):
+            if starts and starts[-1] == start:
+                # 组末尾的“无组”标记与紧邻的下一组起点重合，以后者为准
+                gidx[-1], lengths[-1] = g, length
+                continue
+            if gidx and (gidx[-1], lengths[-1]) == (g, length):
+                continue
+            starts.append(start)
+            gidx.append(g)
+            lengths.append(length)
+        if not starts or starts[0] != 0:
+            starts.insert(0, 0)
+            gidx.insert(0, _NO_GROUP)
+            lengths.insert(0, 0)
+        return cls(starts, gidx, lengths, names, agencies, root.findtext("MessageSerialNumber", ""), root.findtext("MessageDate", ""))
+
+    def to_bytes(self) -> bytes:
+        meta = "\n".join([f"{self.serial}\t{self.date}"] + [f"{n}\t{a}" for n, a in zip(self.names, self.agencies)]).encode("utf-8")
+        arrays = [array(a.typecode, a) for a in (self._starts, self._groups, self._lengths)]
+        if sys.byteorder == "big":
+            for a in arrays:
+                a.byteswap()
+        body = struct.pack("<I", len(meta)) + meta + b"".join(a.tobytes() for a in arrays)
+        return _HEADER.pack(_MAGIC, _VERSION, len(self.names), len(self._starts)) + zlib.compress(body, 9)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "IsbnRanges":
+        magic, version, _, n = _HEADER.unpack_from(data)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("not an ISBN range table")
+        body = zlib.decompress(data[_HEADER.size:])
+        (meta_len,) = struct.unpack_from("<I", body)
+        pos = 4 + meta_len
+        head, *rows = body[4:pos].decode("utf-8").split("\n")
+        serial, _, date = head.partition("\t")
+        names, agencies = zip(*(row.split("\t", 1) for row in rows)) if rows else ((), ())
+        arrays = []
+        for typecode in "QHB":
+            a = array(typecode)
+            size = a.itemsize * n
+            a.frombytes(body[pos:pos + size])
+            pos += size
+            if sys.byteorder == "big":
+                a.byteswap()
+            arrays.append(a)
+        return cls(*arrays, list(names), list(agencies), serial, date)
+
+
+@lru_cache(maxsize=1)
+def get_isbn_ranges() -> IsbnRanges:
+    return IsbnRanges.from_bytes(DEFAULT_PATH.read_bytes())
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("range_message", help="RangeMessage.xml exported from isbn-international.org")
+    parser.add_argument("-o", "--output", default=str(DEFAULT_PATH))
+    args = parser.parse_args()
+
+    ranges = IsbnRanges.from_range_message(Path(args.range_message).read_bytes())
+    data = ranges.to_bytes()
+    Path(args.output).write_bytes(data)
+    print(f"{len(ranges.names)} groups, {len(ranges)} intervals, {len(data)} bytes (serial {ranges.serial}, {ranges.date})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,20 @@
 from __future__ import annotations
 
 import re
-from typing import Set
+import unicodedata
+from functools import lru_cache
+from typing import Callable, List, NamedTuple, Optional, Sequence, Set, Tuple, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
 
 
 _non_alnum = re.compile(r"[^\w]+", re.UNICODE)
+# 中日韩文字（汉字、假名、谚文）连续书写、不以空格分词，按字二元组切分
+_cjk_run = re.compile(r"([\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af]+)")
+# 主标题与副标题/丛书信息的分隔：冒号、分号、斜杠、括号、破折号
+_subtitle_sep = re.compile(r"[:：;；/(（\[【]|\s[-–—]\s|——")
 
 
 def _tokens(s: str) -> Set[str]:
@@ -13,6 +23,30 @@ def _tokens(s: str) -> Set[str]:
     return set(parts)
 
 
+def normalize_text(s: Optional[str]) -> str:
+    """NFKC + casefold，非字母数字折叠为单个空格；用于书名/出版社等字段的规范化存储与比对。"""
+    if not s:
+        return ""
+    s = unicodedata.normalize("NFKC", s).casefold()
+    return " ".join(p for p in _non_alnum.split(s) if p and p != "_")
+
+
+def title_tokens(s: Optional[str]) -> List[str]:
+    """书名索引词：规范化后按空格分词，CJK 连续段切为二元组（单字段保留单字），去重保序。"""
+    tokens: List[str] = []
+    for word in normalize_text(s).split():
+        for i, part in enumerate(_cjk_run.split(word)):
+            if not part:
+                continue
+            if i % 2 == 0:
+                tokens.append(part)
+            elif len(part) == 1:
+                tokens.append(part)
+            else:
+                tokens.extend(part[j:j + 2] for j in range(len(part) - 1))
+    return list(dict.fromkeys(tokens))
+
+
 def jaccard_token_similarity(a: str, b: str) -> float:
     ta = _tokens(a)
     tb = _tokens(b)
@@ -21,3 +55,155 @@ def jaccard_token_similarity(a: str, b: str) -> float:
     inter = len(ta & tb)
     union = len(ta | tb)
     return inter / union if union else 0.0
+
+
+def main_title(title: str) -> str:
+    """去掉副标题/丛书信息后的主标题。"""
+    return _subtitle_sep.split(title, 1)[0]
+
+
+def _char_ngrams(s: str, n: int = 3) -> List[str]:
+    padded = f" {s} "
+    if len(padded) <= n:
+        return [padded]
+    return list(dict.fromkeys(padded[i:i + n] for i in range(len(padded) - n + 1)))
+
+
+class _Profile(NamedTuple):
+    grams: np.ndarray
+    tokens: Tuple[str, ...]
+    main_grams: np.ndarray
+    main_tokens: Tuple[str, ...]
+
+
+def _hashes(grams: List[str]) -> np.ndarray:
+    return np.array([hash(g) for g in grams], dtype=np.int64)
+
+
+@lru_cache(maxsize=16384)
+def _profile(title: str) -> _Profile:
+    """书名的三元组哈希与索引词（整体 / 去掉副标题的主标题各一份），按书名缓存。"""
+    norm = normalize_text(title)
+    grams = _hashes(_char_ngrams(norm)) if norm else np.zeros(0, dtype=np.int64)
+    tokens = tuple(title_tokens(title))
+    main = main_title(title)
+    if normalize_text(main) in ("", norm):
+        return _Profile(grams, tokens, grams, tokens)
+    return _Profile(grams, tokens, _hashes(_char_ngrams(normalize_text(main))), tuple(title_tokens(main)))
+
+
+def _levenshtein(a: str, b: str, max_dist: int) -> int:
+    """编辑距离；超过 max_dist 时提前返回 max_dist + 1。"""
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        cur = [i]
+        for j, cb in enumerate(b, 1):
+            cur.append(min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb)))
+        if min(cur) > max_dist:
+            return max_dist + 1
+        prev = cur
+    return prev[-1]
+
+
+def _fuzzable(token: str) -> bool:
+    # 短词与 CJK 二元组只做精确匹配
+    return len(token) >= 3 and not _cjk_run.search(token)
+
+
+@lru_cache(maxsize=65536)
+def _typo_similarity(a: str, b: str) -> float:
+    """两个不同的词的拼写相似度：编辑距离 ≤1（长词 ≤2）按 1 - d/len 计分，否则为 0。"""
+    n = max(len(a), len(b))
+    max_dist = 1 if n < 8 else 2
+    # 每次编辑至多改变两种字符，字符集差异过大时不必计算编辑距离
+    if abs(len(a) - len(b)) > max_dist or len(set(a) ^ set(b)) > 2 * max_dist:
+        return 0.0
+    d = _levenshtein(a, b, max_dist)
+    return 1.0 - d / n if d <= max_dist else 0.0
+
+
+def _sizes(seqs: Sequence[Sequence]) -> np.ndarray:
+    return np.fromiter((len(x) for x in seqs), dtype=np.int64, count=len(seqs))
+
+
+def _dice_many(grams: List[np.ndarray], query: np.ndarray) -> np.ndarray:
+    """所有候选与查询的三元组 Dice 系数，一次 isin + bincount 完成。"""
+    sizes = _sizes(grams)
+    if not len(query) or not sizes.sum():
+        return np.zeros(len(grams))
+    owner = np.repeat(np.arange(len(grams)), sizes)
+    inter = np.bincount(owner, weights=np.isin(np.concatenate(grams), query), minlength=len(grams))
+    return 2 * inter / (sizes + len(query))
+
+
+def _token_jaccard_many(tokens: List[Tuple[str, ...]], query: Tuple[str, ...], credit: Callable[[str], np.ndarray]) -> np.ndarray:
+    """容错的词集 Jaccard：每个查询词取候选中最相近词的得分。"""
+    sizes = _sizes(tokens)
+    if not query or not sizes.sum():
+        return np.zeros(len(tokens))
+    vocab: dict = {}
+    occ = np.fromiter((vocab.setdefault(t, len(vocab)) for toks in tokens for t in toks), dtype=np.int64, count=int(sizes.sum()))
+    table = np.array([credit(t) for t in vocab])
+    best = np.zeros((len(tokens), len(query)))
+    np.maximum.at(best, np.repeat(np.arange(len(tokens)), sizes), table[occ])
+    matched = best.sum(axis=1)
+    return matched / (sizes + len(query) - matched)
+
+
+class TitleMatcher:
+    """
+    Scores candidate titles against one query title.
+
+    The query is tokenized once. Each candidate gets the mean of character
+    trigram Dice (robust to typos, word order and CJK without spaces) and a
+    typo-tolerant token Jaccard (bounded edit distance), computed for both the
+    full title and the main title with subtitles stripped; the better of the
+    two counts, so "Effective Java" matches "Effective Java: A Guide". All
+    candidates are scored in one batched NumPy pass; per-title profiles and
+    token pair similarities are cached, so repeated catalog titles are cheap.
+    """
+
+    def __init__(self, query: str) -> None:
+        self.query = query
+        self._q = _profile(query or "")
+        self._positions = {t: i for i, t in enumerate(self._q.tokens)}
+        self._fuzzy = [(i, t) for i, t in enumerate(self._q.tokens) if _fuzzable(t)]
+
+    def _credit(self, token: str) -> np.ndarray:
+        """候选词对各查询词的相似度。"""
+        row = np.zeros(len(self._q.tokens))
+        if token in self._positions:
+            row[self._positions[token]] = 1.0
+        elif self._fuzzy and _fuzzable(token):
+            for i, t in self._fuzzy:
+                if abs(len(t) - len(token)) <= 2:
+                    row[i] = _typo_similarity(token, t)
+        return row
+
+    def scores(self, titles: Sequence[Optional[str]]) -> np.ndarray:
+        if not titles:
+            return np.zeros(0)
+        profiles = [_profile(t or "") for t in titles]
+        q = self._q
+        credits: dict = {}
+
+        def credit(token: str) -> np.ndarray:
+            # 整体与主标题两次计算共用
+            row = credits.get(token)
+            if row is None:
+                row = credits[token] = self._credit(token)
+            return row
+
+        full = (_dice_many([p.grams for p in profiles], q.grams) + _token_jaccard_many([p.tokens for p in profiles], q.tokens, credit)) / 2
+        main = (_dice_many([p.main_grams for p in profiles], q.grams) + _token_jaccard_many([p.main_tokens for p in profiles], q.tokens, credit)) / 2
+        return np.maximum(full, main)
+
+    def rank(self, items: Sequence[T], min_similarity: float = 0.0, key: Callable[[T], Optional[str]] = lambda b: b.get("title")) -> List[Tuple[float, T]]:
+        """按相似度降序返回 (score, item)，低于阈值的丢弃；同分保持原顺序。"""
+        scores = self.scores([key(item) for item in items])
+        order = np.argsort(-scores, kind="stable")
+        return [(float(scores[i]), items[i]) for i in order if scores[i] >= min_similarity]
+
+
+def title_similarity(a: str, b: str) -> float:
+    return float(TitleMatcher(a).scores([b])[0])
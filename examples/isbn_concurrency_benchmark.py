@@ -0,0 +1,143 @@
+"""
+Concurrent-request throughput of /isbn/resolve: blocking handler vs async handler.
+
+Runs fully in-process (httpx.ASGITransport), no Mongo/Redis/upstream needed:
+the upstream source is simulated with a fixed latency and the caches are
+bypassed, so every request pays one upstream round trip.
+
+- before: a sync `def` handler doing a blocking call of the same latency; Starlette
+          runs it in its threadpool, so concurrency is capped by the pool size (40)
+- after:  the real async endpoint -> isbn_manager.resolve_isbn with an awaitable upstream
+
+Run: python examples/isbn_concurrency_benchmark.py --requests 400 --concurrency 200 --latency 0.5
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.api.v1.endpoints import isbn as isbn_endpoint  # noqa: E402
+from app.services.isbn import manager, negative_cache, singleflight, source_health  # noqa: E402
+from app.services.isbn.rate_limiter import get_rate_limiter  # noqa: E402
+
+
+class _MemoryRedis:
+    """Just enough of redis.asyncio for the manager's negative cache / health snapshot."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def mget(self, keys):
+        return [self.store.get(k) for k in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = value
+        return True
+
+    async def setex(self, key, ttl, value):
+        self.store[key] = value
+
+    async def delete(self, *keys):
+        for k in keys:
+            self.store.pop(k, None)
+
+
+class _MemoryRedisService:
+    def __init__(self):
+        self.client = _MemoryRedis()
+
+    def get_async_client(self):
+        return self.client
+
+
+def _patch_backends(latency: float) -> None:
+    service = _MemoryRedisService()
+    for module in (negative_cache, singleflight, source_health):
+        module.get_redis_service = lambda: service
+
+    # 模拟上游没有配额限制，测的是服务自身的并发能力
+    get_rate_limiter().limits.clear()
+
+    async def no_cache(*args, **kwargs):
+        return None
+
+    async def upstream(src, isbn, **kwargs):
+        await asyncio.sleep(latency)
+        return {"source": src, "isbn": isbn, "title": "Benchmark Book"}
+
+    manager._get_cached = no_cache
+    manager._cache_book = no_cache
+    manager.fetch_from_source = upstream
+
+
+def _build_app(latency: float) -> FastAPI:
+    app = FastAPI()
+    app.include_router(isbn_endpoint.router, prefix="/after")
+
+    @app.post("/before/isbn/resolve")
+    def blocking_resolve(body: dict):
+        # 旧实现：同步 handler 内阻塞调用上游（pymongo/redis-py/httpx 同步客户端）
+        time.sleep(latency)
+        return {"data": {"isbn": body.get("isbn"), "title": "Benchmark Book"}}
+
+    return app
+
+
+async def _run(client: httpx.AsyncClient, path: str, total: int, concurrency: int) -> dict:
+    sem = asyncio.Semaphore(concurrency)
+    latencies = []
+    errors = 0
+
+    async def one(i: int) -> None:
+        nonlocal errors
+        async with sem:
+            t0 = time.perf_counter()
+            # 每个请求用不同 ISBN，避免 single-flight 合并
+            r = await client.post(path, json={"isbn": f"978{i:010d}", "mode": "sequential"})
+            latencies.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(total)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "rps": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": latencies[int(0.95 * (len(latencies) - 1))],
+        "errors": errors,
+    }
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5, help="simulated upstream latency (s)")
+    args = parser.parse_args()
+
+    _patch_backends(args.latency)
+    app = _build_app(args.latency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for label, path in (("before (sync def + blocking I/O)", "/before/isbn/resolve"), ("after (async end-to-end)", "/after/isbn/resolve")):
+            res = await _run(client, path, args.requests, args.concurrency)
+            print(f"{label:34s} {res['rps']:8.1f} req/s  p50 {res['p50']:.3f}s  p95 {res['p95']:.3f}s  errors {res['errors']}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
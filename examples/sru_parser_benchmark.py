@@ -0,0 +1,99 @@
+"""
+Parse time and peak memory of large multi-record SRU responses: full DOM vs streaming.
+
+Builds a synthetic NDL dcndl searchRetrieve response with N records (the
+shape NDL returns for maximumRecords=N) and maps every record to a
+NormalizedBook in two ways:
+
+- dom:    ElementTree.fromstring on the whole response, then map each <recordData>
+- stream: app.services.isbn.sru.iter_records, fed in 64 KiB chunks; each record
+          subtree is mapped and cleared as soon as it is complete
+
+Peak memory is measured with tracemalloc (Python allocations only).
+
+Run: python examples/sru_parser_benchmark.py --records 500 2000 10000
+"""
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from app.services.isbn import sru  # noqa: E402
+from app.utils.isbn import to_isbn13  # noqa: E402
+
+RECORD = """<record><recordSchema>dcndl</recordSchema><recordPacking>xml</recordPacking><recordData>
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:dc="http://purl.org/dc/elements/1.1/"
+ xmlns:dcterms="http://purl.org/dc/terms/" xmlns:dcndl="http://ndl.go.jp/dcndl/terms/" xmlns:foaf="http://xmlns.com/foaf/0.1/">
+<dcndl:BibAdminResource rdf:about="https://ndlsearch.ndl.go.jp/books/R100000002-I{n:09d}"><dcndl:catalogingStatus>C7</dcndl:catalogingStatus></dcndl:BibAdminResource>
+<dcndl:BibResource rdf:about="https://ndlsearch.ndl.go.jp/books/R100000002-I{n:09d}#material">
+<dcterms:identifier rdf:datatype="http://ndl.go.jp/dcndl/terms/ISBN">{isbn}</dcterms:identifier>
+<dcterms:identifier rdf:datatype="http://ndl.go.jp/dcndl/terms/JPNO">{n:08d}</dcterms:identifier>
+<dc:title><rdf:Description><rdf:value>テスト書名 第{n}巻</rdf:value><dcndl:transcription>テスト ショメイ</dcndl:transcription></rdf:Description></dc:title>
+<dcterms:title>テスト書名 第{n}巻</dcterms:title>
+<dcterms:creator><foaf:Agent><foaf:name>著者, 太郎</foaf:name><dcndl:transcription>チョシャ, タロウ</dcndl:transcription></foaf:Agent></dcterms:creator>
+<dc:creator>著者太郎 著</dc:creator>
+<dcterms:publisher><foaf:Agent><foaf:name>出版社</foaf:name><dcndl:location>東京</dcndl:location></foaf:Agent></dcterms:publisher>
+<dcterms:issued rdf:datatype="http://purl.org/dc/terms/W3CDTF">2020</dcterms:issued>
+<dcterms:subject><rdf:Description><rdf:value>小説</rdf:value></rdf:Description></dcterms:subject>
+<dcterms:language rdf:datatype="http://purl.org/dc/terms/ISO639-2">jpn</dcterms:language>
+<dcterms:extent>{pages}p ; 19cm</dcterms:extent>
+<dcterms:abstract>{abstract}</dcterms:abstract>
+</dcndl:BibResource></rdf:RDF></recordData><recordPosition>{n}</recordPosition></record>"""
+
+
+def _isbn(n: int) -> str:
+    body = f"97840{n % 10_000_000:07d}"
+    total = sum(int(d) * (1 if i % 2 == 0 else 3) for i, d in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+
+def build_response(records: int) -> bytes:
+    body = "".join(RECORD.format(n=n, isbn=_isbn(n), pages=100 + n % 400, abstract="あらすじ。" * 40) for n in range(records))
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><searchRetrieveResponse xmlns="http://www.loc.gov/zing/srw/">'
+        f"<version>1.2</version><numberOfRecords>{records}</numberOfRecords><records>{body}</records></searchRetrieveResponse>"
+    ).encode("utf-8")
+
+
+def parse_dom(data: bytes):
+    root = ET.fromstring(data)
+    return [sru._map_dcndl(rd[0], "ndl") for rd in root.iter("{http://www.loc.gov/zing/srw/}recordData")]
+
+
+def parse_stream(data: bytes):
+    return sru.parse_response(data, sru.SCHEMA_DCNDL, source="ndl")
+
+
+def measure(fn, data: bytes):
+    fn(data)  # warm-up
+    t0 = time.perf_counter()
+    books = fn(data)
+    elapsed = time.perf_counter() - t0
+    tracemalloc.start()
+    fn(data)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return books, elapsed, peak
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, nargs="+", default=[500, 2000, 10000])
+    args = parser.parse_args()
+
+    print(f"{'records':>8} {'size':>9} {'parser':>7} {'time':>9} {'rec/s':>9} {'peak mem':>10}")
+    for n in args.records:
+        data = build_response(n)
+        for name, fn in (("dom", parse_dom), ("stream", parse_stream)):
+            books, elapsed, peak = measure(fn, data)
+            assert len(books) == n and to_isbn13(books[-1]["isbn"])
+            print(f"{n:>8} {len(data) / 1e6:>7.1f}MB {name:>7} {elapsed * 1000:>7.0f}ms {n / elapsed:>9.0f} {peak / 1e6:>8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
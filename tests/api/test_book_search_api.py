@@ -0,0 +1,40 @@
+import json
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.services.isbn import search_manager
+
+
+def _fake_iter(title, **kwargs):
+    async def gen():
+        yield "open_library", {"status": "ok", "count": 1, "error": None, "elapsed": 0.01}, [{"title": title, "isbn": "1"}]
+        yield "loc", {"status": "ok", "count": 1, "error": None, "elapsed": 0.02}, [{"title": title, "isbn": "1"}, {"title": title, "isbn": "2"}]
+        yield "google_books", {"status": "timeout", "count": 0, "error": None, "elapsed": 0.1}, []
+
+    return gen()
+
+
+def test_search_title_returns_items_and_source_status(monkeypatch):
+    monkeypatch.setattr(search_manager, "iter_search_title", _fake_iter)
+
+    client = TestClient(app)
+    r = client.post("/api/v1/books/search-title", json={"title": "Effective Java"})
+    assert r.status_code == 200
+    data = r.json()["data"]
+    assert [i["isbn"] for i in data["items"]] == ["1", "2"]
+    assert data["sources"]["google_books"]["status"] == "timeout"
+
+
+def test_search_title_streams_ndjson(monkeypatch):
+    monkeypatch.setattr(search_manager, "iter_search_title", _fake_iter)
+
+    client = TestClient(app)
+    r = client.post("/api/v1/books/search-title", json={"title": "Effective Java", "stream": True})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in r.text.splitlines()]
+    assert [line.get("source") for line in lines[:3]] == ["open_library", "loc", "google_books"]
+    # 跨来源去重：loc 行只包含新出现的条目
+    assert [i["isbn"] for i in lines[1]["items"]] == ["2"]
+    assert lines[-1] == {"done": True}
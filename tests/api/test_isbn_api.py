@@ -6,7 +6,7 @@ def test_isbn_resolve_force_source_rate_limited(monkeypatch):
     # Simulate rate-limited source via manager raising RateLimitError
     from app.services.isbn.client_base import RateLimitError
 
-    def fake_resolve(*args, **kwargs):
+    async def fake_resolve(*args, **kwargs):
         raise RateLimitError("google_books currently rate-limited")
 
     monkeypatch.setattr("app.services.isbn.manager.resolve_isbn", fake_resolve)
@@ -20,7 +20,7 @@ def test_isbn_resolve_force_source_rate_limited(monkeypatch):
 
 
 def test_isbn_resolve_ok(monkeypatch):
-    def fake_resolve(isbn, **kwargs):
+    async def fake_resolve(isbn, **kwargs):
         return {
             "source": "open_library",
             "isbn": isbn,
@@ -49,3 +49,30 @@ def test_isbn_resolve_ok(monkeypatch):
     assert body["success"] is True
     assert body["dataType"] == "object"
     assert body["data"]["title"] == "Effective Java"
+
+
+def test_isbn_resolve_batch_streams_ndjson(monkeypatch):
+    import json
+
+    async def fake_batch(isbns, **kwargs):
+        for isbn in isbns:
+            if isbn == "9780134685991":
+                yield isbn, {"isbn": isbn, "title": "Effective Java"}, None
+            else:
+                yield isbn, None, None
+
+    monkeypatch.setattr("app.services.isbn.manager.resolve_isbn_batch", fake_batch)
+
+    client = TestClient(app)
+    r = client.post("/api/v1/isbn/resolve-batch", json={"isbns": ["9780134685991", "9780000000002"]})
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(l) for l in r.text.splitlines() if l.strip()]
+    assert lines[0] == {"isbn": "9780134685991", "found": True, "data": {"isbn": "9780134685991", "title": "Effective Java"}, "error": None}
+    assert lines[1]["found"] is False
+
+
+def test_isbn_resolve_batch_rejects_empty():
+    client = TestClient(app)
+    r = client.post("/api/v1/isbn/resolve-batch", json={"isbns": []})
+    assert r.status_code == 422
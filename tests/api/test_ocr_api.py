@@ -1,8 +1,17 @@
 import io
+from concurrent.futures.process import BrokenProcessPool
+
 from fastapi.testclient import TestClient
 from PIL import Image
 
 from app.main import app
+from app.services.ocr import OCRBusy, OCRPage, OCRTimeout, OCRWord
+
+TIMEOUT = object()
+
+
+def _page(text: str) -> OCRPage:
+    return OCRPage(0, [OCRWord(w, 90.0, (0, 0, 1, 1), (1, 1, i)) for i, line in enumerate(text.splitlines()) for w in line.split()])
 
 
 def create_dummy_image() -> bytes:
@@ -25,15 +34,13 @@ def test_ocr_isbn_ok_path(monkeypatch):
     client = TestClient(app)
 
     # Force OCR/barcode to deterministic outputs
-    monkeypatch.setattr("app.api.v1.endpoints.ocr.decode_isbn_from_image_bytes", lambda b: ["9780134685991"]) 
+    monkeypatch.setattr("app.api.v1.endpoints.ocr.scan_barcodes", lambda b: (["9780134685991"], [(0, 0, 10, 5)]))
 
     class FakeOCR:
-        def image_bytes_to_texts(self, content: bytes):
-            return [("plain", "ISBN 9780134685991")]
-        def image_bytes_to_lines(self, content: bytes):
-            return ["Effective Java ISBN 9780134685991"]
+        async def iter_pages(self, content: bytes, *, timeout: float, barcodes=None):
+            yield _page("Effective Java\nISBN 9780134685991")
 
-    monkeypatch.setattr("app.api.v1.endpoints.ocr.get_ocr_service", lambda: FakeOCR())
+    monkeypatch.setattr("app.api.v1.endpoints.ocr.get_ocr_pool", lambda: FakeOCR())
 
     img_bytes = create_dummy_image()
     files = {"file": ("img.png", img_bytes, "image/png")}
@@ -43,3 +50,73 @@ def test_ocr_isbn_ok_path(monkeypatch):
     assert body["success"] is True
     assert body["dataType"] == "object"
     assert "isbns" in body["data"] and body["data"]["isbns"][0] == "9780134685991"
+
+
+class StagedOCR:
+    def __init__(self, passes):
+        self.passes = passes
+        self.consumed = 0
+        self.barcodes = None
+
+    async def iter_pages(self, content: bytes, *, timeout: float, barcodes=None):
+        for item in self.passes:
+            self.barcodes = barcodes
+            if item is TIMEOUT:
+                raise OCRTimeout("deadline")
+            self.consumed += 1
+            yield _page(item)
+
+
+def _post(monkeypatch, ocr, barcode=(), params=None, rects=()):
+    monkeypatch.setattr("app.api.v1.endpoints.ocr.scan_barcodes", lambda b: (list(barcode), list(rects)))
+    monkeypatch.setattr("app.api.v1.endpoints.ocr.get_ocr_pool", lambda: ocr)
+    files = {"file": ("img.png", create_dummy_image(), "image/png")}
+    return TestClient(app).post("/api/v1/ocr/isbn", files=files, params=params)
+
+
+def test_ocr_isbn_stops_at_first_confident_hit(monkeypatch):
+    ocr = StagedOCR(["no digits", "Title\nISBN 978-7-02-000220-7", "ISBN 9780134685991", "more"])
+    r = _post(monkeypatch, ocr)
+    assert r.json()["data"] == {"text_samples": ["no digits", "Title\nISBN 978-7-02-000220-7"], "isbns": ["9787020002207"]}
+    assert ocr.consumed == 2
+
+
+def test_ocr_isbn10_needs_confirmation(monkeypatch):
+    # 同一方案的整页与逐行文本只算一次
+    ocr = StagedOCR(["ISBN 0-306-40615-2", "junk", "ISBN 0306406152", "more"])
+    assert _post(monkeypatch, ocr).json()["data"]["isbns"] == ["0306406152"]
+    assert ocr.consumed == 3
+
+
+def test_ocr_isbn_barcode_skips_ocr_unless_exhaustive(monkeypatch):
+    ocr = StagedOCR(["ISBN 978-7-02-000220-7", "ISBN 9780134685991"])
+    assert _post(monkeypatch, ocr, barcode=["9780134685991"]).json()["data"]["isbns"] == ["9780134685991"]
+    assert ocr.consumed == 0
+
+    r = _post(monkeypatch, ocr, barcode=["9780134685991"], params={"exhaustive": "true"}, rects=[(5, 6, 70, 30)])
+    assert r.json()["data"]["isbns"] == ["9780134685991", "9787020002207"]
+    assert ocr.consumed == 2
+    # 条码只解码一次：位置交给 OCR 定位阶段复用
+    assert ocr.barcodes == [(5, 6, 70, 30)]
+
+
+def test_ocr_isbn_busy_and_timeout(monkeypatch):
+    class BusyOCR:
+        async def iter_pages(self, content: bytes, *, timeout: float, barcodes=None):
+            raise OCRBusy("2 requests in progress")
+            yield
+
+    r = _post(monkeypatch, BusyOCR())
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+
+    class BrokenOCR:
+        async def iter_pages(self, content: bytes, *, timeout: float, barcodes=None):
+            raise BrokenProcessPool("worker died")
+            yield
+
+    r = _post(monkeypatch, BrokenOCR())
+    assert r.status_code == 503 and r.headers["Retry-After"] == "1"
+
+    # 超时前已识别的结果照常返回，毫无结果时 504
+    assert _post(monkeypatch, StagedOCR(["ISBN 0306406152", TIMEOUT])).json()["data"]["isbns"] == ["0306406152"]
+    assert _post(monkeypatch, StagedOCR(["nothing", TIMEOUT])).status_code == 504
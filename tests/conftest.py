@@ -5,3 +5,114 @@ import sys
 ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 if ROOT_DIR not in sys.path:
     sys.path.insert(0, ROOT_DIR)
+
+
+import time
+
+import pytest
+
+from app.services.isbn.circuit_breaker import get_breakers
+from app.services.isbn.rate_limiter import get_rate_limiter
+from app.services.isbn.source_health import get_source_health
+from app.services.isbn.source_stats import get_source_stats
+
+
+class FakeRedis:
+    """Minimal in-memory stand-in for the redis-py commands used by the ISBN services."""
+
+    def __init__(self):
+        self.store = {}
+
+    def _alive(self, key):
+        item = self.store.get(key)
+        if item is None:
+            return None
+        value, expires_at = item
+        if expires_at is not None and expires_at <= time.time():
+            self.store.pop(key, None)
+            return None
+        return value
+
+    def get(self, key):
+        return self._alive(key)
+
+    def mget(self, keys):
+        return [self._alive(k) for k in keys]
+
+    def set(self, key, value, ex=None, nx=False):
+        if nx and self._alive(key) is not None:
+            return None
+        self.store[key] = (value, time.time() + ex if ex else None)
+        return True
+
+    def setex(self, key, ttl, value):
+        self.store[key] = (value, time.time() + ttl)
+        return True
+
+    def delete(self, *keys):
+        return sum(1 for k in keys if self.store.pop(k, None) is not None)
+
+
+class FakeAsyncRedis:
+    """Async view over a FakeRedis store, mirroring redis.asyncio."""
+
+    def __init__(self, client):
+        self._client = client
+
+    async def get(self, key):
+        return self._client.get(key)
+
+    async def mget(self, keys):
+        return self._client.mget(keys)
+
+    async def set(self, key, value, ex=None, nx=False):
+        return self._client.set(key, value, ex=ex, nx=nx)
+
+    async def setex(self, key, ttl, value):
+        return self._client.setex(key, ttl, value)
+
+    async def delete(self, *keys):
+        return self._client.delete(*keys)
+
+    def register_script(self, script):
+        # 只模拟单飞锁的比较删除；其他脚本（如令牌桶）调用时报错，按 Redis 不可用处理
+        from app.services.isbn.singleflight import RELEASE_LUA
+
+        async def compare_and_delete(keys, args):
+            if script != RELEASE_LUA:
+                raise NotImplementedError("script not supported by FakeAsyncRedis")
+            return self._client.delete(keys[0]) if self._client.get(keys[0]) == args[0] else 0
+
+        return compare_and_delete
+
+
+class FakeRedisService:
+    def __init__(self, client):
+        self._client = client
+
+    def get_client(self):
+        return self._client
+
+    def get_async_client(self):
+        return FakeAsyncRedis(self._client)
+
+    def ping(self):
+        return True
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    client = FakeRedis()
+    service = FakeRedisService(client)
+    for target in (
+        "app.services.isbn.source_health.get_redis_service",
+        "app.services.isbn.rate_limiter.get_redis_service",
+        "app.services.isbn.negative_cache.get_redis_service",
+        "app.services.isbn.singleflight.get_redis_service",
+    ):
+        monkeypatch.setattr(target, lambda: service)
+    for singleton in (get_source_health, get_breakers, get_rate_limiter, get_source_stats):
+        singleton.cache_clear()
+    yield client
+    for singleton in (get_source_health, get_breakers, get_rate_limiter, get_source_stats):
+        singleton.cache_clear()
@@ -0,0 +1,47 @@
+import time
+
+from app.services.isbn.book_cache import BookCache
+
+
+def _doc(isbn, raw_size=0):
+    return {"isbn": isbn, "title": f"Book {isbn}", "raw": {"blob": "x" * raw_size}}
+
+
+def test_hit_and_miss_counters():
+    cache = BookCache(max_bytes=10_000, ttl_seconds=60)
+    assert cache.get("111") is None
+    cache.put("111", _doc("111"))
+    assert cache.get("111")["title"] == "Book 111"
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 1 and stats["items"] == 1
+
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = BookCache(max_bytes=700, ttl_seconds=60)
+    cache.put("111", _doc("111", 200))
+    cache.put("222", _doc("222", 200))
+    cache.get("111")
+    cache.put("333", _doc("333", 200))
+    assert cache.get("222") is None
+    assert cache.get("111") is not None
+    assert cache.get("333") is not None
+    assert cache.stats()["bytes"] <= 700
+    assert cache.stats()["evictions"] == 1
+
+
+def test_skips_oversized_docs_and_expires_by_ttl():
+    cache = BookCache(max_bytes=10_000, ttl_seconds=0.05, max_item_bytes=500)
+    cache.put("big", _doc("big", 1000))
+    assert cache.get("big") is None
+    cache.put("111", _doc("111"))
+    time.sleep(0.06)
+    assert cache.get("111") is None
+    assert cache.stats()["items"] == 0
+
+
+def test_put_replaces_previous_doc():
+    cache = BookCache(max_bytes=10_000, ttl_seconds=60)
+    cache.put("111", _doc("111", 100))
+    cache.put("111", {"isbn": "111", "title": "Fresh"})
+    assert cache.get("111")["title"] == "Fresh"
+    assert cache.stats()["items"] == 1
@@ -0,0 +1,277 @@
+import asyncio
+import gzip
+import json
+from datetime import datetime, timezone
+
+from pymongo import DeleteOne
+
+from app.services.isbn import SOURCE_OPEN_LIBRARY, catalog, catalog_import, manager
+from app.services.isbn.book_cache import get_book_cache
+from app.utils.isbn import to_isbn10
+from app.utils.text_similarity import title_tokens
+
+
+class FakeCollection:
+    """books 集合的最小替身：支持按 _id 的 upsert（$set/$setOnInsert/$unset）、删除与查询。"""
+
+    def __init__(self):
+        self.docs = {}
+        self.indexes = []
+
+    def _apply(self, op):
+        key = op._filter["_id"]
+        if isinstance(op, DeleteOne):
+            self.docs.pop(key, None)
+            return
+        update = op._doc
+        existing = self.docs.get(key)
+        doc = dict(existing or {"_id": key})
+        doc.update(update.get("$set", {}))
+        if existing is None:
+            doc.update(update.get("$setOnInsert", {}))
+        for field in update.get("$unset", {}):
+            doc.pop(field, None)
+        self.docs[key] = doc
+
+    def create_indexes(self, indexes):
+        self.indexes.extend(indexes)
+
+    def find(self, query):
+        # 只支持 reindex 使用的 {"$or": [{field: {"$exists": bool}}, ...]}
+        def match(doc):
+            return any((field in doc) == cond["$exists"] for clause in query["$or"] for field, cond in clause.items())
+
+        return [dict(doc) for doc in self.docs.values() if match(doc)]
+
+    def bulk_write(self, ops, ordered=True):
+        for op in ops:
+            self._apply(op)
+
+        class Result:
+            upserted_count = len(ops)
+
+        return Result()
+
+
+class FakeAsyncCollection:
+    def __init__(self, inner):
+        self.inner = inner
+
+    async def find_one(self, query, projection=None):
+        return self.inner.docs.get(query["_id"])
+
+    async def update_one(self, query, update, upsert=False):
+        from pymongo import UpdateOne
+
+        self.inner._apply(UpdateOne(query, update, upsert=upsert))
+
+    async def bulk_write(self, ops, ordered=True):
+        self.inner.bulk_write(ops)
+
+    async def create_indexes(self, indexes):
+        self.inner.create_indexes(indexes)
+
+    async def aggregate(self, pipeline):
+        # 只模拟首个 $match（倒排候选），后续筛选/排序由 catalog.search_title 在本地完成
+        tokens = set(pipeline[0]["$match"]["title_tokens"]["$in"])
+
+        async def rows():
+            for doc in self.inner.docs.values():
+                if tokens & set(doc.get("title_tokens") or ()):
+                    yield doc
+
+        return rows()
+
+    def find(self, query, projection=None):
+        keys = query["_id"]["$in"]
+
+        async def rows():
+            for key in keys:
+                if key in self.inner.docs:
+                    yield self.inner.docs[key]
+
+        return rows()
+
+
+def _use_catalog(monkeypatch):
+    books = FakeCollection()
+    books.raw = FakeCollection()
+    monkeypatch.setattr(catalog, "get_async_database", lambda: {catalog.BOOKS: FakeAsyncCollection(books), catalog.BOOKS_RAW: FakeAsyncCollection(books.raw)})
+    monkeypatch.setattr(catalog_import, "get_database", lambda: {catalog.BOOKS: books, catalog.BOOKS_RAW: books.raw})
+    get_book_cache().clear()
+    return books
+
+
+BOOK = {
+    "source": "google_books",
+    "isbn": "9780134685991",
+    "title": "Effective  Java",
+    "creators": [{"name": "Joshua Bloch", "role": None}],
+    "publisher": "Addison-Wesley",
+    "identifiers": {"isbn_13": "9780134685991", "lccn": "2017956176"},
+}
+
+
+def test_to_isbn10():
+    assert to_isbn10("9780134685991") == "0134685997"
+    assert to_isbn10("978-0-8044-2957-3") == "080442957X"
+    assert to_isbn10("9791191114003") is None
+
+
+def test_catalog_doc_round_trip():
+    row = catalog.to_catalog_doc(BOOK)
+    assert row["_id"] == "9780134685991"
+    assert row["identifier"] == {"isbn_13": "9780134685991", "isbn_10": "0134685997", "other": {"lccn": "2017956176"}}
+    assert row["title_normalized"] == "effective java"
+    doc = catalog.from_catalog_doc(row)
+    assert doc["title"] == "Effective  Java"
+    assert doc["identifiers"] == {"lccn": "2017956176", "isbn_13": "9780134685991", "isbn_10": "0134685997"}
+    # 早期记录的 other 为列表，旧格式记录仍可读取
+    assert catalog.from_catalog_doc(dict(row, identifier=dict(row["identifier"], other=["x"])))["identifiers"]["isbn_10"] == "0134685997"
+    assert catalog.from_catalog_doc({"_id": "x", "lastFetched": BOOK}) is BOOK
+
+
+def test_either_isbn_form_hits_the_same_entry(monkeypatch):
+    books = _use_catalog(monkeypatch)
+    asyncio.run(manager._cache_book(BOOK))
+    assert list(books.docs) == ["9780134685991"]
+
+    get_book_cache().clear()
+    assert asyncio.run(manager._get_cached("0-13-468599-7"))["title"] == "Effective  Java"
+    found = asyncio.run(manager._get_cached_many(["0134685997", "9780134685991", "9780306406157"]))
+    assert set(found) == {"0134685997", "9780134685991"}
+
+
+def test_upsert_replaces_legacy_row(monkeypatch):
+    books = _use_catalog(monkeypatch)
+    books.docs["9780134685991"] = {"_id": "9780134685991", "lastFetched": {"title": "old"}}
+    asyncio.run(catalog.upsert_book(BOOK))
+    row = books.docs["9780134685991"]
+    assert "lastFetched" not in row and row["title"] == "Effective  Java"
+    assert row["updated_at"]
+
+
+def test_raw_payload_is_stored_apart_and_returned_on_request(monkeypatch, fake_redis):
+    books = _use_catalog(monkeypatch)
+    payload = {"items": [{"volumeInfo": {"title": "Effective Java"}}]}
+    asyncio.run(manager._cache_book(dict(BOOK, raw=payload)))
+
+    assert "raw" not in books.docs["9780134685991"]
+    assert catalog.decode_raw(books.raw.docs["9780134685991"]["data"]) == payload
+    assert "raw" not in get_book_cache().get("9780134685991")
+
+    assert "raw" not in asyncio.run(manager.resolve_isbn("9780134685991"))
+    assert asyncio.run(manager.resolve_isbn("0134685997", include_raw=True))["raw"] == payload
+    # 后续不带 raw 的写入不影响已存的原始响应
+    asyncio.run(manager._cache_book(BOOK))
+    assert asyncio.run(catalog.find_raw("9780134685991")) == payload
+
+
+def test_enrichment_updates_fields_without_renewing_fetched_at(monkeypatch, fake_redis):
+    books = _use_catalog(monkeypatch)
+    old = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    books.docs["9780134685991"] = dict(catalog.to_catalog_doc(BOOK), fetched_at=old, updated_at=old)
+    extra = {"source": "open_library", "isbn": "9780134685991", "title": "Effective Java (3rd)", "description": "Best practices", "page_count": 412,
+             "cover": {"url": "c"}, "subjects": ["Java"], "published_date": "2018", "language": "en"}
+
+    monkeypatch.setattr(manager, "_try_source", lambda src, isbn, **kwargs: asyncio.sleep(0, extra if src == "open_library" else None))
+    monkeypatch.setattr(manager, "_candidate_order", lambda *args: ["google_books", "open_library"])
+    monkeypatch.setattr(manager, "_is_rate_limited", lambda src: False)
+    monkeypatch.setattr(manager, "_revalidate", lambda *args: None)
+    doc = asyncio.run(manager.resolve_isbn("9780134685991", enrich=True, enrich_budget=1.0))
+
+    row = books.docs["9780134685991"]
+    # 过期条目补全后仍是过期的，后台刷新照常重新获取主来源
+    assert row["fetched_at"] == old and row["updated_at"] > old
+    assert row["title"] == "Effective  Java" and row["description"] == "Best practices"
+    assert row["sources"] == ["google_books", "open_library"] and row["provenance"]["page_count"] == "open_library"
+    assert get_book_cache().get("9780134685991") == doc
+
+
+def test_reindex_moves_embedded_raw(monkeypatch):
+    books = _use_catalog(monkeypatch)
+    books.docs["9780134685991"] = dict(catalog.to_catalog_doc(BOOK), raw="<xml/>")
+    books.docs["0306406152"] = {"_id": "0306406152", "lastFetched": {"isbn": "0306406152", "title": "Measurement", "raw": {"a": 1}}}
+
+    assert catalog_import.reindex_titles() == 2
+    assert "raw" not in books.docs["9780134685991"]
+    assert set(books.docs) == {"9780134685991", "9780306406157"}
+    assert catalog.decode_raw(books.raw.docs["9780134685991"]["data"]) == "<xml/>"
+    assert catalog.decode_raw(books.raw.docs["9780306406157"]["data"]) == {"a": 1}
+
+
+def test_reindex_keeps_existing_isbn13_row_over_legacy_isbn10_row(monkeypatch):
+    books = _use_catalog(monkeypatch)
+    books.docs["9780134685991"] = catalog.to_catalog_doc(BOOK)
+    books.docs["0134685997"] = {"_id": "0134685997", "lastFetched": {"isbn": "0134685997", "title": "Old edition data"}}
+
+    assert catalog_import.reindex_titles() == 1
+    assert set(books.docs) == {"9780134685991"}
+    row = books.docs["9780134685991"]
+    assert row["title"] == "Effective  Java" and row["publisher"] == "Addison-Wesley"
+    assert row["title_tokens"] == ["effective", "java"]
+
+
+def _write_dump(path, rows):
+    with gzip.open(path, "wt", encoding="utf-8") as f:
+        for rtype, record in rows:
+            f.write(f"{rtype}\t{record['key']}\t1\t2024-01-01T00:00:00\t{json.dumps(record)}\n")
+
+
+def test_import_ol_dump(monkeypatch, tmp_path):
+    books = _use_catalog(monkeypatch)
+    books.docs["9780306406157"] = {"_id": "9780306406157", "title": "From upstream", "identifier": {"isbn_13": "9780306406157"}}
+
+    editions = tmp_path / "editions.txt.gz"
+    authors = tmp_path / "authors.txt.gz"
+    _write_dump(
+        editions,
+        [
+            ("/type/edition", {"key": "/books/OL1M", "title": "Effective Java", "isbn_10": ["0134685997"], "isbn_13": ["9780134685991"],
+                               "authors": [{"key": "/authors/OL1A"}], "publishers": ["Addison-Wesley"], "covers": [42],
+                               "description": {"type": "/type/text", "value": "Best practices"}}),
+            ("/type/edition", {"key": "/books/OL2M", "title": "Measurement", "isbn_10": ["0306406152"]}),
+            ("/type/edition", {"key": "/books/OL3M", "title": "No ISBN"}),
+            ("/type/work", {"key": "/works/OL1W", "title": "Effective Java"}),
+        ],
+    )
+    _write_dump(authors, [("/type/author", {"key": "/authors/OL1A", "name": "Joshua Bloch"})])
+
+    counts = catalog_import.import_ol_dump(str(editions), authors_path=str(authors), batch_size=1)
+
+    assert counts["editions"] == 3 and counts["books"] == 2
+    row = books.docs["9780134685991"]
+    assert row["source"] == SOURCE_OPEN_LIBRARY
+    assert row["creators"] == [{"name": "Joshua Bloch", "role": None}]
+    assert row["description"] == "Best practices"
+    assert row["cover"]["url"].endswith("/42-L.jpg")
+    assert row["identifier"]["other"] == {"openlibrary": "/books/OL1M"}
+    # 已有记录默认不被 dump 覆盖
+    assert books.docs["9780306406157"]["title"] == "From upstream"
+    assert books.indexes == catalog.INDEXES
+
+
+def test_title_tokens_split_cjk_into_bigrams():
+    assert title_tokens("三体II：黑暗森林") == ["三体", "ii", "黑暗", "暗森", "森林"]
+    assert title_tokens("The Art of  Computer-Programming") == ["the", "art", "of", "computer", "programming"]
+    assert title_tokens("上") == ["上"]
+
+
+def test_local_title_search_ranks_by_similarity(monkeypatch):
+    _use_catalog(monkeypatch)
+    titles = {
+        "9787536692930": "三体",
+        "9787536693968": "三体II：黑暗森林",
+        "9787111111115": "黑暗料理",
+        "9780134685991": "Effective Java",
+    }
+    for isbn, title in titles.items():
+        asyncio.run(catalog.upsert_book({"isbn": isbn, "title": title}))
+
+    found = asyncio.run(catalog.search_title("黑暗森林", min_similarity=0.3))
+    assert [b["title"] for b in found] == ["三体II：黑暗森林"]  # 黑暗料理 只共享一个二元组
+    found = asyncio.run(catalog.search_title("三体", min_similarity=0.2))
+    assert [b["title"] for b in found] == ["三体", "三体II：黑暗森林"]
+    found = asyncio.run(catalog.search_title("the effective java", min_similarity=0.5))
+    assert [b["title"] for b in found] == ["Effective Java"]
+    assert asyncio.run(catalog.search_title("!!!")) == []
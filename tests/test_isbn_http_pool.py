@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+
+from app.services.isbn import client_base
+from app.services.isbn import open_library
+
+
+def test_async_client_shared_per_host():
+    async def grab():
+        urls = ("https://openlibrary.org/api/books", "https://openlibrary.org/search.json", "https://www.loc.gov/books/")
+        return [client_base.get_async_client(url) for url in urls]
+
+    a, b, c = asyncio.run(grab())
+    assert a is b
+    assert a is not c
+
+
+def test_async_client_rebuilt_for_new_event_loop():
+    async def grab():
+        return client_base.get_async_client("https://openlibrary.org/api/books")
+
+    first = asyncio.run(grab())
+    second = asyncio.run(grab())
+    assert first is not second
+
+
+def test_async_adapter_uses_shared_pool(monkeypatch):
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url)
+        return httpx.Response(200, json={"ISBN:9780134685991": {"title": "Effective Java", "authors": [{"name": "Joshua Bloch"}]}})
+
+    transport_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(client_base, "get_async_client", lambda url: transport_client)
+
+    async def run():
+        try:
+            return await open_library.fetch_by_isbn_async("9780134685991")
+        finally:
+            await transport_client.aclose()
+
+    book = asyncio.run(run())
+    assert book["title"] == "Effective Java"
+    assert book["creators"][0]["name"] == "Joshua Bloch"
+    assert calls[0].params["bibkeys"] == "ISBN:9780134685991"
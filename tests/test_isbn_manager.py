@@ -0,0 +1,220 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.isbn import manager
+
+
+def _async_return(value):
+    async def fake(*args, **kwargs):
+        return value
+
+    return fake
+
+
+@pytest.fixture(autouse=True)
+def _redis(fake_redis):
+    return fake_redis
+
+
+def _patch_sources(monkeypatch, delays, results):
+    started, cancelled = [], []
+
+    async def fake_try_source(src, isbn, **kwargs):
+        started.append(src)
+        try:
+            await asyncio.sleep(delays[src])
+        except asyncio.CancelledError:
+            cancelled.append(src)
+            raise
+        return results.get(src)
+
+    monkeypatch.setattr(manager, "_get_cached", _async_return(None))
+    monkeypatch.setattr(manager, "_is_rate_limited", lambda src: False)
+    monkeypatch.setattr(manager, "_try_source", fake_try_source)
+    monkeypatch.setattr(manager, "_cache_book", _async_return(None))
+    return started, cancelled
+
+
+def test_parallel_returns_first_good_result(monkeypatch):
+    started, cancelled = _patch_sources(
+        monkeypatch,
+        delays={"loc": 0.5, "open_library": 0.05, "google_books": 0.3},
+        results={"loc": None, "open_library": {"title": "Effective Java", "source": "open_library"}},
+    )
+
+    async def run():
+        t0 = time.perf_counter()
+        doc = await manager.resolve_isbn("9780134685991", mode="parallel", fanout=3)
+        return doc, time.perf_counter() - t0
+
+    doc, elapsed = asyncio.run(run())
+    assert doc["source"] == "open_library"
+    assert elapsed < 0.3
+    assert set(started) == {"loc", "open_library", "google_books"}
+    assert set(cancelled) == {"loc", "google_books"}
+
+
+def test_hedged_does_not_start_next_source_when_first_answers(monkeypatch):
+    started, cancelled = _patch_sources(
+        monkeypatch,
+        delays={"loc": 0.05, "open_library": 0.05},
+        results={"loc": {"title": "Effective Java", "source": "loc"}},
+    )
+    doc = asyncio.run(manager.resolve_isbn("9780134685991", mode="hedged", fanout=3, hedge_delay=0.5))
+    assert doc["source"] == "loc"
+    assert started == ["loc"]
+
+
+def test_hedged_starts_next_source_after_delay(monkeypatch):
+    started, cancelled = _patch_sources(
+        monkeypatch,
+        delays={"loc": 0.6, "open_library": 0.05, "google_books": 0.05},
+        results={"loc": {"title": "slow", "source": "loc"}, "open_library": {"title": "fast", "source": "open_library"}},
+    )
+    doc = asyncio.run(manager.resolve_isbn("9780134685991", mode="hedged", fanout=3, hedge_delay=0.1))
+    assert doc["source"] == "open_library"
+    assert started == ["loc", "open_library"]
+
+
+def test_sequential_falls_through_empty_sources(monkeypatch):
+    started, cancelled = _patch_sources(
+        monkeypatch,
+        delays={"loc": 0.0, "open_library": 0.0, "google_books": 0.0},
+        results={"google_books": {"title": "Effective Java", "source": "google_books"}},
+    )
+    doc = asyncio.run(manager.resolve_isbn("9780134685991", mode="sequential"))
+    assert doc["source"] == "google_books"
+    assert started == ["loc", "open_library", "google_books"]
+
+
+def test_batch_uses_bulk_cache_and_open_library_bibkeys(monkeypatch):
+    bulk_calls, single_calls, cached_writes = [], [], []
+
+    async def fake_bulk(isbns, timeout=10.0):
+        bulk_calls.append(list(isbns))
+        return {"222": {"title": "From OL", "source": "open_library", "isbn": "222"}}
+
+    async def fake_try_source(src, isbn, **kwargs):
+        single_calls.append((src, isbn))
+        if src == "google_books":
+            return {"title": "From GB", "source": "google_books", "isbn": isbn}
+        return None
+
+    monkeypatch.setattr(manager, "_get_cached_many", _async_return({"111": {"title": "Cached", "isbn": "111"}}))
+    monkeypatch.setattr(manager, "_is_rate_limited", lambda src: False)
+    monkeypatch.setattr(manager, "_is_resolvable", lambda isbn: True)  # 占位 ISBN 不在号段表中
+    monkeypatch.setattr(manager.open_library, "fetch_by_isbns_async", fake_bulk)
+    monkeypatch.setattr(manager, "_try_source", fake_try_source)
+    async def cache_books(docs):
+        cached_writes.extend(docs)
+
+    async def cache_book(doc):
+        cached_writes.append(doc)
+
+    monkeypatch.setattr(manager, "_cache_books", cache_books)
+    monkeypatch.setattr(manager, "_cache_book", cache_book)
+
+    async def run():
+        return [item async for item in manager.resolve_isbn_batch(["111", "222", "333", "111"])]
+
+    results = asyncio.run(run())
+    by_isbn = {isbn: (doc, err) for isbn, doc, err in results}
+    assert len(results) == 3
+    assert results[0][0] == "111"
+    assert by_isbn["222"][0]["title"] == "From OL"
+    assert by_isbn["333"][0]["title"] == "From GB"
+    assert bulk_calls == [["222", "333"]]
+    # Open Library 已批量查询过，逐个解析时不再请求
+    assert all(src != "open_library" for src, _ in single_calls)
+    assert {d["title"] for d in cached_writes} == {"From OL", "From GB"}
+
+
+def test_negative_cache_short_circuits_known_misses(monkeypatch, fake_redis):
+    started, _ = _patch_sources(
+        monkeypatch,
+        delays={"loc": 0.0, "open_library": 0.0, "google_books": 0.0},
+        results={},
+    )
+    # _patch_sources 绕过了 _try_source，这里手动模拟各来源的“未找到”标记
+    async def marking(src, isbn, **kwargs):
+        started.append(src)
+        await manager.negative_cache.mark_source_missing(isbn, src)
+        return None
+
+    monkeypatch.setattr(manager, "_try_source", marking)
+    monkeypatch.setattr(manager, "_is_configured", lambda src, keys: src in ("loc", "open_library", "google_books"))
+
+    assert asyncio.run(manager.resolve_isbn("9780000000002", mode="sequential")) is None
+    assert started == ["loc", "open_library", "google_books"]
+    assert fake_redis.get("isbn:notfound:9780000000002") == "1"
+
+    started.clear()
+    assert asyncio.run(manager.resolve_isbn("9780000000002", mode="sequential")) is None
+    assert started == []
+
+
+def test_negative_cache_skips_only_missing_source(monkeypatch, fake_redis):
+    started, _ = _patch_sources(
+        monkeypatch,
+        delays={"loc": 0.0, "open_library": 0.0, "google_books": 0.0},
+        results={"open_library": {"title": "Found later", "source": "open_library"}},
+    )
+    asyncio.run(manager.negative_cache.mark_source_missing("9780134685991", "loc"))
+    doc = asyncio.run(manager.resolve_isbn("9780134685991", mode="sequential"))
+    assert doc["source"] == "open_library"
+    assert started == ["open_library"]
+
+
+def test_enrich_fills_missing_fields_from_other_sources(monkeypatch):
+    started, cancelled = _patch_sources(
+        monkeypatch,
+        delays={"loc": 0.01, "google_books": 0.05, "open_library": 0.5, "isbndb": 0.5},
+        results={
+            "loc": {"source": "loc", "isbn": "9780134685991", "title": "Effective Java", "publisher": "Addison-Wesley"},
+            "google_books": {"source": "google_books", "title": "Effective Java!", "description": "Best practices", "page_count": 412,
+                             "cover": {"thumbnail": "g"}, "subjects": ["Java"], "published_date": "2018", "language": "en"},
+        },
+    )
+    monkeypatch.setattr(manager, "_candidate_order", lambda *args: ["loc", "google_books", "open_library", "isbndb"])
+    cached = []
+    monkeypatch.setattr(manager, "_cache_enrichment", lambda doc, fields: _async_return(cached.append((doc, fields)))())
+
+    doc = asyncio.run(manager.resolve_isbn("9780134685991", mode="sequential", enrich=True, enrich_budget=1.0))
+    assert doc["title"] == "Effective Java" and doc["source"] == "loc"
+    assert doc["description"] == "Best practices" and doc["cover"] == {"thumbnail": "g"}
+    assert doc["provenance"]["title"] == "loc" and doc["provenance"]["page_count"] == "google_books"
+    assert doc["sources"] == ["loc", "google_books"]
+    # 首个补全来源已填满缺失字段，其余补全请求被取消
+    assert cancelled == ["open_library"]  # isbndb 未配置密钥，不参与补全
+    # 只写回补全的字段
+    fields = ["published_date", "language", "subjects", "description", "page_count", "cover", "preview_urls", "sources", "provenance"]
+    assert cached == [(doc, fields)]
+
+
+def test_enrich_respects_budget_and_skips_enriched_docs(monkeypatch):
+    started, cancelled = _patch_sources(
+        monkeypatch,
+        delays={"google_books": 1.0},
+        results={"google_books": {"source": "google_books", "title": "slow", "description": "late"}},
+    )
+    monkeypatch.setattr(manager, "_candidate_order", lambda *args: ["loc", "google_books"])
+    base = {"source": "loc", "isbn": "9780134685991", "title": "Effective Java"}
+    monkeypatch.setattr(manager, "_get_cached", _async_return(base))
+    cached = []
+    monkeypatch.setattr(manager, "_cache_enrichment", lambda doc, fields: _async_return(cached.append(doc))())
+
+    t0 = time.perf_counter()
+    doc = asyncio.run(manager.resolve_isbn("9780134685991", enrich=True, enrich_budget=0.1))
+    assert time.perf_counter() - t0 < 0.5
+    assert doc["title"] == "Effective Java" and "description" not in doc
+    assert cancelled == ["google_books"] and cached == []
+
+    # 已合并过的记录不再补全；未请求 enrich 时不访问其他来源
+    started.clear()
+    monkeypatch.setattr(manager, "_get_cached", _async_return(dict(base, sources=["loc"])))
+    asyncio.run(manager.resolve_isbn("9780134685991", enrich=True))
+    monkeypatch.setattr(manager, "_get_cached", _async_return(base))
+    assert asyncio.run(manager.resolve_isbn("9780134685991")) is base
+    assert started == []
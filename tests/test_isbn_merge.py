@@ -0,0 +1,59 @@
+from app.services.isbn import SOURCE_GOOGLE_BOOKS, SOURCE_LOC, SOURCE_OPEN_LIBRARY
+from app.services.isbn.merge import cluster_books, fuse, merge_books
+
+LOC = {
+    "source": SOURCE_LOC,
+    "isbn": "",
+    "title": "Effective Java / Joshua Bloch.",
+    "creators": [{"name": "Bloch, Joshua, 1961-", "role": None}],
+    "publisher": "Addison-Wesley",
+    "subjects": ["Java (Computer program language)"],
+    "identifiers": {"loc_item": "2017956176"},
+    "preview_urls": ["https://www.loc.gov/item/2017956176/"],
+}
+GOOGLE = {
+    "source": SOURCE_GOOGLE_BOOKS,
+    "isbn": "9780134685991",
+    "title": "Effective Java",
+    "creators": [{"name": "Joshua Bloch", "role": None}],
+    "description": "The Definitive Guide to Java Platform Best Practices",
+    "page_count": 412,
+    "cover": {"thumbnail": "https://books.google.com/thumb"},
+    "identifiers": {"isbn_13": "9780134685991", "isbn_10": "0134685997"},
+    "preview_urls": ["https://books.google.com/books?id=ka2VUBqHiWkC"],
+}
+OPEN_LIBRARY = {
+    "source": SOURCE_OPEN_LIBRARY,
+    "isbn": "0134685997",
+    "title": "Effective Java",
+    "creators": [{"name": "Joshua Bloch", "role": None}],
+    "page_count": 416,
+    "cover": {"large": "https://covers.openlibrary.org/b/id/1-L.jpg"},
+    "identifiers": {"openlibrary": "/books/OL1M"},
+}
+SECOND_EDITION = dict(GOOGLE, isbn="9780321356680", identifiers={"isbn_13": "9780321356680"})
+
+
+def test_clusters_by_isbn_equivalence_and_title_author():
+    clusters = cluster_books([GOOGLE, SECOND_EDITION, OPEN_LIBRARY, LOC])
+    # ISBN-10 与 ISBN-13 等价；LOC 无 ISBN，按主标题 + 作者（姓名顺序无关）并入；不同 ISBN 的版次不合并
+    assert clusters == [[GOOGLE, OPEN_LIBRARY, LOC], [SECOND_EDITION]]
+
+
+def test_fuse_picks_fields_by_trust_and_records_provenance():
+    book = fuse([OPEN_LIBRARY, GOOGLE, LOC])
+    assert book["source"] == SOURCE_LOC
+    assert book["sources"] == [SOURCE_LOC, SOURCE_GOOGLE_BOOKS, SOURCE_OPEN_LIBRARY]
+    assert book["title"] == LOC["title"] and book["provenance"]["title"] == SOURCE_LOC
+    assert book["description"] == GOOGLE["description"] and book["provenance"]["description"] == SOURCE_GOOGLE_BOOKS
+    assert book["page_count"] == 412 and book["cover"] == GOOGLE["cover"]
+    assert book["isbn"] == "9780134685991"
+    assert book["identifiers"] == {"loc_item": "2017956176", "isbn_13": "9780134685991", "isbn_10": "0134685997", "openlibrary": "/books/OL1M"}
+    assert book["preview_urls"] == LOC["preview_urls"] + GOOGLE["preview_urls"]
+    assert "language" not in book["provenance"]
+
+
+def test_merge_keeps_unrelated_records():
+    other = {"source": SOURCE_LOC, "isbn": "", "title": "Java Concurrency in Practice", "creators": [{"name": "Goetz, Brian"}]}
+    merged = merge_books([GOOGLE, other, LOC])
+    assert [b["title"] for b in merged] == [LOC["title"], other["title"]]
@@ -0,0 +1,85 @@
+import asyncio
+
+from app.services.isbn import manager
+from app.utils.isbn import extract_isbn_candidates, hyphenate, infer_country, is_assigned, normalize_isbn, registration_agency, split_isbn
+from app.utils.isbn_ranges import IsbnRanges, get_isbn_ranges
+
+RANGE_MESSAGE = b"""<?xml version="1.0" encoding="utf-8"?>
+<ISBNRangeMessage>
+  <MessageSerialNumber>test</MessageSerialNumber><MessageDate>Thu, 1 Jan 2026 00:00:00 GMT</MessageDate>
+  <RegistrationGroups>
+    <Group><Prefix>978-7</Prefix><Agency>China, People's Republic</Agency><Rules>
+      <Rule><Range>0000000-0999999</Range><Length>2</Length></Rule>
+      <Rule><Range>1000000-4999999</Range><Length>0</Length></Rule>
+      <Rule><Range>5000000-7999999</Range><Length>4</Length></Rule>
+    </Rules></Group>
+    <Group><Prefix>978-99937</Prefix><Agency>Macau</Agency><Rules>
+      <Rule><Range>0000000-1999999</Range><Length>1</Length></Rule>
+    </Rules></Group>
+    <Group><Prefix>979-11</Prefix><Agency>Korea, Republic</Agency><Rules>
+      <Rule><Range>0000000-2399999</Range><Length>2</Length></Rule>
+    </Rules></Group>
+  </RegistrationGroups>
+</ISBNRangeMessage>"""
+
+
+def test_compiled_table_splits_by_group_and_registrant():
+    ranges = IsbnRanges.from_bytes(IsbnRanges.from_range_message(RANGE_MESSAGE).to_bytes())
+    assert (ranges.serial, ranges.names) == ("test", ["978-7", "978-99937", "979-11"])
+    assert ranges.split("9787020002207") == ("978", "7", "02", "000220", "7")
+    assert ranges.split("9787500000000") == ("978", "7", "5000", "0000", "0")
+    assert ranges.split("9789993710000") == ("978", "99937", "1", "000", "0")
+    assert ranges.split("9791191114003") is None  # 组内未定义的出版者区段
+    assert ranges.agencies[ranges.group("9791191114003")] == "Korea, Republic"
+    # 组未分配 / 组号前缀相同的其他组
+    assert ranges.split("9787100000000") is None
+    assert ranges.group("9789993800000") is None
+    assert ranges.group("9780306406157") is None
+
+
+def test_bundled_table_hyphenates_and_infers_country():
+    assert len(get_isbn_ranges().names) > 200
+    assert hyphenate("9787020002207") == "978-7-02-000220-7"
+    assert hyphenate("0306406152") == "0-306-40615-2"
+    assert hyphenate("979-11-91114-00-3") == "979-11-91114-00-3"
+    assert split_isbn("9789620428159") == ("978", "962", "04", "2815", "9")
+    assert registration_agency("9780306406157") == "English language"
+    assert infer_country("9791191114003") == "KR"
+    assert infer_country("9784062035163") == "JP"
+
+
+def test_valid_checksum_in_unassigned_range_is_rejected():
+    # 979-8 的出版者区段从 200 开始；979-0 是 ISMN 前缀，不是 ISBN 注册组
+    for isbn in ("9798000000007", "9790000000001"):
+        assert not is_assigned(isbn) and hyphenate(isbn) is None
+    assert is_assigned("9798200000005")
+    assert not is_assigned("9787020002208")  # 校验位错误
+    text = "ISBN 9790000000001 / 978-7-02-000220-7"
+    assert extract_isbn_candidates(text, assigned_only=True) == [("ISBN-13", "9787020002207")]
+    # 未启用号段检查时只按校验位识别（号段表过期时不丢弃新分配号段的 ISBN）
+    assert extract_isbn_candidates(text) == [("ISBN-13", "9790000000001"), ("ISBN-13", "9787020002207")]
+    assert normalize_isbn("9790000000001") == ("ISBN-13", "9790000000001")
+
+
+def test_resolve_skips_upstream_for_unassigned_isbn(monkeypatch):
+    calls = []
+
+    async def fake_try_source(src, isbn, **kwargs):
+        calls.append(src)
+        return {"source": src, "isbn": isbn, "title": "x"}
+
+    async def no_cache(isbn):
+        return None
+
+    async def no_cache_many(isbns):
+        return {}
+
+    monkeypatch.setattr(manager, "_get_cached", no_cache)
+    monkeypatch.setattr(manager, "_get_cached_many", no_cache_many)
+    monkeypatch.setattr(manager, "_try_source", fake_try_source)
+
+    async def run():
+        return [item async for item in manager.resolve_isbn_batch(["9798000000007"])], await manager.resolve_isbn("9798000000007")
+
+    assert asyncio.run(run()) == ([("9798000000007", None, None)], None)
+    assert calls == []
@@ -0,0 +1,170 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.services.isbn import catalog, manager, refresh
+from app.services.isbn.book_cache import get_book_cache
+from app.services.isbn.refresh import CatalogRefresher, parse_ttls
+
+ISBN = "9780134685991"
+NOW = datetime.now(timezone.utc)
+OLD = NOW - timedelta(days=400)
+
+
+@pytest.fixture(autouse=True)
+def _redis(fake_redis):
+    return fake_redis
+
+
+@pytest.fixture
+def refresher(monkeypatch):
+    r = CatalogRefresher(refresh.SOURCE_TTLS, default_ttl=30 * 86400, interval=60, batch=10, concurrency=4)
+    monkeypatch.setattr(manager, "get_catalog_refresher", lambda: r)
+    return r
+
+
+def _patch_store(monkeypatch, rows):
+    async def find_entry(isbn):
+        return rows.get(catalog.catalog_key(isbn))
+
+    async def find_entries(isbns):
+        return {i: rows[catalog.catalog_key(i)] for i in isbns if catalog.catalog_key(i) in rows}
+
+    async def upsert_book(doc):
+        key = catalog.book_isbn13(doc)
+        rows[key] = (doc, datetime.now(timezone.utc))
+        return key
+
+    monkeypatch.setattr(catalog, "find_entry", find_entry)
+    monkeypatch.setattr(catalog, "find_entries", find_entries)
+    monkeypatch.setattr(catalog, "upsert_book", upsert_book)
+    get_book_cache().clear()
+
+
+def test_ttl_policy():
+    assert parse_ttls("google_books=60, loc=x,bad") == {"google_books": 60}
+    r = CatalogRefresher({**refresh.SOURCE_TTLS, "google_books": 60}, default_ttl=30 * 86400, interval=60, batch=10, concurrency=4)
+    assert not r.is_stale("loc", NOW - timedelta(days=100))
+    assert r.is_stale("loc", NOW - timedelta(days=200))
+    assert r.is_stale("google_books", NOW - timedelta(seconds=61))
+    assert not r.is_stale("open_library", NOW - timedelta(days=29))
+    assert r.is_stale("open_library", NOW - timedelta(days=31))
+    # 旧格式记录没有获取时间，视为过期；人工录入不过期
+    assert r.is_stale("open_library", None)
+    assert not r.is_stale("manual", None)
+
+
+def test_fetched_at_falls_back_to_updated_at():
+    naive = datetime(2025, 1, 1)
+    assert catalog.fetched_at({"updated_at": naive}) == naive.replace(tzinfo=timezone.utc)
+    assert catalog.fetched_at({"fetched_at": NOW, "updated_at": naive}) == NOW
+    assert catalog.fetched_at({"lastFetched": {}}) is None
+
+
+def test_stale_hit_is_served_and_refreshed_in_background(monkeypatch, refresher):
+    rows = {ISBN: ({"source": "open_library", "isbn": ISBN, "title": "old"}, OLD)}
+    _patch_store(monkeypatch, rows)
+    calls = []
+
+    async def fake_try_source(src, isbn, **kwargs):
+        calls.append(src)
+        return {"source": src, "isbn": isbn, "title": "new"}
+
+    monkeypatch.setattr(manager, "_try_source", fake_try_source)
+    monkeypatch.setattr(manager, "_is_rate_limited", lambda src: False)
+
+    async def run():
+        doc = await manager.resolve_isbn(ISBN)
+        await asyncio.gather(*refresher._inflight.values())
+        return doc
+
+    assert asyncio.run(run())["title"] == "old"
+    assert calls == ["open_library"]  # 原来源优先
+    assert rows[ISBN][0]["title"] == "new"
+
+    # 刷新结果已写回：再次命中返回新数据，且不再触发刷新
+    get_book_cache().clear()
+    assert asyncio.run(run())["title"] == "new"
+    assert calls == ["open_library"]
+
+
+def test_refresh_keeps_fields_enriched_from_other_sources(monkeypatch, refresher):
+    enriched = {
+        "source": "open_library", "isbn": ISBN, "title": "old", "publisher": "gone upstream", "description": "From Google",
+        "sources": ["open_library", "google_books"],
+        "provenance": {"title": "open_library", "publisher": "open_library", "description": "google_books"},
+    }
+    rows = {ISBN: (enriched, OLD)}
+    _patch_store(monkeypatch, rows)
+
+    async def fake_try_source(src, isbn, **kwargs):
+        return {"source": src, "isbn": isbn, "title": "new"}
+
+    monkeypatch.setattr(manager, "_try_source", fake_try_source)
+    monkeypatch.setattr(manager, "_is_rate_limited", lambda src: False)
+    asyncio.run(manager.refresh_book(ISBN, enriched))
+
+    doc = rows[ISBN][0]
+    assert (doc["title"], doc["description"]) == ("new", "From Google")
+    assert "publisher" not in doc  # 主来源自身不再提供的字段随刷新清除
+    assert doc["provenance"] == {"title": "open_library", "description": "google_books"}
+    assert doc["sources"] == ["open_library", "google_books"]
+    assert get_book_cache().get(ISBN)["provenance"] == doc["provenance"]
+
+
+def test_refresh_miss_does_not_mark_catalog_book_as_not_found(monkeypatch, refresher, fake_redis):
+    rows = {ISBN: ({"source": "loc", "isbn": ISBN, "title": "old"}, OLD)}
+    _patch_store(monkeypatch, rows)
+    async def not_found(src, isbn, **kwargs):
+        await manager.negative_cache.mark_source_missing(isbn, src)
+
+    monkeypatch.setattr(manager, "_try_source", not_found)
+    monkeypatch.setattr(manager, "_is_rate_limited", lambda src: False)
+
+    asyncio.run(manager.refresh_book(ISBN, rows[ISBN][0]))
+    assert manager.negative_cache._key(ISBN) not in fake_redis.store
+    assert rows[ISBN][0]["title"] == "old"
+
+
+def test_stale_l1_hit_is_refreshed(monkeypatch, refresher):
+    rows = {}
+    _patch_store(monkeypatch, rows)
+    get_book_cache().put(ISBN, {"source": "open_library", "isbn": ISBN, "title": "old"}, OLD)
+
+    async def fake_try_source(src, isbn, **kwargs):
+        return {"source": src, "isbn": isbn, "title": "new"}
+
+    monkeypatch.setattr(manager, "_try_source", fake_try_source)
+    monkeypatch.setattr(manager, "_is_rate_limited", lambda src: False)
+
+    async def run():
+        doc = await manager.resolve_isbn(ISBN)
+        await asyncio.gather(*refresher._inflight.values())
+        return doc
+
+    assert asyncio.run(run())["title"] == "old"
+    assert rows[ISBN][0]["title"] == "new"
+    # 刷新后 L1 带上新的 fetched_at，不再触发刷新
+    assert get_book_cache().get_entry(ISBN)[1] > OLD
+    assert asyncio.run(run())["title"] == "new" and not refresher._inflight
+
+
+def test_refresh_popular_only_refreshes_stale_entries(monkeypatch, refresher):
+    rows = {
+        "9780134685991": ({"source": "open_library", "title": "stale"}, OLD),
+        "9780306406157": ({"source": "open_library", "title": "fresh"}, NOW),
+        "9787111111115": ({"source": "manual", "title": "manual"}, OLD),
+    }
+    _patch_store(monkeypatch, rows)
+    for key in ("9780134685991", "9780306406157", "9787111111115", "9780134685991", "9781982137274"):
+        refresher.record_hit(key)
+    refreshed = []
+
+    async def fake_refresh(key, doc):
+        refreshed.append(key)
+
+    assert asyncio.run(refresher.refresh_popular(fake_refresh)) == 1
+    assert refreshed == ["9780134685991"]
+    # 每个周期重新计数
+    assert refresher.take_popular(10) == []
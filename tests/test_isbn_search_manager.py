@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+from app.services.isbn import SOURCE_GOOGLE_BOOKS, SOURCE_LOC, SOURCE_OPEN_LIBRARY
+from app.services.isbn import catalog, search_manager
+from app.services.isbn.client_base import RateLimitError
+
+
+def _patch_catalog(monkeypatch, local=()):
+    stored = []
+
+    async def fake_local(title, *, limit=10, min_similarity=0.5):
+        return list(local)
+
+    async def fake_upsert(items, *, overwrite=True):
+        stored.extend(items)
+
+    monkeypatch.setattr(catalog, "search_title", fake_local)
+    monkeypatch.setattr(catalog, "upsert_books", fake_upsert)
+    return stored
+
+
+def _patch_search(monkeypatch, delays, errors=None, local=()):
+    stored = _patch_catalog(monkeypatch, local)
+    calls = []
+
+    async def fake_search(src, title, *, max_results=5, timeout=10.0, **kwargs):
+        calls.append(src)
+        await asyncio.sleep(delays[src])
+        if errors and src in errors:
+            raise errors[src]
+        return [{"source": src, "title": title, "isbn": "9780306406157"}, {"source": src, "title": f"{src} unrelated", "isbn": src}]
+
+    monkeypatch.setattr(search_manager, "search_from_source", fake_search)
+    return calls, stored
+
+
+def test_sources_run_concurrently_and_results_keep_priority(monkeypatch, fake_redis):
+    _patch_search(monkeypatch, {SOURCE_LOC: 0.2, SOURCE_OPEN_LIBRARY: 0.05, SOURCE_GOOGLE_BOOKS: 0.2})
+
+    async def run():
+        started = time.monotonic()
+        result = await search_manager.search_title("Effective Java", min_similarity=0.9)
+        return result, time.monotonic() - started
+
+    (items, statuses), elapsed = asyncio.run(run())
+    assert elapsed < 0.35  # 并发：约等于最慢来源，而非三者之和
+    # 同一 (title, isbn) 只保留优先级最高来源（LOC）的条目
+    assert [i["source"] for i in items] == [SOURCE_LOC]
+    assert {s: v["status"] for s, v in statuses.items()} == {"local": "empty", SOURCE_LOC: "ok", SOURCE_OPEN_LIBRARY: "ok", SOURCE_GOOGLE_BOOKS: "ok"}
+    assert statuses[SOURCE_LOC]["count"] == 1
+
+
+def test_deadline_returns_partial_results_with_status(monkeypatch, fake_redis):
+    _patch_search(
+        monkeypatch,
+        {SOURCE_LOC: 1.0, SOURCE_OPEN_LIBRARY: 0.01, SOURCE_GOOGLE_BOOKS: 0.01},
+        errors={SOURCE_GOOGLE_BOOKS: RateLimitError("google_books rate limited")},
+    )
+
+    async def run():
+        started = time.monotonic()
+        result = await search_manager.search_title("Effective Java", min_similarity=0.9, deadline=0.1)
+        return result, time.monotonic() - started
+
+    (items, statuses), elapsed = asyncio.run(run())
+    assert elapsed < 0.5
+    assert [i["source"] for i in items] == [SOURCE_OPEN_LIBRARY]
+    assert statuses[SOURCE_LOC]["status"] == "timeout"
+    assert statuses[SOURCE_OPEN_LIBRARY]["status"] == "ok"
+    assert statuses[SOURCE_GOOGLE_BOOKS]["status"] == "rate_limited"
+
+
+def test_stream_yields_in_completion_order(monkeypatch, fake_redis):
+    _patch_search(monkeypatch, {SOURCE_LOC: 0.1, SOURCE_OPEN_LIBRARY: 0.0, SOURCE_GOOGLE_BOOKS: 0.05})
+
+    async def run():
+        return [src async for src, _, _ in search_manager.iter_search_title("Effective Java")]
+
+    assert asyncio.run(run()) == ["local", SOURCE_OPEN_LIBRARY, SOURCE_GOOGLE_BOOKS, SOURCE_LOC]
+
+
+LOCAL_BOOKS = [{"source": "open_library", "title": "Effective Java", "isbn": str(9780134685991 + i)} for i in range(3)]
+
+
+def test_enough_local_results_skip_upstreams(monkeypatch, fake_redis):
+    calls, _ = _patch_search(monkeypatch, {SOURCE_LOC: 0.0, SOURCE_OPEN_LIBRARY: 0.0, SOURCE_GOOGLE_BOOKS: 0.0}, local=LOCAL_BOOKS)
+
+    items, statuses = asyncio.run(search_manager.search_title("Effective Java"))
+
+    assert calls == []
+    assert [i["isbn"] for i in items] == [b["isbn"] for b in LOCAL_BOOKS]
+    assert statuses == {"local": {"status": "ok", "count": 3, "error": None, "elapsed": statuses["local"]["elapsed"]}}
+
+
+def test_insufficient_local_results_fall_back_and_are_stored(monkeypatch, fake_redis):
+    calls, stored = _patch_search(monkeypatch, {SOURCE_LOC: 0.0, SOURCE_OPEN_LIBRARY: 0.0, SOURCE_GOOGLE_BOOKS: 0.0}, local=LOCAL_BOOKS[:1])
+
+    async def run():
+        result = await search_manager.search_title("Effective Java", min_similarity=0.9)
+        await asyncio.sleep(0)  # 让后台写入任务完成
+        return result
+
+    items, statuses = asyncio.run(run())
+
+    assert sorted(calls) == sorted([SOURCE_LOC, SOURCE_OPEN_LIBRARY, SOURCE_GOOGLE_BOOKS])
+    assert items[0]["isbn"] == LOCAL_BOOKS[0]["isbn"]
+    assert [i["source"] for i in items[1:]] == [SOURCE_LOC]
+    assert items[1]["sources"] == [SOURCE_LOC, SOURCE_GOOGLE_BOOKS, SOURCE_OPEN_LIBRARY]
+    assert len(stored) == 3
+
+
+def test_force_local_never_calls_upstreams(monkeypatch, fake_redis):
+    calls, _ = _patch_search(monkeypatch, {SOURCE_LOC: 0.0, SOURCE_OPEN_LIBRARY: 0.0, SOURCE_GOOGLE_BOOKS: 0.0})
+
+    items, statuses = asyncio.run(search_manager.search_title("Effective Java", force_source="local"))
+
+    assert calls == [] and items == []
+    assert statuses["local"]["status"] == "empty"
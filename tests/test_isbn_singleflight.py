@@ -0,0 +1,111 @@
+import asyncio
+import dataclasses
+
+from app.core.config import get_settings
+from app.services.isbn import manager, singleflight
+from app.services.isbn.singleflight import SingleFlight
+
+
+def test_async_calls_for_same_key_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        return await asyncio.gather(*(flights.do("k", work) for _ in range(10)))
+
+    assert asyncio.run(run()) == ["done"] * 10
+    assert len(calls) == 1
+    assert flights.in_flight() == 0
+
+
+def test_cancelled_waiter_does_not_cancel_shared_work():
+    flights = SingleFlight()
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        first = asyncio.ensure_future(flights.do("k", work))
+        second = asyncio.ensure_future(flights.do("k", work))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def _async_return(value):
+    async def fake(*args, **kwargs):
+        return value
+
+    return fake
+
+
+def _patch_manager(monkeypatch, upstream_calls):
+    async def fake_try_source(src, isbn, **kwargs):
+        upstream_calls.append(src)
+        await asyncio.sleep(0.05)
+        return {"title": "Effective Java", "source": src, "isbn": isbn}
+
+    monkeypatch.setattr(manager, "_get_cached", _async_return(None))
+    monkeypatch.setattr(manager, "_is_rate_limited", lambda src: False)
+    monkeypatch.setattr(manager, "_try_source", fake_try_source)
+    monkeypatch.setattr(manager, "_cache_book", _async_return(None))
+
+
+def test_concurrent_resolves_hit_upstream_once(monkeypatch, fake_redis):
+    upstream_calls = []
+    _patch_manager(monkeypatch, upstream_calls)
+
+    async def run():
+        return await asyncio.gather(*(manager.resolve_isbn("9780134685991", mode="sequential") for _ in range(20)))
+
+    docs = asyncio.run(run())
+    assert all(d["title"] == "Effective Java" for d in docs)
+    assert upstream_calls == ["loc"]
+
+
+def test_waits_for_peer_worker_holding_redis_lock(monkeypatch, fake_redis):
+    upstream_calls = []
+    _patch_manager(monkeypatch, upstream_calls)
+    settings = dataclasses.replace(get_settings(), isbn_singleflight_redis=True, isbn_singleflight_poll_interval=0.01)
+    monkeypatch.setattr(manager, "get_settings", lambda: settings)
+
+    order = manager._build_order(None, None)
+    name = manager._flight_name(manager._flight_key("9780134685991", order, None))
+    assert asyncio.run(singleflight.try_acquire(name)) is not None
+
+    peer_doc = {"title": "From peer", "isbn": "9780134685991"}
+    polls = []
+
+    async def cached_after_peer(isbn):
+        polls.append(isbn)
+        return peer_doc if len(polls) > 1 else None
+
+    async def run():
+        monkeypatch.setattr(manager, "_get_cached", cached_after_peer)
+        return await manager.resolve_isbn("9780134685991", mode="sequential")
+
+    doc = asyncio.run(run())
+    assert doc == peer_doc
+    assert upstream_calls == []
+
+
+def test_release_only_deletes_own_lock(fake_redis):
+    async def run():
+        token = await singleflight.try_acquire("k")
+        # 锁过期后被其他 worker 重新获取：旧令牌不能释放新锁
+        fake_redis.store.clear()
+        other = await singleflight.try_acquire("k")
+        await singleflight.release("k", token)
+        assert await singleflight.is_locked("k")
+        await singleflight.release("k", other)
+        return await singleflight.is_locked("k")
+
+    assert asyncio.run(run()) is False
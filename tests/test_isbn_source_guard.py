@@ -0,0 +1,120 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.isbn import SOURCE_GOOGLE_BOOKS, SOURCE_LOC, source_guard
+from app.services.isbn.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, get_breakers
+from app.services.isbn.client_base import RateLimitError
+from app.services.isbn.rate_limiter import TokenBucketLimiter, get_rate_limiter, parse_rate_limits
+from app.services.isbn.source_health import get_source_health, rate_limit_key
+
+
+def _breaker(**overrides):
+    params = dict(window=4, min_calls=4, error_rate=0.5, slow_call_seconds=1.0, slow_call_rate=0.75, open_seconds=0.05, half_open_calls=1)
+    params.update(overrides)
+    return CircuitBreaker(**params)
+
+
+def test_breaker_opens_on_error_rate_and_recovers_after_probe():
+    b = _breaker()
+    b.record_success(0.1)
+    b.record_success(0.1)
+    b.record_failure()
+    assert b.state == CLOSED  # 未达到 min_calls
+    b.record_failure()
+    assert b.state == OPEN
+    assert not b.allow()
+
+    time.sleep(0.06)
+    assert b.state == HALF_OPEN
+    assert b.allow()
+    assert not b.allow()  # 仅一个探测名额
+    b.record_success(0.1)
+    assert b.state == CLOSED
+
+
+def test_breaker_opens_on_slow_calls_and_failed_probe_reopens():
+    b = _breaker()
+    for _ in range(3):
+        b.record_success(2.0)
+    b.record_success(0.1)
+    assert b.state == OPEN
+
+    time.sleep(0.06)
+    assert b.allow()
+    b.record_failure()
+    assert b.state == OPEN
+
+
+def test_cancelled_probe_returns_its_slot():
+    b = _breaker()
+    b.trip(0.0)
+    assert b.allow()
+    assert not b.is_available()
+    b.release()
+    assert b.is_available()
+
+
+def test_parse_rate_limits():
+    assert parse_rate_limits("google_books=0.5/10, isbndb=2 ,bad=x/1,loc=0") == {
+        "google_books": (0.5, 10),
+        "isbndb": (2.0, 2),
+        "loc": (0.0, 1),
+    }
+
+
+def test_limiter_waits_within_budget_then_gives_up(monkeypatch):
+    limiter = TokenBucketLimiter({SOURCE_LOC: (1.0, 1), SOURCE_GOOGLE_BOOKS: (0.0, 1)}, max_wait=0.1)
+    waits = iter([50, 0, 5000])
+    calls = []
+
+    async def script(keys, args):
+        calls.append((keys, args))
+        return next(waits)
+
+    monkeypatch.setattr(limiter, "_script", lambda client: script)
+
+    assert asyncio.run(limiter.acquire(SOURCE_LOC)) is True  # 等 50ms 后取得令牌
+    assert asyncio.run(limiter.acquire(SOURCE_LOC)) is False  # 需等 5s，超出 max_wait
+    assert calls[0] == (["isbn:bucket:loc"], [1.0, 1])
+    # rate 为 0 的来源不限速，也不访问 Redis
+    assert asyncio.run(limiter.acquire(SOURCE_GOOGLE_BOOKS)) is True
+    assert len(calls) == 3
+
+
+def test_limiter_fails_open_without_redis(fake_redis):
+    limiter = TokenBucketLimiter({SOURCE_LOC: (1.0, 1)}, max_wait=0.0)
+    # FakeRedis 不支持脚本：视为 Redis 不可用，放行
+    assert asyncio.run(limiter.acquire(SOURCE_LOC)) is True
+
+
+def test_call_trips_breaker_and_bans_on_rate_limit(fake_redis):
+    async def limited():
+        raise RateLimitError("loc rate limited", retry_after=120)
+
+    with pytest.raises(RateLimitError):
+        asyncio.run(source_guard.call(SOURCE_LOC, limited))
+
+    assert get_breakers().get(SOURCE_LOC).state == OPEN
+    assert get_source_health().snapshot()[SOURCE_LOC] is True
+    value, expires_at = fake_redis.store[rate_limit_key(SOURCE_LOC)]
+    assert 100 < expires_at - time.time() <= 120
+    with pytest.raises(source_guard.SourceRejected):
+        asyncio.run(source_guard.call(SOURCE_LOC, limited))
+
+
+def test_call_rejects_when_quota_exhausted(monkeypatch, fake_redis):
+    async def no_token(source):
+        return False
+
+    monkeypatch.setattr(get_rate_limiter(), "acquire", no_token)
+    called = []
+
+    async def fetch():
+        called.append(1)
+
+    with pytest.raises(source_guard.SourceRejected):
+        asyncio.run(source_guard.call(SOURCE_LOC, fetch))
+    assert called == []
+    assert get_breakers().get(SOURCE_LOC).state == CLOSED
@@ -0,0 +1,79 @@
+import asyncio
+
+from app.services.isbn import SOURCE_GOOGLE_BOOKS, SOURCE_ISBNDB, SOURCE_LOC
+from app.services.isbn.source_health import SourceHealth, rate_limit_key
+
+
+class CountingRedis:
+    def __init__(self, inner):
+        self.inner = inner
+        self.mget_calls = 0
+        self.get_calls = 0
+
+    async def get(self, key):
+        self.get_calls += 1
+        return self.inner.get(key)
+
+    async def mget(self, keys):
+        self.mget_calls += 1
+        return self.inner.mget(keys)
+
+    async def setex(self, key, ttl, value):
+        return self.inner.setex(key, ttl, value)
+
+
+def _use_client(monkeypatch, client):
+    class Service:
+        def get_async_client(self):
+            return client
+
+    monkeypatch.setattr("app.services.isbn.source_health.get_redis_service", lambda: Service())
+
+
+def test_single_mget_serves_all_sources(monkeypatch, fake_redis):
+    fake_redis.setex(rate_limit_key(SOURCE_ISBNDB), 60, "1")
+    counting = CountingRedis(fake_redis)
+    _use_client(monkeypatch, counting)
+    health = SourceHealth([SOURCE_LOC, SOURCE_GOOGLE_BOOKS, SOURCE_ISBNDB], max_age=60, refresh_interval=1)
+
+    asyncio.run(health.ensure_fresh())
+    flags = [health.is_rate_limited(s) for s in (SOURCE_LOC, SOURCE_GOOGLE_BOOKS, SOURCE_ISBNDB)]
+
+    assert flags == [False, False, True]
+    assert counting.mget_calls == 1
+    assert counting.get_calls == 0
+
+
+def test_mark_rate_limited_updates_snapshot_and_redis(fake_redis):
+    health = SourceHealth([SOURCE_LOC, SOURCE_GOOGLE_BOOKS], max_age=60, refresh_interval=1)
+    asyncio.run(health.refresh())
+
+    asyncio.run(health.mark_rate_limited(SOURCE_GOOGLE_BOOKS, 60))
+
+    assert health.is_rate_limited(SOURCE_GOOGLE_BOOKS)
+    assert fake_redis.get(rate_limit_key(SOURCE_GOOGLE_BOOKS)) == "1"
+
+
+def test_stale_snapshot_picks_up_other_workers_bans(fake_redis):
+    health = SourceHealth([SOURCE_LOC], max_age=0, refresh_interval=1)
+    assert health.is_rate_limited(SOURCE_LOC) is False
+
+    # 另一 worker 写入的限流标记在快照过期后可见
+    fake_redis.setex(rate_limit_key(SOURCE_LOC), 60, "1")
+    asyncio.run(health.ensure_fresh())
+
+    assert health.snapshot() == {SOURCE_LOC: True}
+
+
+def test_redis_outage_keeps_last_snapshot(monkeypatch, fake_redis):
+    fake_redis.setex(rate_limit_key(SOURCE_LOC), 60, "1")
+    health = SourceHealth([SOURCE_LOC], max_age=0, refresh_interval=1)
+    asyncio.run(health.refresh())
+
+    class Broken:
+        async def mget(self, keys):
+            raise ConnectionError("down")
+
+    _use_client(monkeypatch, Broken())
+    asyncio.run(health.ensure_fresh())
+    assert health.is_rate_limited(SOURCE_LOC) is True
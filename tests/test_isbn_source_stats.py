@@ -0,0 +1,87 @@
+import asyncio
+
+from app.services.isbn import SOURCE_GOOGLE_BOOKS, SOURCE_LOC, SOURCE_NLC_CHINA, SOURCE_OPEN_LIBRARY
+from app.services.isbn import manager
+from app.services.isbn.source_stats import ERROR, HIT, MISS, SourceStats, get_source_stats
+from app.utils.isbn import infer_country, registration_group, to_isbn13
+
+ORDER = [SOURCE_LOC, SOURCE_OPEN_LIBRARY, SOURCE_GOOGLE_BOOKS]
+
+
+def _stats():
+    return SourceStats(window=50, prior_weight=5, prior_latency=1.0)
+
+
+def test_registration_group_and_country():
+    assert to_isbn13("0-306-40615-2") == "9780306406157"
+    assert registration_group("9787020002207") == "978-7"
+    assert registration_group("9788936433598") == "978-89"
+    assert registration_group("9789620428159") == "978-962"
+    assert registration_group("9791191114003") == "979-11"
+    assert infer_country("9787020002207") == "CN"
+    assert infer_country("9789881234568") == "HK"
+    assert infer_country("9780306406157") is None  # 英语区跨国组不推断
+    assert registration_group("not an isbn") is None
+
+
+def test_rank_keeps_static_order_without_data():
+    assert _stats().rank(ORDER, "978-0") == ORDER
+
+
+def test_rank_demotes_slow_and_empty_source():
+    stats = _stats()
+    for _ in range(30):
+        stats.record(SOURCE_LOC, "978-0", MISS, 2.5)
+        stats.record(SOURCE_OPEN_LIBRARY, "978-0", HIT, 0.3)
+    assert stats.rank(ORDER, "978-0")[0] == SOURCE_OPEN_LIBRARY
+    assert stats.rank(ORDER, "978-0")[-1] == SOURCE_LOC
+
+
+def test_hit_rate_is_tracked_per_registration_group():
+    stats = _stats()
+    for _ in range(30):
+        stats.record(SOURCE_LOC, "978-7", MISS, 0.5)
+        stats.record(SOURCE_LOC, "978-0", HIT, 0.5)
+        stats.record(SOURCE_GOOGLE_BOOKS, "978-7", HIT, 0.5)
+    assert stats.rank([SOURCE_LOC, SOURCE_GOOGLE_BOOKS], "978-0")[0] == SOURCE_LOC
+    assert stats.rank([SOURCE_LOC, SOURCE_GOOGLE_BOOKS], "978-7")[0] == SOURCE_GOOGLE_BOOKS
+
+
+def test_snapshot_reports_percentiles_and_rates():
+    stats = _stats()
+    for i in range(1, 11):
+        stats.record(SOURCE_LOC, "978-0", HIT if i % 2 else ERROR, i / 10)
+    snap = stats.snapshot()[SOURCE_LOC]
+    assert snap["calls"] == 10
+    assert snap["hitRate"] == 0.5 and snap["errorRate"] == 0.5
+    assert snap["p50"] in (0.5, 0.6) and snap["p95"] == 1.0
+    assert snap["groupHitRate"] == {"978-0": 0.5}
+
+
+def test_country_inferred_from_isbn_when_omitted(fake_redis):
+    order = manager._candidate_order("9787020002207", None, None, None)
+    assert order[0] == SOURCE_NLC_CHINA
+    assert manager._candidate_order("9787020002207", "US", None, None)[0] == SOURCE_LOC
+
+
+def test_resolve_records_outcomes(monkeypatch, fake_redis):
+    async def nothing(*args):
+        return None
+
+    monkeypatch.setattr(manager, "_get_cached", nothing)
+    monkeypatch.setattr(manager, "_cache_book", nothing)
+    monkeypatch.setattr(manager, "_is_configured", lambda src, keys: src in ORDER)
+
+    async def fetch(src, isbn, *, api_key=None, timeout=10.0):
+        if src == SOURCE_LOC:
+            return {"title": None}
+        return {"title": "Found", "isbn": isbn}
+
+    monkeypatch.setattr(manager, "fetch_from_source", fetch)
+    doc = asyncio.run(manager.resolve_isbn("9780306406157", mode="sequential"))
+    assert doc["title"] == "Found"
+
+    snap = get_source_stats().snapshot()
+    assert snap[SOURCE_LOC]["hitRate"] == 0.0
+    assert snap[SOURCE_OPEN_LIBRARY]["hitRate"] == 1.0
+    assert snap[SOURCE_OPEN_LIBRARY]["groupHitRate"] == {"978-0": 1.0}
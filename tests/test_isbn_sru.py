@@ -0,0 +1,131 @@
+from xml.sax.saxutils import escape
+
+import httpx
+import pytest
+
+from app.services.isbn import british_library, ndl, sru
+
+DCNDL_RECORD = """
+<rdf:RDF xmlns:rdf="http://www.w3.org/1999/02/22-rdf-syntax-ns#" xmlns:dc="http://purl.org/dc/elements/1.1/"
+         xmlns:dcterms="http://purl.org/dc/terms/" xmlns:dcndl="http://ndl.go.jp/dcndl/terms/" xmlns:foaf="http://xmlns.com/foaf/0.1/">
+  <dcndl:BibAdminResource rdf:about="https://ndlsearch.ndl.go.jp/books/R100000002-I000001{n}"/>
+  <dcndl:BibResource rdf:about="https://ndlsearch.ndl.go.jp/books/R100000002-I000001{n}#material">
+    <dcterms:identifier rdf:datatype="http://ndl.go.jp/dcndl/terms/ISBN">{isbn}</dcterms:identifier>
+    <dcterms:identifier rdf:datatype="http://ndl.go.jp/dcndl/terms/JPNO">8788{n}</dcterms:identifier>
+    <dc:title><rdf:Description><rdf:value>ノルウェイの森</rdf:value><dcndl:transcription>ノルウェイ ノ モリ</dcndl:transcription></rdf:Description></dc:title>
+    <dcterms:title>ノルウェイの森 上</dcterms:title>
+    <dcterms:creator><foaf:Agent><foaf:name>村上, 春樹, 1949-</foaf:name></foaf:Agent></dcterms:creator>
+    <dc:creator>村上春樹 著</dc:creator>
+    <dcterms:publisher><foaf:Agent><foaf:name>講談社</foaf:name></foaf:Agent></dcterms:publisher>
+    <dcterms:date>1987.9</dcterms:date>
+    <dcterms:issued rdf:datatype="http://purl.org/dc/terms/W3CDTF">1987</dcterms:issued>
+    <dcterms:subject><rdf:Description><rdf:value>小説</rdf:value></rdf:Description></dcterms:subject>
+    <dcterms:subject rdf:resource="http://id.ndl.go.jp/class/ndc9/913.6"/>
+    <dcterms:language rdf:datatype="http://purl.org/dc/terms/ISO639-2">jpn</dcterms:language>
+    <dcterms:extent>268p ; 20cm</dcterms:extent>
+  </dcndl:BibResource>
+</rdf:RDF>
+"""
+
+
+def _sru(records, packing="xml"):
+    body = "".join(
+        f"<record><recordSchema>dcndl</recordSchema><recordPacking>{packing}</recordPacking>"
+        f"<recordData>{escape(r) if packing == 'string' else r}</recordData><recordPosition>{i + 1}</recordPosition></record>"
+        for i, r in enumerate(records)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><searchRetrieveResponse xmlns="http://www.loc.gov/zing/srw/">'
+        f"<version>1.2</version><numberOfRecords>{len(records)}</numberOfRecords><records>{body}</records></searchRetrieveResponse>"
+    ).encode("utf-8")
+
+
+def _dcndl(n=0, isbn="4-06-203516-2"):
+    return DCNDL_RECORD.format(n=n, isbn=isbn)
+
+
+def test_dcndl_record_maps_to_normalized_book():
+    [book] = sru.parse_response(_sru([_dcndl()]), sru.SCHEMA_DCNDL, source="ndl")
+    assert book["title"] == "ノルウェイの森 上"
+    assert book["creators"] == [{"name": "村上, 春樹, 1949-", "role": None}]
+    assert book["publisher"] == "講談社"
+    assert book["published_date"] == "1987"
+    assert book["language"] == "ja"
+    assert book["subjects"] == ["小説"]
+    assert book["page_count"] == 268
+    assert book["identifiers"] == {"jpno": "87880", "isbn_13": "9784062035163", "isbn_10": "4062035162"}
+    assert book["preview_urls"] == ["https://ndlsearch.ndl.go.jp/books/R100000002-I0000010"]
+
+
+def test_streams_many_records_in_small_chunks():
+    data = _sru([_dcndl(n) for n in range(50)])
+    chunks = (data[i:i + 100] for i in range(0, len(data), 100))
+    books = list(sru.iter_records(chunks, sru.SCHEMA_DCNDL, source="ndl"))
+    assert len(books) == 50 and books[-1]["identifiers"]["jpno"] == "878849"
+
+
+def test_string_packed_records_are_parsed():
+    [book] = sru.parse_response(_sru([_dcndl()], packing="string"), sru.SCHEMA_DCNDL, source="ndl")
+    assert book["title"] == "ノルウェイの森 上"
+
+
+def test_diagnostic_without_records_is_an_error():
+    data = (
+        b'<searchRetrieveResponse xmlns="http://www.loc.gov/zing/srw/"><numberOfRecords>0</numberOfRecords>'
+        b'<diagnostics><diagnostic xmlns="http://www.loc.gov/zing/srw/diagnostic/"><uri>info:srw/diagnostic/1/10</uri>'
+        b"<message>Query syntax error</message></diagnostic></diagnostics></searchRetrieveResponse>"
+    )
+    with pytest.raises(sru.SruDiagnostic, match="Query syntax error"):
+        sru.parse_response(data, sru.SCHEMA_DCNDL, source="ndl")
+    assert sru.parse_response(_sru([]), sru.SCHEMA_DCNDL, source="ndl") == []
+
+
+def test_mods_record():
+    mods = """
+    <mods xmlns="http://www.loc.gov/mods/v3">
+      <titleInfo><nonSort>The</nonSort><title>pragmatic programmer</title><subTitle>your journey to mastery</subTitle></titleInfo>
+      <titleInfo type="alternative"><title>Pragmatic programmer</title></titleInfo>
+      <name type="personal"><namePart>Thomas, David</namePart><namePart type="date">1956-</namePart>
+        <role><roleTerm type="text">author</roleTerm></role></name>
+      <originInfo><publisher>Addison-Wesley</publisher><dateIssued>2019</dateIssued></originInfo>
+      <language><languageTerm type="code" authority="iso639-2b">eng</languageTerm></language>
+      <physicalDescription><extent>xxii, 320 pages</extent></physicalDescription>
+      <subject><topic>Computer programming</topic></subject>
+      <identifier type="isbn">9780135957059</identifier>
+      <recordInfo><recordIdentifier>019591283</recordIdentifier></recordInfo>
+    </mods>"""
+    [book] = sru.parse_response(_sru([mods]), sru.SCHEMA_MODS, source="british_library")
+    assert (book["title"], book["subtitle"]) == ("The pragmatic programmer", "your journey to mastery")
+    assert book["creators"] == [{"name": "Thomas, David", "role": "author"}]
+    assert book["page_count"] == 320 and book["language"] == "en"
+    assert book["identifiers"]["isbn_13"] == "9780135957059"
+    assert book["identifiers"]["british_library_record"] == "019591283"
+
+
+def test_dc_record():
+    dc = """
+    <srw_dc:dc xmlns:srw_dc="info:srw/schema/1/dc-schema" xmlns:dc="http://purl.org/dc/elements/1.1/">
+      <dc:title>채식주의자</dc:title><dc:creator>한강</dc:creator><dc:publisher>창비</dc:publisher>
+      <dc:date>2007</dc:date><dc:language>kor</dc:language><dc:identifier>ISBN 9788936433598</dc:identifier>
+      <dc:format>247 p.</dc:format>
+    </srw_dc:dc>"""
+    [book] = sru.parse_response(_sru([dc]), sru.SCHEMA_DC, source="kolisnet")
+    assert book["title"] == "채식주의자" and book["creators"] == [{"name": "한강", "role": None}]
+    assert book["language"] == "ko" and book["page_count"] == 247
+    assert book["identifiers"]["isbn_13"] == "9788936433598"
+
+
+def test_adapters_pick_matching_record():
+    data = _sru([_dcndl(1, "978-4-10-100101-2"), _dcndl(2, "4-06-203516-2")])
+    book = ndl._parse_isbn("9784062035163", httpx.Response(200, content=data))
+    assert book["source"] == "ndl" and book["isbn"] == "9784062035163"
+    assert book["identifiers"]["jpno"] == "87882"
+    assert book["raw"]["xml"].startswith("<?xml")
+
+    empty = british_library._parse_isbn("9780135957059", httpx.Response(200, content=_sru([])))
+    assert empty["title"] is None and empty["language"] == "en"
+
+    # 只有别的书的记录：按未命中处理，不把它当作所查 ISBN 的结果
+    other = ndl._parse_isbn("9784101001012", httpx.Response(200, content=_sru([_dcndl(2, "4-06-203516-2")])))
+    assert other["title"] is None and "isbn_13" not in other["identifiers"]
+    assert sru.pick(sru.parse_response(_sru([_dcndl(isbn="")]), sru.SCHEMA_DCNDL, source="ndl"), "9784101001012")["title"]
@@ -0,0 +1,227 @@
+import asyncio
+import io
+import threading
+import time
+from contextlib import aclosing
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import pytest
+from PIL import Image
+
+from app.services import ocr
+from app.services.ocr import BaseImage, OCRBusy, OCRPage, OCRPool, OCRService, OCRTimeout, OCRWord
+
+
+def _png(size=(40, 20)) -> bytes:
+    buf = io.BytesIO()
+    Image.new("RGB", size, "white").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    started = []
+    lock = threading.Lock()
+
+    def fake_job(languages, image, index):
+        with lock:
+            started.append(index)
+        time.sleep(0.05 if index else 0.01)
+        return OCRPage(index, [OCRWord(f"variant{index}", 90.0, (0, 0, 1, 1), (1, 1, 1))])
+
+    monkeypatch.setattr(ocr, "_ocr_variant_job", fake_job)
+    return started
+
+
+def _pool(workers=2, max_requests=2, locate_side=0):
+    return OCRPool(workers=workers, max_requests=max_requests, executor=ThreadPoolExecutor(workers), locate_side=locate_side)
+
+
+def test_merges_all_variants_in_completion_order(jobs):
+    async def run():
+        return [page.text async for page in _pool().iter_pages(_png(), timeout=5)]
+
+    texts = asyncio.run(run())
+    assert sorted(texts) == sorted(f"variant{i}" for i in range(len(ocr._VARIANTS)))
+    assert texts[0] == "variant0"
+
+
+def test_early_exit_cancels_queued_variants(jobs):
+    pool = _pool(workers=1)
+
+    async def run():
+        async with aclosing(pool.iter_pages(_png(), timeout=5)) as texts:
+            async for _ in texts:
+                break
+        await asyncio.sleep(0.2)
+
+    asyncio.run(run())
+    # 已开始的任务跑完，排队中的任务被取消
+    assert len(jobs) <= 3 and pool.active == 0
+
+
+def test_admission_limit_and_deadline(jobs):
+    pool = _pool(max_requests=1)
+
+    async def run():
+        first = pool.iter_pages(_png(), timeout=0.03)
+        await first.__anext__()
+        with pytest.raises(OCRBusy):
+            await pool.iter_pages(_png(), timeout=5).__anext__()
+        with pytest.raises(OCRTimeout):
+            async for _ in first:
+                pass
+        await asyncio.sleep(0.2)
+        assert pool.active == 0
+
+    asyncio.run(run())
+
+
+def test_running_jobs_hold_the_slot_until_they_finish(monkeypatch):
+    release = threading.Event()
+    loaded = []
+
+    def fake_job(languages, image, index):
+        # 任务只收到共享内存块名，像素由工作进程自行读取
+        loaded.append((image.name, image.load().size))
+        if index:
+            release.wait(5)
+        return OCRPage(index, [])
+
+    monkeypatch.setattr(ocr, "_ocr_variant_job", fake_job)
+    pool = _pool(max_requests=1)
+
+    async def run():
+        async with aclosing(pool.iter_pages(_png(), timeout=5)) as pages:
+            async for _ in pages:
+                break
+        # 调用方已停止，但已开始的任务仍占着工作进程：名额未归还
+        with pytest.raises(OCRBusy):
+            await pool.iter_pages(_png(), timeout=5).__anext__()
+        release.set()
+        await asyncio.sleep(0.2)
+        assert pool.active == 0
+
+    asyncio.run(run())
+    assert {size for _, size in loaded} == {(40, 20)} and len({name for name, _ in loaded}) == 1
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(loaded[0][0])
+
+
+def test_single_tesseract_pass_per_variant(monkeypatch):
+    calls = []
+
+    class FakeTesseract:
+        class Output:
+            DICT = "dict"
+
+        @staticmethod
+        def image_to_data(image, lang, config, output_type):
+            calls.append((image.size, config))
+            # 汇总行 conf=-1；line_num 在每个段落内重新计数
+            return {
+                "block_num": [1, 1, 1, 2, 2],
+                "par_num": [1, 1, 1, 1, 1],
+                "line_num": [0, 1, 1, 1, 1],
+                "left": [0, 1, 2, 3, 4], "top": [0] * 5, "width": [5] * 5, "height": [5] * 5,
+                "conf": ["-1", "96.5", "91", "88", "90"],
+                "text": ["", "ISBN", "978-7-02-000220-7", "Price", "25.00"],
+            }
+
+    service = OCRService()
+    monkeypatch.setattr(service, "_tesseract", lambda: FakeTesseract)
+    page = service.ocr_variant(BaseImage.from_bytes(_png()), 10)
+    assert calls == [((80, 40), "--oem 3 --psm 6")]  # 第 11 个方案：2 倍放大
+    assert page.variant == 10 and page.words[0].conf == 96.5
+    assert page.lines == ["ISBN 978-7-02-000220-7", "Price 25.00"]
+    assert page.text == "ISBN 978-7-02-000220-7\nPrice 25.00"
+
+
+def test_large_uploads_are_downscaled_and_not_upscaled(jobs):
+    buf = io.BytesIO()
+    Image.new("RGB", (4000, 3000), "white").save(buf, format="JPEG")
+    base = BaseImage.from_bytes(buf.getvalue(), max_side=2000)
+    assert base.size == (2000, 1500) and len(base.pixels) == 2000 * 1500 and base.scale == 0.5
+
+    assert len(list(ocr.variant_indices((2000, 1500), 1000))) == len(ocr._VARIANTS) - 2
+    assert list(ocr.variant_indices((800, 600), 1000)) == list(range(len(ocr._VARIANTS)))
+
+    async def run():
+        return [page async for page in _pool().iter_pages(buf.getvalue(), timeout=5)]
+
+    assert len(asyncio.run(run())) == len(ocr._VARIANTS) - 2
+    assert max(jobs) == len(ocr._VARIANTS) - 3  # 放大方案排在最后
+
+
+def test_locate_regions_around_barcode_and_isbn_line(monkeypatch):
+    calls = []
+
+    class FakeTesseract:
+        class Output:
+            DICT = "dict"
+
+        @staticmethod
+        def image_to_data(image, lang, config, output_type):
+            calls.append((image.size, config))
+            # 缩小一半后的坐标：ISBN 行在 (20, 300)，另一行是书名
+            return {
+                "block_num": [1, 1, 2], "par_num": [1, 1, 1], "line_num": [1, 1, 1],
+                "left": [20, 60, 20], "top": [300, 300, 40], "width": [35, 120, 200], "height": [10, 10, 20],
+                "conf": ["80", "41", "90"],
+                "text": ["I5BN", "978-7-02-00", "Title"],
+            }
+
+    monkeypatch.setattr(ocr, "locate_barcodes", lambda image: [(1200, 1000, 400, 200)])
+    service = OCRService()
+    monkeypatch.setattr(service, "_tesseract", lambda: FakeTesseract)
+    page, regions = service.locate(BaseImage((2000, 1500), bytes(2000 * 1500)), 1000)
+
+    assert calls == [((1000, 750), "--oem 3 --psm 11")]
+    assert page.variant == ocr.LOCATE_PASS and page.lines == ["I5BN 978-7-02-00", "Title"]
+    # 条码向上外扩 0.6 倍宽度、向下 0.9 倍（裁到图像边界）；ISBN 行换算回原图坐标后上下各留一行高、向右延伸
+    assert regions == [(1140, 760, 520, 740), (0, 580, 860, 60)]
+
+    # 区域合计超过整图一半时不裁剪
+    monkeypatch.setattr(ocr, "locate_barcodes", lambda image: [(0, 0, 1500, 1000)])
+    assert service.locate(BaseImage((2000, 1500), bytes(2000 * 1500)), 1000)[1] == []
+
+    # 调用方已在上传原图（两倍大小）上解码过条码：换算到 base 坐标，不再运行 pyzbar
+    monkeypatch.setattr(ocr, "locate_barcodes", lambda image: pytest.fail("pyzbar ran twice"))
+    base = BaseImage((2000, 1500), bytes(2000 * 1500), 0.5)
+    assert service.locate(base, 1000, [(2400, 2000, 800, 400)])[1] == [(1140, 760, 520, 740), (0, 580, 860, 60)]
+
+
+def test_crop_sweep_runs_before_full_image(monkeypatch):
+    sizes = []
+
+    def fake_locate(languages, base, side, barcodes):
+        assert barcodes == [(1, 1, 4, 2)]
+        return OCRPage(ocr.LOCATE_PASS, []), [(0, 0, 20, 10)]
+
+    def fake_job(languages, image, index):
+        sizes.append(image.size)
+        return OCRPage(index, [])
+
+    monkeypatch.setattr(ocr, "_locate_job", fake_locate)
+    monkeypatch.setattr(ocr, "_ocr_variant_job", fake_job)
+    pool = _pool(locate_side=1000)
+
+    async def run(stop_after):
+        pages = []
+        async with aclosing(pool.iter_pages(_png(), timeout=5, barcodes=[(1, 1, 4, 2)])) as it:
+            async for page in it:
+                pages.append(page)
+                if len(pages) == stop_after:
+                    break
+        return pages
+
+    pages = asyncio.run(run(1 + len(ocr._VARIANTS)))
+    assert pages[0].variant == ocr.LOCATE_PASS
+    # 停在区域识别之后：整图方案从未提交
+    assert sizes == [(20, 10)] * len(ocr._VARIANTS) and pool.active == 0
+
+    sizes.clear()
+    pages = asyncio.run(run(0))
+    assert len(pages) == 1 + 2 * len(ocr._VARIANTS) and sizes[-1] == (40, 20)
+    assert BaseImage((4, 2), bytes(range(8))).crop((1, 0, 2, 2)) == BaseImage((2, 2), bytes([1, 2, 5, 6]))
@@ -0,0 +1,38 @@
+from app.utils.text_similarity import TitleMatcher, normalize_text, title_similarity
+
+
+def test_normalize_text():
+    assert normalize_text("  Effective  Java: 3rd Ed. ") == "effective java 3rd ed"
+    assert normalize_text("Ｃｌｅａｎ　Code") == "clean code"
+    assert normalize_text(None) == ""
+
+
+def test_similarity_tolerates_typos_order_and_subtitles():
+    assert title_similarity("Effective Java", "Effective Java") == 1.0
+    assert title_similarity("Effective Java", "Effective Java: Programming Language Guide") == 1.0
+    assert title_similarity("Effective Java", "Efective Jva") > 0.6
+    assert title_similarity("Effective Java", "Java Effective") > 0.9
+    assert title_similarity("Effective Java", "Effective Python") < 0.5
+    assert title_similarity("Effective Java", "") == 0.0
+
+
+def test_similarity_handles_cjk_without_spaces():
+    assert title_similarity("黑暗森林", "三体II：黑暗森林") > 0.6
+    assert title_similarity("黑暗森林", "黑暗料理") < 0.3
+    assert title_similarity("ノルウェイの森", "ノルウェイの森 上") > 0.7
+
+
+def test_rank_scores_all_candidates_and_filters():
+    items = [
+        {"title": "Effective Python"},
+        {"title": "Effective Java (3rd Edition)"},
+        {"title": "Java Concurrency in Practice"},
+        {"title": None},
+        {"title": "Efective Java"},
+    ]
+    ranked = TitleMatcher("Effective Java").rank(items, min_similarity=0.5)
+    assert [item["title"] for _, item in ranked] == ["Effective Java (3rd Edition)", "Efective Java"]
+    assert ranked[0][0] == 1.0
+
+    scores = TitleMatcher("Effective Java").scores([i["title"] for i in items])
+    assert scores.shape == (5,) and scores[3] == 0.0